@@ -0,0 +1,84 @@
+"""
+Bytes on the wire and compression CPU cost per endpoint payload.
+
+Each payload is pushed through CompressionMiddleware as the endpoint would
+produce it (JSON lists from the adapters, share page HTML), once per
+encoding, and the response size and best time are reported.
+
+Run from backend/:
+    python -m benchmarks.bench_compression [--rounds 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+
+from benchmarks.bench_json_encoding import make_items, make_wishlists
+from middleware.compression import CompressionMiddleware, brotli
+from services.serialization import item_list_adapter, wishlist_list_adapter
+from services.share_page import RENDER_TARGET, render_share_page
+
+def build_payloads() -> dict:
+    wishlist = SimpleNamespace(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), title='Birthday 2026', description='Things I would love',
+        image=None, thumbnail_type='icon', thumbnail_image=None, updated_at=datetime.now(), created_at=datetime.now()
+    )
+    owner = SimpleNamespace(id=wishlist.user_id, name='Alex', username='alex', pfp=None)
+    return {
+        'GET /': (b'{"Wish":"List"}', 'application/json'),
+        'GET /wishlists/ (20)': (wishlist_list_adapter.dump_json(wishlist_list_adapter.validate_python(make_wishlists(20))), 'application/json'),
+        'GET /wishlist/items (100)': (item_list_adapter.dump_json(item_list_adapter.validate_python(make_items(100))), 'application/json'),
+        'GET /wishlist/items (500)': (item_list_adapter.dump_json(item_list_adapter.validate_python(make_items(500))), 'application/json'),
+        'GET /wishlists/shared': (render_share_page(RENDER_TARGET, wishlist, owner).encode(), 'text/html; charset=utf-8'),
+        'GET /wishlist/{id}/image': (os.urandom(200_000), 'image/jpeg'),
+    }
+
+def make_app(body: bytes, media_type: str):
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', media_type.encode()), (b'content-length', str(len(body)).encode())
+        ]})
+        await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+    return app
+
+async def run_once(middleware, accept_encoding: str) -> int:
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    await middleware(scope, receive, send)
+    return sum(len(message.get('body', b'')) for message in sent if message['type'] == 'http.response.body')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    loop = asyncio.new_event_loop()
+
+    print(f"{'endpoint':<28}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'best ms':>10}")
+    for label, (body, media_type) in build_payloads().items():
+        middleware = CompressionMiddleware(make_app(body, media_type), minimum_size=1024)
+        for encoding in encodings:
+            best = float('inf')
+            size = 0
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                size = loop.run_until_complete(run_once(middleware, encoding))
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:<28}{encoding:<10}{size:>10}{size / len(body):>8.2f}{best * 1e3:>10.3f}")
+    loop.close()
+
+if __name__ == '__main__':
+    main()
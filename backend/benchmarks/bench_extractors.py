@@ -0,0 +1,116 @@
+"""
+Correctness and speed of each site extractor against saved pages (fixtures/).
+
+Every case names the fixture, the URL it was "fetched" from and the fields the
+extractor must return; the URL also checks that the registry routes it to the
+expected extractor. URL cleaning is checked the same way. Each parse is then
+timed (best of --repeat rounds); for generic pages the full-tree BeautifulSoup
+parse of the same bytes is timed alongside, as the cost the head-only path avoids.
+
+Exits 1 on any mismatch.
+
+Run from backend/:
+    python -m benchmarks.bench_extractors [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+from services.extractors import extractor_for
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ('amazon', 'amazon_product.html', 'https://www.amazon.com/dp/B000000000', {
+        'name': 'Acme Wireless Noise Cancelling Headphones, 40h Battery',
+        'price': 1249.99,
+        'image_url': 'https://m.media-amazon.com/images/I/71abcDEFghL._AC_SL1500_.jpg',
+    }),
+    ('amazon', 'amazon_product.html', 'https://smile.amazon.co.uk/dp/B000000000', {
+        'name': 'Acme Wireless Noise Cancelling Headphones, 40h Battery',
+    }),
+    # JSON-LD Product inside @graph wins over OpenGraph; first offer's price, first image
+    ('generic', 'generic_jsonld.html', 'https://shop.northwind.example/products/organic-cotton-crew-tee', {
+        'name': 'Organic Cotton Crew Tee',
+        'price': 28.0,
+        'image_url': 'https://cdn.northwind.example/products/tee-front.jpg',
+        'description': 'A heavyweight crew neck tee in 100% organic cotton.',
+    }),
+    # OpenGraph with product:price, over twitter tags and <meta name="description">; body JSON-LD is never read
+    ('generic', 'generic_opengraph.html', 'https://fernwood.example/dripper', {
+        'name': 'Ceramic Pour-Over Coffee Dripper',
+        'price': 1249.5,
+        'image_url': 'https://images.fernwood.example/dripper-1200.jpg',
+        'description': 'Hand-glazed ceramic dripper for one to two cups & a slow, even extraction.',
+    }),
+    ('generic', 'generic_twitter.html', 'https://peakgear.example/socks', {
+        'name': 'Trail Running Socks (3 Pack)',
+        'price': None,
+        'image_url': 'https://static.peakgear.example/socks.png',
+        'description': 'Cushioned merino socks for long runs.',
+    }),
+]
+
+URL_CASES = [
+    ('https://www.amazon.com/Acme-Headphones/dp/B000000000/ref=sr_1_1?keywords=x', 'https://www.amazon.com/Acme-Headphones/dp/B000000000'),
+    ('https://www.amazon.co.uk/dp/B000000000?th=1&psc=1', 'https://www.amazon.co.uk/dp/B000000000'),
+    ('https://smile.amazon.de/dp/B000000000/ref=abc', 'https://smile.amazon.de/dp/B000000000'),
+    ('https://shop.example/products/tee?variant=42', 'https://shop.example/products/tee?variant=42'),
+    ('https://notamazon.com/dp/B000000000?x=1', 'https://notamazon.com/dp/B000000000?x=1'),
+]
+
+def check_case(extractor_name: str, content: bytes, url: str, expected: dict) -> list:
+    extractor = extractor_for(url)
+    if extractor.name != extractor_name:
+        return [f'routed to {extractor.name}, expected {extractor_name}']
+    result = extractor.parse(content, url)
+    if 'error' in result:
+        return [f'error: {result["error"]}']
+    return [
+        f'{field}: {result.get(field)!r} != {value!r}'
+        for field, value in {**expected, 'url': url}.items()
+        if result.get(field) != value
+    ]
+
+def best_ms(func, repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from bs4 import BeautifulSoup
+
+    failures = 0
+    for url, expected in URL_CASES:
+        cleaned = extractor_for(url).clean_url(url)
+        if cleaned != expected:
+            failures += 1
+            print(f'FAIL clean_url {url}: {cleaned!r} != {expected!r}')
+
+    print(f'{"extractor":<10} {"fixture":<24} {"KiB":>6} {"parse ms":>9} {"full tree ms":>13}  result')
+    for extractor_name, fixture, url, expected in CASES:
+        with open(os.path.join(HERE, 'fixtures', fixture), 'rb') as f:
+            content = f.read()
+        problems = check_case(extractor_name, content, url, expected)
+        failures += bool(problems)
+
+        parse = extractor_for(url).parse
+        parse_ms = best_ms(lambda: parse(content, url), args.repeat)
+        full_tree = ''
+        if extractor_name == 'generic':
+            full_tree = f'{best_ms(lambda: BeautifulSoup(content, "html.parser"), args.repeat):.2f}'
+        print(
+            f'{extractor_name:<10} {fixture:<24} {len(content) / 1024:>6.0f} {parse_ms:>9.2f} {full_tree:>13}  '
+            + ('ok' if not problems else 'FAIL ' + '; '.join(problems))
+        )
+
+    print('all extractors correct' if not failures else f'{failures} failure(s)')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Per-item serialization cost for item listings.
+
+Compares the old path (model_validate -> model_dump -> patch display name ->
+rebuild model -> FastAPI response_model pass -> json.dumps) against the
+projected rows serialized once with the precompiled adapter.
+
+Run from backend/:
+    python -m benchmarks.bench_item_serialization [--items 500] [--rounds 20]
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+
+from pydantic import TypeAdapter
+
+from models.item import WishListItemResponse
+from services.serialization import item_list_adapter
+
+response_adapter = TypeAdapter(List[WishListItemResponse])
+
+def make_orm_items(count: int) -> list:
+    """Objects shaped like WishListItem rows with a joined claimer"""
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(count):
+        claimer = SimpleNamespace(name=None, username=f'user{i}') if i % 3 == 0 else None
+        items.append(SimpleNamespace(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), wishlist_id=uuid.uuid4(),
+            name=f'Item {i}', description='A reasonably long item description ' * 3,
+            price=19.99 + i, url=f'https://example.com/product/{i}',
+            image=f'https://bucket.s3.amazonaws.com/wishlist_images/{uuid.uuid4().hex}.jpg',
+            is_purchased=False, priority=i % 5,
+            claimed_by_user_id=uuid.uuid4() if claimer else None,
+            claimed_by_user=claimer,
+            claimed_by_name='Guest' if i % 3 == 1 else None,
+            claimed_at=now if i % 3 != 2 else None,
+            created_at=now, updated_at=now,
+        ))
+    return items
+
+def make_projected_rows(orm_items: list) -> list:
+    """The same items as the projection returns them, display name precomputed"""
+    rows = []
+    for item in orm_items:
+        fields = {k: v for k, v in vars(item).items() if k != 'claimed_by_user'}
+        if item.claimed_by_user:
+            fields['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
+        else:
+            fields['claimed_by_display_name'] = item.claimed_by_name
+        rows.append(SimpleNamespace(**fields))
+    return rows
+
+def old_path(items: list) -> bytes:
+    response_items = []
+    for item in items:
+        item_dict = WishListItemResponse.model_validate(item).model_dump()
+        if item.claimed_by_user_id and item.claimed_by_user:
+            item_dict['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
+        elif item.claimed_by_name:
+            item_dict['claimed_by_display_name'] = item.claimed_by_name
+        else:
+            item_dict['claimed_by_display_name'] = None
+        response_items.append(WishListItemResponse(**item_dict))
+    # FastAPI's response_model validation and JSON rendering
+    return json.dumps(response_adapter.dump_python(response_adapter.validate_python(response_items), mode='json')).encode()
+
+def new_path(rows: list) -> bytes:
+    return item_list_adapter.dump_json(item_list_adapter.validate_python(rows, from_attributes=True))
+
+def measure(fn, data, rounds: int) -> float:
+    """Best wall time of `rounds` runs, in seconds"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    orm_items = make_orm_items(args.items)
+    rows = make_projected_rows(orm_items)
+
+    old = measure(old_path, orm_items, args.rounds)
+    new = measure(new_path, rows, args.rounds)
+
+    print(f"{'path':<12}{'total ms':>12}{'us/item':>12}")
+    print(f"{'old':<12}{old * 1e3:>12.2f}{old / args.items * 1e6:>12.2f}")
+    print(f"{'projected':<12}{new * 1e3:>12.2f}{new / args.items * 1e6:>12.2f}")
+    print(f"speedup: {old / new:.1f}x")
+
+if __name__ == '__main__':
+    main()
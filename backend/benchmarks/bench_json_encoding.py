@@ -0,0 +1,91 @@
+"""
+Encode time and allocations for the list endpoints' JSON payloads.
+
+For /wishlists/ and the item listings, compares:
+  json_response    - stock JSONResponse over jsonable_encoder output
+  orjson_response  - FastJSONResponse (orjson) over the same dicts
+  adapter_bytes    - precompiled TypeAdapter dumping models straight to bytes
+
+Run from backend/:
+    python -m benchmarks.bench_json_encoding [--sizes 10 100 500] [--rounds 20]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timezone
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.serialization import (
+    FastJSONResponse, item_list_adapter, wishlist_list_adapter
+)
+
+def make_wishlists(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [{
+        'id': uuid.uuid4(), 'user_id': uuid.uuid4(), 'title': f'Wishlist {i}',
+        'description': 'Birthday ideas and other things ' * 2, 'color': '#ff5733',
+        'is_public': bool(i % 2), 'image': None, 'thumbnail_type': 'icon',
+        'thumbnail_icon': 'gift', 'thumbnail_image': None, 'use_item_colors': False,
+        'default_view': 'list', 'due_date': date(2026, 12, 25),
+        'created_at': now, 'updated_at': now, 'item_count': i % 40,
+    } for i in range(count)]
+
+def make_items(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [{
+        'id': uuid.uuid4(), 'user_id': uuid.uuid4(), 'wishlist_id': uuid.uuid4(),
+        'name': f'Item {i}', 'description': 'A reasonably long item description ' * 3,
+        'price': 19.99 + i, 'url': f'https://example.com/product/{i}',
+        'image': f'https://bucket.s3.amazonaws.com/wishlist_images/{uuid.uuid4().hex}.jpg',
+        'is_purchased': False, 'priority': i % 5, 'created_at': now, 'updated_at': now,
+        'claimed_by_user_id': None, 'claimed_by_name': 'Guest' if i % 3 == 0 else None,
+        'claimed_at': now if i % 3 == 0 else None,
+        'claimed_by_display_name': 'Guest' if i % 3 == 0 else None,
+    } for i in range(count)]
+
+def measure(fn, rounds: int) -> tuple:
+    """Best wall time in seconds, plus peak bytes allocated during one traced run"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def run_endpoint(label: str, adapter, rows: list, rounds: int):
+    models = adapter.validate_python(rows)
+    dicts = adapter.dump_python(models)
+
+    strategies = {
+        'json_response': lambda: JSONResponse(jsonable_encoder(models)).body,
+        'orjson_response': lambda: FastJSONResponse(dicts).body,
+        'adapter_bytes': lambda: adapter.dump_json(models),
+    }
+    for name, fn in strategies.items():
+        best, peak = measure(fn, rounds)
+        print(f"{label:<10}{len(rows):>6}  {name:<17}{best * 1e3:>10.3f}{peak / 1024:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<10}{'rows':>6}  {'strategy':<17}{'best ms':>10}{'peak KiB':>12}")
+    for size in args.sizes:
+        run_endpoint('wishlists', wishlist_list_adapter, make_wishlists(size), args.rounds)
+        run_endpoint('items', item_list_adapter, make_items(size), args.rounds)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Cost of metrics collection.
+
+Measures the per-request overhead of MetricsMiddleware around a trivial ASGI
+app, and the per-statement overhead of the SQLAlchemy engine hooks on an
+in-memory SQLite engine, each against an uninstrumented baseline.
+
+Run from backend/:
+    python -m benchmarks.bench_metrics_overhead [--requests 20000] [--statements 20000]
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+
+from sqlalchemy import create_engine, text
+
+from middleware.metrics import MetricsMiddleware
+from services.metrics import RequestStats, current_request, instrument_engine
+
+BODY = b'{"Wish":"List"}'
+
+async def plain_app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': BODY, 'more_body': False})
+
+async def drive(app, count: int) -> float:
+    """Send `count` requests through an ASGI app; return seconds per request"""
+    route = SimpleNamespace(path='/wishlists/{wishlist_id}')
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/wishlists/1', 'headers': [], 'route': route}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / count
+
+def run_statements(engine, count: int) -> float:
+    """Execute `count` trivial statements; return seconds per statement"""
+    with engine.connect() as conn:
+        statement = text('SELECT 1')
+        start = time.perf_counter()
+        for _ in range(count):
+            conn.execute(statement).scalar()
+        return (time.perf_counter() - start) / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--statements', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    wrapped = MetricsMiddleware(plain_app)
+    baseline = min(loop.run_until_complete(drive(plain_app, args.requests)) for _ in range(args.rounds))
+    measured = min(loop.run_until_complete(drive(wrapped, args.requests)) for _ in range(args.rounds))
+    loop.close()
+    print(f"{'request (ASGI)':<24}{'baseline us':>14}{'instrumented us':>18}{'overhead us':>14}")
+    print(f"{'':<24}{baseline * 1e6:>14.2f}{measured * 1e6:>18.2f}{(measured - baseline) * 1e6:>14.2f}")
+
+    plain_engine = create_engine('sqlite://')
+    hooked_engine = create_engine('sqlite://')
+    instrument_engine(hooked_engine)
+    token = current_request.set(RequestStats())
+    baseline = min(run_statements(plain_engine, args.statements) for _ in range(args.rounds))
+    measured = min(run_statements(hooked_engine, args.statements) for _ in range(args.rounds))
+    current_request.reset(token)
+    print(f"{'statement (SQLite)':<24}{baseline * 1e6:>14.2f}{measured * 1e6:>18.2f}{(measured - baseline) * 1e6:>14.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Price refresh passes (services/price_refresh.py) against local stand-in shops.
+
+Starts one HTTP server per host on 127.0.0.1-127.0.0.<--hosts> (Linux routes
+all of 127/8 to loopback, so each is a separate domain to the refresher). Each
+serves --pages product pages with JSON-LD prices, after --latency-ms. A third
+of the pages send an ETag, a third Last-Modified, and a third no validators.
+Every page is linked from two items, so a pass must fetch each URL once.
+
+One item starts with a price its owner typed in. Pass 1 only records each
+page's price. Then 10% of the shop prices change, another item's price is
+edited by hand, and pass 2 runs. Checked:
+    - requests per pass equal distinct URLs; in-flight requests per host never
+      exceed --domain-concurrency
+    - pass 1 updates no item, so the typed-in price stays; after pass 2 the
+      items of changed pages carry the new shop price and no other item moved
+    - pass 2 gets 304s for unchanged pages with validators, skips parsing for
+      unchanged pages without, and only re-parses the changed ones
+
+Exits 1 on any failure. Point DATABASE_URL at a local Postgres with the
+schema, then from backend/:
+    python -m benchmarks.bench_price_refresh [--pages 300] [--hosts 4] [--latency-ms 20] [--domain-concurrency 2]
+"""
+import argparse
+import hashlib
+import ipaddress
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import delete, select, update
+
+import services.price_refresh as price_refresh
+import services.url_guard as url_guard
+from models.base import SessionLocal
+from models.item import WishListItem
+from models.scraped_page import ScrapedPage
+from models.user import User
+from models.wishlist import Wishlist
+
+EMAIL = 'price-refresh-bench@example.invalid'
+FILLER = '<p>' + 'lorem ipsum dolor sit amet ' * 40 + '</p>\n'
+
+class StandInShop:
+    """Product pages on one host, with counters for requests, bytes and peak concurrency"""
+
+    def __init__(self, host: str, pages: int, latency: float):
+        self.prices = {n: round(10 + n * 1.25, 2) for n in range(pages)}
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+        self.statuses = Counter()
+        self.bytes = 0
+        shop = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                shop.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, 0), Handler)
+        self.server.daemon_threads = True
+        self.base = f'http://{host}:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def page(self, n: int) -> bytes:
+        return (
+            f'<html><head><title>Product {n}</title><script type="application/ld+json">'
+            f'{{"@type": "Product", "name": "Product {n}", "offers": {{"price": "{self.prices[n]}"}}}}'
+            f'</script></head><body>{FILLER * 50}</body></html>'
+        ).encode()
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        # Counted over the simulated work only: a client may send its next request
+        # before this thread has finished returning from the last one
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+
+        n = int(request.path.rsplit('/', 1)[-1])
+        body = self.page(n)
+        version = hashlib.sha256(body).hexdigest()[:16]
+        headers = {}
+        if n % 3 == 0:
+            headers['ETag'] = f'"{version}"'
+            fresh = request.headers.get('If-None-Match') == headers['ETag']
+        elif n % 3 == 1:
+            # The version stands in for a modification time
+            headers['Last-Modified'] = formatdate(int(version[:8], 16), usegmt=True)
+            fresh = request.headers.get('If-Modified-Since') == headers['Last-Modified']
+        else:
+            fresh = False
+
+        status = 304 if fresh else 200
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        if fresh:
+            request.end_headers()
+        else:
+            request.send_header('Content-Type', 'text/html; charset=utf-8')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        with self.lock:
+            self.statuses[status] += 1
+            self.bytes += 0 if fresh else len(body)
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.peak = 0
+            self.statuses.clear()
+            self.bytes = 0
+
+def cleanup() -> None:
+    db = SessionLocal()
+    user_id = db.scalar(select(User.id).where(User.email == EMAIL))
+    if user_id is not None:
+        db.execute(delete(WishListItem).where(WishListItem.user_id == user_id))
+        db.execute(delete(Wishlist).where(Wishlist.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+    db.execute(delete(ScrapedPage).where(ScrapedPage.url.like('http://127.0.0.%')))
+    db.commit()
+    db.close()
+
+def seed(shops) -> uuid.UUID:
+    """Two items per page, all without a price except one the owner priced by hand; returns that one's id"""
+    db = SessionLocal()
+    user = User(email=EMAIL, username='price-refresh-bench', password='x')
+    db.add(user)
+    db.flush()
+    wishlist = Wishlist(user_id=user.id, title='Price refresh bench')
+    db.add(wishlist)
+    db.flush()
+    db.add_all(
+        WishListItem(user_id=user.id, wishlist_id=wishlist.id, name=f'Item {n}', url=f'{shop.base}/p/{n}')
+        for shop in shops for n in shop.prices for _ in range(2)
+    )
+    db.flush()
+    hand_priced = db.scalar(select(WishListItem.id).where(WishListItem.url == f'{shops[0].base}/p/1').limit(1))
+    db.execute(update(WishListItem).where(WishListItem.id == hand_priced).values(price=5.0))
+    db.commit()
+    db.close()
+    return hand_priced
+
+def item_prices() -> dict:
+    db = SessionLocal()
+    try:
+        user_id = db.scalar(select(User.id).where(User.email == EMAIL))
+        return {
+            (row.url, row.id): row.price
+            for row in db.execute(select(WishListItem.id, WishListItem.url, WishListItem.price).where(WishListItem.user_id == user_id))
+        }
+    finally:
+        db.close()
+
+def run_pass(shops, args, label: str) -> dict:
+    for shop in shops:
+        shop.reset_counters()
+    start = time.perf_counter()
+    counts = price_refresh.run_refresh_pass(
+        max_age_hours=0, batch_size=args.batch, concurrency=args.concurrency, domain_concurrency=args.domain_concurrency
+    )
+    elapsed = time.perf_counter() - start
+    statuses = sum((shop.statuses for shop in shops), Counter())
+    print(
+        f"{label:<8}{elapsed:>8.2f}s{statuses[200]:>7}{statuses[304]:>7}{sum(shop.bytes for shop in shops) / 1024:>10.0f}"
+        f"{max(shop.peak for shop in shops):>6}   {counts}"
+    )
+    return {'counts': counts, 'statuses': statuses, 'peak': max(shop.peak for shop in shops)}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=300, help='pages per host')
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--domain-concurrency', type=int, default=2)
+    args = parser.parse_args()
+
+    price_refresh.PRICE_REFRESH_DOMAIN_DELAY = 0
+    url_guard.TRUSTED_NETWORKS = [ipaddress.ip_network('127.0.0.0/8')]
+    shops = [StandInShop(f'127.0.0.{n + 1}', args.pages, args.latency_ms / 1e3) for n in range(args.hosts)]
+    urls = args.pages * args.hosts
+    failures = []
+
+    def check(condition: bool, message: str) -> None:
+        if not condition:
+            failures.append(message)
+
+    changed = set()
+
+    def check_prices(label: str, overrides: dict) -> None:
+        """Items of changed pages carry the shop price, the rest have none, except `overrides`"""
+        wrong = 0
+        for (url, item_id), price in item_prices().items():
+            shop = next(shop for shop in shops if url.startswith(shop.base))
+            expected = shop.prices[int(url.rsplit('/', 1)[-1])] if url in changed else None
+            wrong += price != overrides.get(item_id, expected)
+        check(not wrong, f'{label}: {wrong} item price(s) do not match')
+
+    cleanup()
+    hand_priced = seed(shops)
+    print(f"{urls} URLs on {args.hosts} hosts, 2 items each, {args.latency_ms:.0f} ms latency, "
+          f"{args.domain_concurrency} per domain")
+    print(f"{'pass':<8}{'time':>9}{'200s':>7}{'304s':>7}{'KiB sent':>10}{'peak':>6}   outcomes")
+    try:
+        first = run_pass(shops, args, 'initial')
+        check(sum(first['statuses'].values()) == urls, f"pass 1 made {sum(first['statuses'].values())} requests for {urls} URLs")
+        check(first['peak'] <= args.domain_concurrency, f"pass 1 peaked at {first['peak']} requests on one host")
+        check(not first['counts'].get('items_updated'), f"pass 1 updated {first['counts'].get('items_updated')} items")
+        check_prices('pass 1', {hand_priced: 5.0})
+
+        for shop in shops:
+            for n in list(shop.prices)[::10]:
+                shop.prices[n] += 1
+                changed.add(f'{shop.base}/p/{n}')
+        db = SessionLocal()
+        edited_url = f'{shops[0].base}/p/4'
+        edited_id = db.scalar(select(WishListItem.id).where(WishListItem.url == edited_url).limit(1))
+        db.execute(update(WishListItem).where(WishListItem.id == edited_id).values(price=1.0))
+        db.commit()
+        db.close()
+
+        second = run_pass(shops, args, 'refresh')
+        with_validators = sum(1 for shop in shops for n in shop.prices if n % 3 != 2 and f'{shop.base}/p/{n}' not in changed)
+        check(second['statuses'][304] == with_validators, f"pass 2 got {second['statuses'][304]} 304s, expected {with_validators}")
+        check(second['counts'].get('fetched') == len(changed), f"pass 2 parsed {second['counts'].get('fetched')} pages, {len(changed)} changed")
+        check(second['counts'].get('unchanged') == urls - with_validators - len(changed), 'pass 2 re-parsed unchanged pages')
+        check(second['peak'] <= args.domain_concurrency, f"pass 2 peaked at {second['peak']} requests on one host")
+        check(second['counts'].get('items_updated') == len(changed) * 2, f"pass 2 updated {second['counts'].get('items_updated')} items")
+        check_prices('pass 2', {hand_priced: 5.0, edited_id: 1.0})
+    finally:
+        cleanup()
+        for shop in shops:
+            shop.server.shutdown()
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    print('all checks passed' if not failures else f'{len(failures)} failure(s)')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+The scraper's per-domain circuit breaker against a local stand-in site.
+
+The site answers every request after --latency-ms, in one of three modes:
+a bot-check page (HTTP 200, "Robot Check" title), HTTP 503, or a product
+page. --scrapes user scrapes are run against it in each phase:
+
+    captcha    the circuit opens after SCRAPER_BREAKER_FAILURES requests; the
+               rest fail fast without reaching the site
+    probe      after the open period one probe goes through, fails, and the
+               circuit reopens for twice as long
+    recovered  the site is healthy again; the next probe closes the circuit
+    5xx        503s open it again
+
+First, with the guard in services/url_guard.py left as in production, scrapes
+of the stand-in site, a metadata address and a non-default port are refused
+without a request. Then 127.0.0.0/8 is trusted for the phases.
+
+Reported per phase: requests that reached the site, fail-fast responses and
+mean latency per scrape, then the scraper_circuit_* metrics. The 2-4 s pause
+after each real fetch is disabled so the phases run quickly. Exits 1 when a
+phase does not behave as described.
+
+Run from backend/:
+    python -m benchmarks.bench_scraper_breaker [--scrapes 20] [--latency-ms 100] [--open-seconds 0.5]
+"""
+import argparse
+import ipaddress
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+os.environ.setdefault('JWT_SECRET', 'benchmark-only-secret-of-at-least-32-bytes')
+
+import services.scraper as scraper
+import services.url_guard as url_guard
+from services.circuit_breaker import CLOSED, OPEN, CircuitBreaker, SCRAPER_BREAKER_FAILURES
+from services.metrics import metrics
+
+PAGES = {
+    'captcha': (200, b'<html><head><title>Robot Check</title></head><body>Enter the characters you see below</body></html>'),
+    '5xx': (503, b'<html><head><title>Service Unavailable</title></head><body></body></html>'),
+    'ok': (200, b'<html><head><title>Shop</title><meta property="og:title" content="Desk Lamp">'
+                b'<meta property="product:price:amount" content="39.00"></head><body></body></html>'),
+}
+
+class StandInSite:
+    def __init__(self, latency: float):
+        self.mode = 'captcha'
+        self.hits = 0
+        self.lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site.lock:
+                    site.hits += 1
+                time.sleep(latency)
+                status, body = PAGES[site.mode]
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}/product/1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+def run_phase(site: StandInSite, label: str, scrapes: int) -> dict:
+    hits_before = site.hits
+    fail_fast = 0
+    results = []
+    start = time.perf_counter()
+    for _ in range(scrapes):
+        result = scraper.scrape_url(site.url)
+        fail_fast += 'retry_after' in result
+        results.append(result)
+    elapsed = time.perf_counter() - start
+    breaker = scraper.scraper_breakers.get('127.0.0.1')
+    hits = site.hits - hits_before
+    print(f"{label:<10}{hits:>6}{fail_fast:>11}{elapsed / scrapes * 1000:>12.1f}   {breaker.state}")
+    return {'hits': hits, 'fail_fast': fail_fast, 'state': breaker.state, 'results': results}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scrapes', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--open-seconds', type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Registers the scraper_circuit_* gauges
+    import main as app_main  # noqa: F401
+
+    scraper.PAUSE_SECONDS = (0, 0)
+    scraper.scraper_breakers.factory = lambda key: CircuitBreaker(key, open_seconds=args.open_seconds, probes=1)
+    site = StandInSite(args.latency_ms / 1e3)
+    failures = []
+
+    def check(condition: bool, message: str) -> None:
+        if not condition:
+            failures.append(message)
+
+    for url in (site.url, 'http://169.254.169.254/latest/meta-data/', 'http://example.com:8080/'):
+        result = scraper.scrape_url(url)
+        check(result.get('error', '').startswith('Cannot fetch'), f'{url} was not refused: {result}')
+    check(site.hits == 0, f'{site.hits} refused request(s) reached the site')
+    check(not scraper.scraper_breakers.states(), 'refused URLs created circuit breakers')
+    url_guard.TRUSTED_NETWORKS = [ipaddress.ip_network('127.0.0.0/8')]
+
+    print(f"{'phase':<10}{'hits':>6}{'fail fast':>11}{'ms/scrape':>12}   state")
+    captcha = run_phase(site, 'captcha', args.scrapes)
+    check(captcha['hits'] == SCRAPER_BREAKER_FAILURES, f"{captcha['hits']} CAPTCHA requests reached the site before opening")
+    check(captcha['fail_fast'] == args.scrapes - SCRAPER_BREAKER_FAILURES, 'open circuit did not fail fast')
+    check(captcha['state'] == OPEN, 'circuit not open after repeated CAPTCHAs')
+
+    time.sleep(args.open_seconds)
+    probe = run_phase(site, 'probe', args.scrapes)
+    check(probe['hits'] == 1 and probe['state'] == OPEN, 'failed probe did not reopen the circuit')
+
+    site.mode = 'ok'
+    time.sleep(args.open_seconds * 2)
+    recovered = run_phase(site, 'recovered', args.scrapes)
+    check(recovered['hits'] == args.scrapes and recovered['state'] == CLOSED, 'successful probe did not close the circuit')
+    check(recovered['results'][-1].get('name') == 'Desk Lamp', f"unexpected scrape result {recovered['results'][-1]}")
+
+    site.mode = '5xx'
+    server_errors = run_phase(site, '5xx', args.scrapes)
+    check(server_errors['hits'] == SCRAPER_BREAKER_FAILURES and server_errors['state'] == OPEN, '5xx responses did not open the circuit')
+    site.server.shutdown()
+
+    print()
+    print('\n'.join(line for line in metrics.render().splitlines() if line.startswith('scraper_circuit')))
+    for failure in failures:
+        print(f'FAIL {failure}')
+    print('all checks passed' if not failures else f'{len(failures)} failure(s)')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
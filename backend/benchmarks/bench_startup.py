@@ -0,0 +1,101 @@
+"""
+Cold-start cost of importing the app, with an import-time profile.
+
+Spawns fresh interpreters running `import main` under `python -X importtime`
+and reports the median wall time (minus a bare interpreter start), the
+cumulative import time of `main`, and the heaviest packages it pulls in.
+The profile is written as JSON so it can be tracked; --compare prints the
+change against an earlier profile.
+
+Run from backend/:
+    python -m benchmarks.bench_startup [--runs 7] [--top 15] [--output startup_profile.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENV_DEFAULTS = {
+    'DATABASE_URL': 'postgresql+psycopg2://localhost/benchmark',
+    'JWT_SECRET': 'benchmark-only-secret-of-at-least-32-bytes',
+    'AWS_REGION': 'us-east-1',
+    'AWS_BUCKET_NAME': 'benchmark',
+}
+
+def run_once(code: str, importtime: bool) -> tuple:
+    env = {**ENV_DEFAULTS, **os.environ, 'PYTHONDONTWRITEBYTECODE': '0'}
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, completed.stderr
+
+def parse_importtime(stderr: str) -> dict:
+    """Cumulative microseconds per top-level package (e.g. boto3, PIL), wherever it was first imported"""
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        name = name.strip()
+        if '.' not in name and not name.startswith('_'):
+            packages[name] += int(cumulative)
+    return dict(packages)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', default=None, help='write the profile as JSON')
+    parser.add_argument('--compare', default=None, help='earlier profile JSON to diff against')
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so every measured run reads .pyc files, as a deployed app would
+    run_once('import main', importtime=False)
+
+    interpreter = statistics.median(run_once('pass', importtime=False)[0] for _ in range(args.runs))
+    walls, profiles = [], []
+    for _ in range(args.runs):
+        wall, stderr = run_once('import main', importtime=True)
+        walls.append(wall)
+        profiles.append(parse_importtime(stderr))
+
+    modules = {name: statistics.median(profile.get(name, 0) for profile in profiles) for name in profiles[0]}
+    heaviest = sorted(((name, us) for name, us in modules.items() if name != 'main'), key=lambda item: -item[1])
+    result = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'import_main_wall_ms': round((statistics.median(walls) - interpreter) * 1e3, 1),
+        'import_main_cumulative_ms': round(modules.get('main', 0) / 1e3, 1),
+        'top_imports_ms': {name: round(us / 1e3, 1) for name, us in heaviest[:args.top]},
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)
+
+    def delta(key):
+        if previous is None or key not in previous:
+            return ''
+        return f"   (was {previous[key]:.1f} ms, {result[key] - previous[key]:+.1f} ms)"
+
+    print(f"import main, wall minus interpreter start: {result['import_main_wall_ms']:.1f} ms{delta('import_main_wall_ms')}")
+    print(f"import main, cumulative import time:       {result['import_main_cumulative_ms']:.1f} ms{delta('import_main_cumulative_ms')}")
+    print(f"\n{'heaviest packages (cumulative, nested overlap)':<48}{'ms':>8}")
+    for name, ms in result['top_imports_ms'].items():
+        print(f"{name:<48}{ms:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(result, handle, indent=2)
+            handle.write('\n')
+        print(f"\nprofile written to {args.output}")
+
+if __name__ == '__main__':
+    main()
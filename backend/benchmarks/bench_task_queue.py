@@ -0,0 +1,110 @@
+"""
+Throughput of the Postgres task queue (services/tasks.py).
+
+Enqueues --tasks no-op tasks, then drains them with a TaskWorker for each
+thread count in --threads, reporting enqueue rate, drain rate and how many
+tasks ran more than once (must be 0: SKIP LOCKED hands each task to one
+worker). --work-ms adds a sleep per task to imitate an S3 call, and
+--fail-rate makes that share of first attempts fail so retries are exercised.
+Benchmark tasks are deleted afterwards.
+
+Point DATABASE_URL at a local Postgres with the schema, then from backend/:
+    python -m benchmarks.bench_task_queue [--tasks 5000] [--threads 1,4,16] [--batch 1] [--work-ms 0]
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import delete, func, select
+
+import services.tasks as tasks
+from models.base import SessionLocal
+from models.task import Task, TaskStatus
+
+KIND = 'bench.noop'
+
+def register_handler(work_seconds: float, fail_rate: float) -> Counter:
+    runs = Counter()
+    lock = threading.Lock()
+
+    @tasks.task_handler(KIND)
+    def _noop(payload: dict) -> None:
+        with lock:
+            runs[payload['n']] += 1
+            first = runs[payload['n']] == 1
+        if work_seconds:
+            time.sleep(work_seconds)
+        if first and random.random() < fail_rate:
+            raise RuntimeError('injected failure')
+    return runs
+
+def enqueue_tasks(count: int, run: int) -> float:
+    """Enqueue one task per transaction, as a route would; returns tasks per second"""
+    db = SessionLocal()
+    start = time.perf_counter()
+    for n in range(count):
+        tasks.enqueue(db, KIND, {'n': n}, idempotency_key=f'{KIND}:{run}:{n}')
+        db.commit()
+    elapsed = time.perf_counter() - start
+    # Duplicates are dropped by the idempotency key
+    tasks.enqueue(db, KIND, {'n': 0}, idempotency_key=f'{KIND}:{run}:0')
+    db.commit()
+    db.close()
+    return count / elapsed
+
+def outstanding() -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(Task).where(
+            Task.kind == KIND, Task.status.in_((TaskStatus.PENDING, TaskStatus.RUNNING))
+        ))
+    finally:
+        db.close()
+
+def cleanup() -> None:
+    db = SessionLocal()
+    db.execute(delete(Task).where(Task.kind == KIND))
+    db.commit()
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=5000)
+    parser.add_argument('--threads', default='1,4,16', help='comma-separated worker thread counts')
+    parser.add_argument('--batch', type=int, default=1, help='tasks claimed per query')
+    parser.add_argument('--work-ms', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Retries of injected failures become due almost at once
+    if args.fail_rate:
+        tasks.TASK_BACKOFF_BASE = 0.01
+    runs = register_handler(args.work_ms / 1e3, args.fail_rate)
+
+    cleanup()
+    print(f"{'threads':>8}{'batch':>7}{'enqueue/s':>12}{'drain/s':>10}{'runs':>8}{'repeated':>10}")
+    try:
+        for run, threads in enumerate(int(value) for value in args.threads.split(',')):
+            runs.clear()
+            enqueue_rate = enqueue_tasks(args.tasks, run)
+
+            worker = tasks.TaskWorker(threads=threads, batch_size=args.batch, poll_seconds=0.01)
+            start = time.perf_counter()
+            worker.start()
+            while outstanding():
+                time.sleep(0.02)
+            elapsed = time.perf_counter() - start
+            worker.stop()
+            worker.join()
+
+            # With injected failures a task legitimately runs twice; anything beyond that is a double claim
+            allowed = 2 if args.fail_rate else 1
+            repeated = sum(1 for count in runs.values() if count > allowed)
+            print(f"{threads:>8}{args.batch:>7}{enqueue_rate:>12.0f}{args.tasks / elapsed:>10.0f}{sum(runs.values()):>8}{repeated:>10}")
+    finally:
+        cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+End-to-end load test: the real app over HTTP, a local Postgres and an in-process S3 stand-in.
+
+Seeds synthetic users, friendships, friend requests, saved wishlists and
+items at the requested scale, starts the app with uvicorn in a background
+thread (S3 replaced by an in-memory stub), then runs --concurrency virtual
+users for --duration seconds. Each one repeatedly picks a weighted scenario:
+
+    home           GET /home/
+    shared         GET /wishlists/public/{id}/snapshot, then the share page
+    claim          claim an item as a guest, unclaim it if the claim won
+    search         GET /friends/search-many
+    upload         create an item with an image, then delete it
+
+Latency percentiles (p50/p95/p99) and throughput are reported per endpoint
+and written as JSON; pass --compare with an earlier file to print deltas.
+Seeded rows are deleted at the end unless --keep is given.
+
+Point DATABASE_URL at a local Postgres with the schema, then from backend/:
+    python -m benchmarks.loadtest --users 200 --wishlists 3 --items 20 --concurrency 20 --duration 30
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+os.environ.setdefault('AWS_BUCKET_NAME', 'loadtest')
+
+import httpx
+import uvicorn
+from botocore.exceptions import ClientError
+from PIL import Image
+from sqlalchemy import delete, insert, select
+
+import services.s3_service
+from main import app
+from models.base import SessionLocal
+from models.item import WishListItem
+from models.saved_wishlist import SavedWishlist
+from models.user import User
+from models.user_relationship import RelationshipStatus, UserRelationship
+from models.wishlist import Wishlist
+from routes.auth import create_access_token
+
+SCENARIO_WEIGHTS = {'home': 30, 'shared': 30, 'claim': 15, 'search': 15, 'upload': 10}
+INSERT_BATCH = 5000
+
+class StubS3:
+    """Just enough of the boto3 S3 client for the API: objects live in a dict"""
+
+    def __init__(self):
+        self.objects: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, ContentType='application/octet-stream', **kwargs):
+        with self._lock:
+            self.objects[Key] = (Body.read() if hasattr(Body, 'read') else bytes(Body), ContentType)
+        return {}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            stored = self.objects.get(Key)
+        if stored is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, 'GetObject')
+        return {'Body': io.BytesIO(stored[0]), 'ContentType': stored[1]}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+def install_s3_stub(stub: StubS3) -> None:
+    # Routes fetch the client through get_s3_client(), so seeding the lazy slot is enough
+    services.s3_service._s3_client = stub
+
+def _insert_batched(db, model, rows: List[dict]) -> None:
+    for start in range(0, len(rows), INSERT_BATCH):
+        db.execute(insert(model), rows[start:start + INSERT_BATCH])
+
+def seed(run: str, users: int, wishlists: int, items: int, friends: int, saved: int) -> dict:
+    """Insert the synthetic data set with bulk inserts; returns ids the scenarios draw from"""
+    rng = random.Random(run)
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    user_rows = [
+        {'id': user_id, 'email': f'load-{run}-{i}@example.com', 'username': f'load-{run}-{i}',
+         'password': 'x', 'name': f'Load User {i}'}
+        for i, user_id in enumerate(user_ids)
+    ]
+
+    wishlist_rows, item_rows, wishlists_by_user = [], [], defaultdict(list)
+    for user_id in user_ids:
+        for w in range(wishlists):
+            wishlist_id = uuid.uuid4()
+            wishlists_by_user[user_id].append(wishlist_id)
+            wishlist_rows.append({'id': wishlist_id, 'user_id': user_id, 'title': f'List {w}', 'is_public': w % 4 != 3})
+            for i in range(items):
+                item_rows.append({
+                    'id': uuid.uuid4(), 'user_id': user_id, 'wishlist_id': wishlist_id, 'name': f'Item {i}',
+                    'price': round(rng.uniform(5, 200), 2), 'priority': rng.randint(0, 5),
+                    'url': f'https://www.amazon.com/dp/B0{rng.randint(10**7, 10**8 - 1)}',
+                })
+    public_wishlists = [row['id'] for row in wishlist_rows if row['is_public']]
+    owner_of = {row['id']: row['user_id'] for row in wishlist_rows}
+
+    relationship_rows, pairs = [], set()
+    for user_id in user_ids:
+        for friend_id in rng.sample(user_ids, min(friends, users - 1)):
+            pair = frozenset((user_id, friend_id))
+            if friend_id == user_id or pair in pairs:
+                continue
+            pairs.add(pair)
+            status = RelationshipStatus.PENDING if rng.random() < 0.2 else RelationshipStatus.ACCEPTED
+            relationship_rows.append({'id': uuid.uuid4(), 'user_id': user_id, 'friend_id': friend_id, 'status': status})
+
+    saved_rows = []
+    for user_id in user_ids:
+        candidates = [wishlist_id for wishlist_id in rng.sample(public_wishlists, min(saved * 2, len(public_wishlists)))
+                      if owner_of[wishlist_id] != user_id]
+        saved_rows += [{'id': uuid.uuid4(), 'user_id': user_id, 'wishlist_id': wishlist_id} for wishlist_id in candidates[:saved]]
+
+    db = SessionLocal()
+    try:
+        _insert_batched(db, User, user_rows)
+        _insert_batched(db, Wishlist, wishlist_rows)
+        _insert_batched(db, WishListItem, item_rows)
+        _insert_batched(db, UserRelationship, relationship_rows)
+        _insert_batched(db, SavedWishlist, saved_rows)
+        db.commit()
+    finally:
+        db.close()
+
+    public_set = set(public_wishlists)
+    return {
+        'tokens': {user_id: create_access_token({'sub': user_id}) for user_id in user_ids},
+        'wishlists_by_user': wishlists_by_user,
+        'public_wishlists': public_wishlists,
+        'public_items': [row['id'] for row in item_rows if row['wishlist_id'] in public_set],
+        'counts': {'users': len(user_rows), 'wishlists': len(wishlist_rows), 'items': len(item_rows),
+                   'relationships': len(relationship_rows), 'saved': len(saved_rows)},
+    }
+
+def cleanup(run: str) -> None:
+    """Delete everything owned by this run's users"""
+    db = SessionLocal()
+    try:
+        run_users = select(User.id).where(User.username.like(f'load-{run}-%')).scalar_subquery()
+        db.execute(delete(SavedWishlist).where(SavedWishlist.user_id.in_(run_users)))
+        db.execute(delete(UserRelationship).where(UserRelationship.user_id.in_(run_users)))
+        db.execute(delete(WishListItem).where(WishListItem.user_id.in_(run_users)))
+        db.execute(delete(Wishlist).where(Wishlist.user_id.in_(run_users)))
+        db.execute(delete(User).where(User.username.like(f'load-{run}-%')))
+        db.commit()
+    finally:
+        db.close()
+
+def start_server() -> tuple:
+    """Run the app with uvicorn in a daemon thread on a free local port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning', access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f'http://127.0.0.1:{port}'
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                   ok=(200,), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[label].append(time.perf_counter() - start)
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code not in ok:
+            self.errors[label] += 1
+        return response
+
+async def scenario_home(client, recorder, data, rng, user_id):
+    await recorder.call(client, 'GET /home/', 'GET', '/home/', headers=_auth(data, user_id))
+
+async def scenario_shared(client, recorder, data, rng, user_id):
+    wishlist_id = rng.choice(data['public_wishlists'])
+    await recorder.call(client, 'GET /wishlists/public/{id}/snapshot', 'GET', f'/wishlists/public/{wishlist_id}/snapshot')
+    await recorder.call(client, 'GET /wishlists/shared/{id}', 'GET', f'/wishlists/shared/{wishlist_id}')
+
+async def scenario_claim(client, recorder, data, rng, user_id):
+    item_id = rng.choice(data['public_items'])
+    guest = {'guest_name': f'guest-{rng.getrandbits(32):x}'}
+    claimed = await recorder.call(client, 'POST /wishlist/{id}/claim', 'POST', f'/wishlist/{item_id}/claim', ok=(200, 409), json=guest)
+    if claimed is not None and claimed.status_code == 200:
+        await recorder.call(client, 'DELETE /wishlist/{id}/claim', 'DELETE', f'/wishlist/{item_id}/claim', json=guest)
+
+async def scenario_search(client, recorder, data, rng, user_id):
+    query = f"load-{data['run']}-{rng.randint(0, 99)}"
+    await recorder.call(client, 'GET /friends/search-many', 'GET', '/friends/search-many',
+                        params={'query': query}, headers=_auth(data, user_id))
+
+async def scenario_upload(client, recorder, data, rng, user_id):
+    wishlist_id = rng.choice(data['wishlists_by_user'][user_id])
+    created = await recorder.call(
+        client, 'POST /wishlist/ (image)', 'POST', '/wishlist/', headers=_auth(data, user_id),
+        data={'name': 'Uploaded', 'wishlist_id': str(wishlist_id)},
+        files={'image': ('photo.jpg', data['image'], 'image/jpeg')},
+    )
+    if created is not None and created.status_code == 200:
+        await recorder.call(client, 'DELETE /wishlist/{id}', 'DELETE', f"/wishlist/{created.json()['id']}", headers=_auth(data, user_id))
+
+SCENARIOS = {
+    'home': scenario_home,
+    'shared': scenario_shared,
+    'claim': scenario_claim,
+    'search': scenario_search,
+    'upload': scenario_upload,
+}
+
+def _auth(data: dict, user_id) -> dict:
+    return {'Authorization': f"Bearer {data['tokens'][user_id]}"}
+
+async def drive(base_url: str, data: dict, concurrency: int, duration: float, seed_value: int) -> Recorder:
+    recorder = Recorder()
+    names = list(SCENARIO_WEIGHTS)
+    weights = [SCENARIO_WEIGHTS[name] for name in names]
+    user_ids = list(data['tokens'])
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed_value + index)
+        user_id = rng.choice(user_ids)
+        while time.perf_counter() < deadline:
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            await scenario(client, recorder, data, rng, user_id)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    return recorder
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float], errors: int, duration: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / duration, 2),
+        'p50_ms': round(percentile(ordered, 0.50) * 1e3, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1e3, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1e3, 2),
+    }
+
+def print_report(results: dict, baseline: Optional[dict]) -> None:
+    header = f"{'endpoint':<40}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header + ('   p95 / rps vs baseline' if baseline else ''))
+    rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+    for label, stats in rows:
+        line = (f"{label:<40}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+        previous = (baseline or {}).get('endpoints', {}).get(label) if label != 'TOTAL' else (baseline or {}).get('total')
+        if previous:
+            p95 = (stats['p95_ms'] / previous['p95_ms'] - 1) * 100 if previous['p95_ms'] else 0.0
+            rps = (stats['throughput_rps'] / previous['throughput_rps'] - 1) * 100 if previous['throughput_rps'] else 0.0
+            line += f"   {p95:+6.1f}% / {rps:+6.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--wishlists', type=int, default=3, help='wishlists per user')
+    parser.add_argument('--items', type=int, default=20, help='items per wishlist')
+    parser.add_argument('--friends', type=int, default=10, help='relationships started per user')
+    parser.add_argument('--saved', type=int, default=5, help='saved wishlists per user')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='JSON results path (default loadtest-<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='earlier JSON results to diff against')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded rows')
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    install_s3_stub(StubS3())
+
+    image = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 40, 40)).save(image, format='JPEG', quality=85)
+
+    print(f"seeding run {run} ...")
+    start = time.perf_counter()
+    data = seed(run, args.users, args.wishlists, args.items, args.friends, args.saved)
+    data['run'] = run
+    data['image'] = image.getvalue()
+    print(f"seeded {data['counts']} in {time.perf_counter() - start:.1f}s")
+
+    server, thread, base_url = start_server()
+    try:
+        recorder = asyncio.run(drive(base_url, data, args.concurrency, args.duration, args.seed))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        if not args.keep:
+            cleanup(run)
+
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    results = {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'keep')},
+        'dataset': data['counts'],
+        'endpoints': {
+            label: summarize(values, recorder.errors[label], args.duration)
+            for label, values in sorted(recorder.latencies.items())
+        },
+        'total': summarize(all_latencies, sum(recorder.errors.values()), args.duration),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+    print_report(results, baseline)
+
+    output = args.output or f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == '__main__':
+    main()
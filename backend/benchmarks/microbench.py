@@ -0,0 +1,202 @@
+"""
+Micro-benchmarks for the CPU-heavy helpers, with a stored baseline and regression check.
+
+Each benchmark is timed with timeit (auto-ranged loop count, --repeat rounds)
+and reported as the best and median time per call:
+
+    remove_white_background    _remove_white_background on a 512x512 product photo
+    normalize_image_12mp       ingest normalization of a 4032x3024 phone JPEG with EXIF rotation
+    parse_product_page         scraper parsing of a saved product page (fixtures/)
+    build_wishlist_response    one wishlist row to a response dict
+    item_responses_100         100 projected item rows validated and dumped to JSON
+    create_access_token        JWT encode
+    get_current_user           JWT decode through the auth dependency
+    get_password_hash          bcrypt hash (default cost)
+
+    python -m benchmarks.microbench                         # run and print
+    python -m benchmarks.microbench --save                  # rewrite the baseline
+    python -m benchmarks.microbench --compare [--threshold 0.25]
+
+--compare exits 1 when a median is more than --threshold slower than the
+baseline. Baselines are machine-specific; record one on the machine you
+compare on.
+
+Run from backend/.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import uuid
+from datetime import date, datetime, timezone
+from typing import Callable, Dict
+
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/benchmark')
+os.environ.setdefault('JWT_SECRET', 'benchmark-only-secret-of-at-least-32-bytes')
+
+from PIL import Image, ImageDraw
+
+from benchmarks.bench_json_encoding import make_items
+from middleware.auth import get_current_user
+from models.wishlist import Wishlist
+from routes.auth import create_access_token, get_password_hash
+from routes.items import _remove_white_background
+from routes.wishlists import build_wishlist_response
+from services.images import normalize_image
+from services.scraper import parse_product_page
+from services.serialization import item_list_adapter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, 'microbench_baseline.json')
+FIXTURE_PAGE = os.path.join(HERE, 'fixtures', 'amazon_product.html')
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+def benchmark(name: str):
+    """Register a factory that does the setup and returns the zero-argument call to time"""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+@benchmark('remove_white_background')
+def _bench_remove_white_background():
+    image = Image.new('RGB', (512, 512), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((96, 96, 416, 416), fill=(30, 90, 200))
+    draw.rectangle((200, 40, 312, 140), fill=(250, 250, 247))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    data = buffer.getvalue()
+    return lambda: _remove_white_background(data)
+
+def phone_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """A camera-sized JPEG with smooth gradients, some detail and an EXIF orientation tag"""
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, width, 97):
+        draw.line((i, 0, width - i, height), fill=(i % 255, 120, 200 - i % 200), width=3)
+    draw.ellipse((width // 4, height // 4, width // 2, height // 2), fill=(220, 60, 40))
+    exif = Image.Exif()
+    exif[0x0112] = 6    # Orientation: rotate 90 CW
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=92, exif=exif)
+    return buffer.getvalue()
+
+@benchmark('normalize_image_12mp')
+def _bench_normalize_image():
+    data = phone_photo()
+    return lambda: normalize_image(data)
+
+@benchmark('parse_product_page')
+def _bench_parse_product_page():
+    with open(FIXTURE_PAGE, 'rb') as handle:
+        content = handle.read()
+    return lambda: parse_product_page(content, 'https://www.amazon.com/dp/B000000000')
+
+@benchmark('build_wishlist_response')
+def _bench_build_wishlist_response():
+    now = datetime.now(timezone.utc)
+    wishlist = Wishlist(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), title='Birthday', description='Things I would love',
+        color='#ff5733', is_public=True, thumbnail_type='icon', thumbnail_icon='gift',
+        use_item_colors=False, default_view='list', due_date=date(2026, 12, 25)
+    )
+    wishlist.created_at = now
+    wishlist.updated_at = now
+    return lambda: build_wishlist_response(wishlist, 12)
+
+@benchmark('item_responses_100')
+def _bench_item_responses():
+    rows = make_items(100)
+    return lambda: item_list_adapter.dump_json(item_list_adapter.validate_python(rows))
+
+@benchmark('create_access_token')
+def _bench_create_access_token():
+    user_id = uuid.uuid4()
+    return lambda: create_access_token({'sub': user_id})
+
+@benchmark('get_current_user')
+def _bench_get_current_user():
+    authorization = f"Bearer {create_access_token({'sub': uuid.uuid4()})}"
+
+    def decode():
+        # The dependency never awaits, so drive the coroutine to completion by hand
+        coroutine = get_current_user(authorization)
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return done.value
+    return decode
+
+@benchmark('get_password_hash')
+def _bench_get_password_hash():
+    return lambda: get_password_hash('correct horse battery staple')
+
+def run(name: str, repeat: int) -> dict:
+    call = BENCHMARKS[name]()
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange()
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {'best_s': min(per_call), 'median_s': statistics.median(per_call), 'loops': number}
+
+def _format(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.3f} ms'
+    return f'{seconds * 1e6:.2f} us'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='compare against the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown of the median, as a fraction')
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)['results']
+
+    results, regressions = {}, []
+    print(f"{'benchmark':<26}{'best':>14}{'median':>14}" + (f"{'baseline':>14}{'change':>10}" if args.compare else ''))
+    for name in names:
+        result = results[name] = run(name, args.repeat)
+        line = f"{name:<26}{_format(result['best_s']):>14}{_format(result['median_s']):>14}"
+        previous = baseline.get(name)
+        if previous:
+            change = result['median_s'] / previous['median_s'] - 1
+            flag = '  REGRESSION' if change > args.threshold else ''
+            line += f"{_format(previous['median_s']):>14}{change * 100:>+9.1f}%{flag}"
+            if flag:
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(args.baseline, 'w') as handle:
+            json.dump({
+                'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': f'{platform.system()} {platform.machine()}',
+                'results': results,
+            }, handle, indent=2)
+            handle.write('\n')
+        print(f"baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Query budgets: catch N+1 regressions by counting the SQL each route issues.
+
+Seeds a local database with users, wishlists, items, claims, a pending friend
+request and saved wishlists, then calls every budgeted route once through the
+app (public response cache cleared first, so the cold path is measured) and
+counts statements with an engine hook. Seeding uses several wishlists and
+items per wishlist so a per-row query shows up as an overrun.
+
+Routes over budget are listed with the SQL they ran and the script exits 1.
+Seeded rows are deleted afterwards.
+
+Point DATABASE_URL at a local Postgres with the schema, then from backend/:
+    python -m benchmarks.query_budget [--wishlists 5] [--items 10] [--verbose]
+"""
+import argparse
+import sys
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from main import app
+from models.base import SessionLocal, engine
+from models.item import WishListItem
+from models.saved_wishlist import SavedWishlist
+from models.user import User
+from models.user_relationship import RelationshipStatus, UserRelationship
+from models.wishlist import Wishlist
+from routes.auth import create_access_token
+from services.response_cache import public_cache
+
+# (method, path template) -> maximum statements per request, independent of row counts
+ROUTE_QUERY_BUDGETS: Dict[Tuple[str, str], int] = {
+    ('GET', '/wishlists/'): 2,                          # version + listing with counts
+    ('GET', '/wishlists/{wishlist_id}'): 2,
+    ('GET', '/wishlists/user/{user_id}'): 1,
+    ('GET', '/wishlists/public/{wishlist_id}'): 2,
+    ('GET', '/wishlists/public/{wishlist_id}/snapshot'): 2,
+    ('GET', '/wishlists/{wishlist_id}/snapshot'): 2,
+    ('GET', '/wishlist/items/{wishlist_id}'): 2,        # version + item projection
+    ('GET', '/wishlist/public/{wishlist_id}'): 2,
+    ('GET', '/wishlist/claimed/my-items'): 1,
+    ('GET', '/friends/requests'): 1,
+    ('GET', '/friends/wishlists'): 1,
+    ('GET', '/users/me'): 1,
+    ('GET', '/users/public/{user_id}'): 1,
+    ('GET', '/home/'): 5,                               # one per section
+}
+
+@contextmanager
+def record_statements(target=engine):
+    """Collect the SQL text of every statement executed on the engine while active"""
+    statements: List[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(target, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(target, 'before_cursor_execute', _record)
+
+def seed(wishlists: int, items: int) -> dict:
+    """Owner with public wishlists full of items, a friend who saved and claimed, a pending requester"""
+    db = SessionLocal()
+    suffix = uuid.uuid4().hex[:8]
+    users = [
+        User(email=f'budget-{role}-{suffix}@example.com', username=f'budget-{role}-{suffix}', password='x', name=role)
+        for role in ('owner', 'friend', 'requester')
+    ]
+    db.add_all(users)
+    db.flush()
+    owner, friend, requester = users
+
+    wishlist_rows = [Wishlist(user_id=owner.id, title=f'List {i}', is_public=True) for i in range(wishlists)]
+    db.add_all(wishlist_rows)
+    db.flush()
+    for wishlist in wishlist_rows:
+        db.add_all([
+            WishListItem(
+                user_id=owner.id, wishlist_id=wishlist.id, name=f'Item {i}',
+                claimed_by_user_id=friend.id if i % 3 == 0 else None
+            )
+            for i in range(items)
+        ])
+        db.add(SavedWishlist(user_id=friend.id, wishlist_id=wishlist.id))
+    db.add(UserRelationship(user_id=owner.id, friend_id=friend.id, status=RelationshipStatus.ACCEPTED))
+    db.add(UserRelationship(user_id=requester.id, friend_id=owner.id, status=RelationshipStatus.PENDING))
+    db.add(UserRelationship(user_id=requester.id, friend_id=friend.id, status=RelationshipStatus.PENDING))
+    db.commit()
+
+    seeded = {
+        'user_ids': [user.id for user in users],
+        'owner_id': owner.id,
+        'friend_id': friend.id,
+        'wishlist_id': wishlist_rows[0].id,
+    }
+    db.close()
+    return seeded
+
+def cleanup(user_ids: List[uuid.UUID]) -> None:
+    db = SessionLocal()
+    db.execute(delete(SavedWishlist).where(SavedWishlist.user_id.in_(user_ids)))
+    db.execute(delete(UserRelationship).where(UserRelationship.user_id.in_(user_ids) | UserRelationship.friend_id.in_(user_ids)))
+    db.execute(delete(WishListItem).where(WishListItem.user_id.in_(user_ids)))
+    db.execute(delete(Wishlist).where(Wishlist.user_id.in_(user_ids)))
+    db.execute(delete(User).where(User.id.in_(user_ids)))
+    db.commit()
+    db.close()
+
+def requests_for(seeded: dict) -> List[Tuple[str, str, str, uuid.UUID]]:
+    """(method, template, concrete path, acting user) for every budgeted route"""
+    owner, friend, wishlist = seeded['owner_id'], seeded['friend_id'], seeded['wishlist_id']
+    acting = {
+        '/wishlist/claimed/my-items': friend,
+        '/friends/requests': friend,
+        '/friends/wishlists': friend,
+    }
+    plan = []
+    for method, template in ROUTE_QUERY_BUDGETS:
+        path = template.format(wishlist_id=wishlist, user_id=owner)
+        plan.append((method, template, path, acting.get(template, owner)))
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wishlists', type=int, default=5)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--verbose', action='store_true', help='list the SQL of every route, not only overruns')
+    args = parser.parse_args()
+
+    seeded = seed(args.wishlists, args.items)
+    client = TestClient(app)
+    failures = 0
+    try:
+        print(f"{'route':<48}{'statements':>12}{'budget':>8}")
+        for method, template, path, user_id in requests_for(seeded):
+            headers = {'Authorization': f"Bearer {create_access_token({'sub': user_id})}"}
+            public_cache.clear()
+            with record_statements() as statements:
+                response = client.request(method, path, headers=headers)
+            budget = ROUTE_QUERY_BUDGETS[(method, template)]
+            over = len(statements) > budget
+            failures += over or response.status_code >= 400
+            status = 'OVER' if over else ('HTTP %d' % response.status_code if response.status_code >= 400 else 'ok')
+            print(f"{method + ' ' + template:<48}{len(statements):>12}{budget:>8}  {status}")
+            if over or args.verbose:
+                for number, statement in enumerate(statements, 1):
+                    print(f"    {number:>3}. {' '.join(statement.split())}")
+    finally:
+        cleanup(seeded['user_ids'])
+
+    print(f"{failures} route(s) failed" if failures else "all routes within budget")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Concurrency stress test for claiming and unclaiming one item.
+
+Registers a throwaway user against a running API, creates a public wishlist
+with one item, then fires many simultaneous claim requests from distinct
+guests. Exactly one claim must succeed and every other one must get 409.
+The winner then unclaims while the losers try to unclaim too; only the
+winner may succeed. Repeated for --rounds rounds.
+
+Start the API against a local Postgres, then from backend/:
+    python -m benchmarks.stress_claim --base-url http://localhost:8000 --clients 50 --rounds 10
+"""
+import argparse
+import sys
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+def setup_item(base_url: str) -> str:
+    """Create a user, a public wishlist and one item; return the item id"""
+    suffix = uuid.uuid4().hex[:8]
+    registered = requests.post(f"{base_url}/auth/register", data={
+        'email': f'stress-{suffix}@example.com',
+        'username': f'stress-{suffix}',
+        'password': uuid.uuid4().hex,
+    }, timeout=30)
+    registered.raise_for_status()
+    headers = {'Authorization': f"Bearer {registered.json()['access_token']}"}
+
+    wishlist = requests.post(f"{base_url}/wishlists/", data={'title': 'Stress', 'is_public': 'true'}, headers=headers, timeout=30)
+    wishlist.raise_for_status()
+    item = requests.post(f"{base_url}/wishlist/", data={'name': 'Contested gift', 'wishlist_id': wishlist.json()['id']}, headers=headers, timeout=30)
+    item.raise_for_status()
+    return item.json()['id']
+
+def hammer(clients: int, request_fn) -> list:
+    """Release all clients at once through a barrier and collect status codes"""
+    barrier = threading.Barrier(clients)
+
+    def worker(index: int) -> int:
+        session = requests.Session()
+        barrier.wait()
+        return request_fn(session, index)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(worker, range(clients)))
+
+def run_round(base_url: str, item_id: str, clients: int) -> bool:
+    claim_url = f"{base_url}/wishlist/{item_id}/claim"
+
+    claim_statuses = hammer(clients, lambda session, i: session.post(
+        claim_url, json={'guest_name': f'guest-{i}'}, timeout=30
+    ).status_code)
+    claims = Counter(claim_statuses)
+
+    winner = claim_statuses.index(200) if 200 in claim_statuses else None
+    unclaim_statuses = hammer(clients, lambda session, i: session.delete(
+        claim_url, json={'guest_name': f'guest-{i}'}, timeout=30
+    ).status_code)
+    unclaims = Counter(unclaim_statuses)
+
+    ok = (
+        winner is not None
+        and claims[200] == 1 and claims[409] == clients - 1
+        and unclaims[200] == 1 and unclaims[403] == clients - 1
+        and unclaim_statuses[winner] == 200
+    )
+    print(f"claims {dict(claims)}  unclaims {dict(unclaims)}  {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip('/')
+    item_id = setup_item(base_url)
+    results = [run_round(base_url, item_id, args.clients) for _ in range(args.rounds)]
+    failed = results.count(False)
+    print(f"{args.rounds - failed}/{args.rounds} rounds had exactly one winner")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -10,13 +10,30 @@ TODO
 """
 
 
-from fastapi import FastAPI
+# First: models.base loads .env, and the middleware, routes and services below read their configuration at import
+from models.base import engine
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
-from routes import items, users, auth, wishlists, relationships
+from fastapi.responses import PlainTextResponse
+from middleware.auth import require_internal_token
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import MetricsMiddleware
+from routes import items, users, auth, wishlists, relationships, home, events
+from services.circuit_breaker import STATE_VALUES
+from services.scraper import scraper_breakers
+from services.serialization import FastJSONResponse
+from services.events import event_bus
+from services.images import ingest_stats
+from services.metrics import instrument_engine, labelled, metrics
+from services.response_cache import public_cache
 
 app = FastAPI(
     title='Wishlist API',
-    openapi_url='/openapi.json',)
+    openapi_url='/openapi.json',
+    # Wrapped in Default so routes with a response_model keep FastAPI's
+    # direct-to-bytes serialization; everything else renders with orjson
+    default_response_class=Default(FastJSONResponse),)
 
 # CORS
 
@@ -44,13 +61,59 @@ app.add_middleware(
     ],
 )
 
+# Compression (brotli/gzip), skipping small and already-compressed bodies
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Metrics: outermost, so latency includes compression and CORS
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+metrics.register_gauges('response_cache', 'Public response cache counters and size', lambda: labelled(public_cache.stats().items(), 'stat'))
+metrics.register_gauges('event_bus', 'Event stream subscriptions and counters', lambda: labelled(event_bus.stats().items(), 'stat'))
+metrics.register_gauges('image_ingest', 'Uploaded images normalized and bytes saved', lambda: labelled(ingest_stats().items(), 'stat'))
+# Only tripped circuits carry a domain label, so the series stay few however many sites are scraped
+metrics.register_gauges(
+    'scraper_circuit_state', 'Scraper circuits not closed, per domain (50 most recently opened): 1 half-open, 2 open',
+    lambda: labelled(((domain, STATE_VALUES[state]) for domain, state in scraper_breakers.tripped().items()), 'domain')
+)
+metrics.register_gauges(
+    'scraper_circuit_transitions', 'Scraper circuit state changes, by state entered',
+    lambda: labelled(scraper_breakers.transitions().items(), 'state')
+)
+metrics.register_gauges(
+    'scraper_circuit_rejected', 'Scrapes failed fast by an open circuit',
+    lambda: {'': scraper_breakers.rejected()}
+)
+
 # routes
 app.include_router(items.router)
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(wishlists.router)
 app.include_router(relationships.router)
+app.include_router(home.router)
+app.include_router(events.router)
 
 @app.get('/')
 def read_root():
-    return {'Wish': 'List'}
\ No newline at end of file
+    return {'Wish': 'List'}
+
+# Operational routes, behind INTERNAL_TOKEN. Every value is per worker process: under
+# serve.py each scrape reaches one worker, so read them as a sample, not a total
+internal = APIRouter(prefix='/internal', dependencies=[Depends(require_internal_token)], include_in_schema=False)
+
+@internal.get('/cache-stats')
+def read_cache_stats():
+    """Hit, miss and size counters of the public response cache"""
+    return public_cache.stats()
+
+@internal.get('/event-stats')
+def read_event_stats():
+    """Open subscriptions and published/dropped event counters of the in-process event bus"""
+    return event_bus.stats()
+
+@internal.get('/metrics', response_class=PlainTextResponse)
+def read_metrics():
+    """Per-route latency, status, SQL and outbound call metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+app.include_router(internal)
@@ -1,16 +1,19 @@
 from fastapi import HTTPException, Depends, Header
+import hmac
 import jwt
 import os
-from dotenv import load_dotenv
 from typing import Optional
 import uuid
 
-# Load environment variables
-load_dotenv()
-
 # JWT
 JWT_SECRET = os.getenv('JWT_SECRET')
 
+# Bearer token for the /internal/* metrics and stats routes; unset, those routes answer 404
+INTERNAL_TOKEN = os.getenv('INTERNAL_TOKEN')
+
+# Scope claim of the short-lived tokens that may only open the user's event stream
+STREAM_TOKEN_SCOPE = 'events'
+
 # Get current user from JWT token
 async def get_current_user(authorization: Optional[str] = Header(None)):
     if not authorization:
@@ -27,6 +30,10 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         if user_id is None:
             raise HTTPException(status_code=401, detail='Invalid token')   
         
+        # Scoped tokens (event stream) are not access tokens
+        if payload.get('scope') is not None:
+            raise HTTPException(status_code=401, detail='Invalid token')
+        
         # Return the user_id - it's already a string in the token
         try:
             # Return as string
@@ -36,4 +43,23 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     
     except jwt.PyJWTError as e:
         print(f"JWT Error: {e}")
-        raise HTTPException(status_code=401, detail='Invalid token')
\ No newline at end of file
+        raise HTTPException(status_code=401, detail='Invalid token')
+
+# Event stream token, passed as ?token= because EventSource cannot set headers
+async def get_stream_user(token: str):
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+    except jwt.PyJWTError as e:
+        print(f"JWT Error: {e}")
+        raise HTTPException(status_code=401, detail='Invalid token')
+    if payload.get('scope') != STREAM_TOKEN_SCOPE or payload.get('sub') is None:
+        raise HTTPException(status_code=401, detail='Invalid token')
+    return {"user_id": payload['sub']}
+
+# Operational endpoints: a shared token rather than a user, so a metrics scraper can call them
+async def require_internal_token(authorization: Optional[str] = Header(None)):
+    if not INTERNAL_TOKEN:
+        raise HTTPException(status_code=404, detail='Not Found')
+    token = (authorization or '').replace("Bearer ", "")
+    if not hmac.compare_digest(token.encode(), INTERNAL_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail='Invalid token')
@@ -0,0 +1,148 @@
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies that are already compressed gain nothing from another pass
+EXCLUDED_MEDIA_TYPES = ('image/', 'video/', 'audio/', 'font/woff2', 'application/zip', 'application/gzip', 'application/octet-stream')
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, honouring q=0 exclusions"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+class _Compressor:
+    """Uniform incremental interface over zlib (gzip container) and brotli"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so streamed clients can decode it right away"""
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """
+    Compress HTTP responses with brotli or gzip, whichever the client prefers.
+
+    Skips bodies under `minimum_size`, responses that already carry a
+    Content-Encoding (e.g. precompressed share pages) and media types that are
+    already compressed (S3 image proxies). Streaming responses are compressed
+    chunk by chunk instead of being buffered.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ''
+        for name, value in scope['headers']:
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, settings: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.settings = settings
+        self.start_message = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def send(self, message):
+        message_type = message['type']
+
+        if message_type == 'http.response.start':
+            self.start_message = message
+            headers = {name.lower(): value for name, value in message.get('headers', [])}
+            content_type = headers.get(b'content-type', b'').decode('latin-1').lower()
+            if b'content-encoding' in headers or content_type.startswith(EXCLUDED_MEDIA_TYPES):
+                self.passthrough = True
+                await self._send(message)
+            return
+
+        if message_type != 'http.response.body' or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.compressor is None and not more_body:
+            # Whole body in one message: compress only if it is worth it
+            if len(body) < self.settings.minimum_size:
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+            compressed = _Compressor(self.encoding, self.settings.gzip_level, self.settings.brotli_quality).finish(body)
+            await self._send(self._compressed_start(len(compressed)))
+            await self._send({'type': 'http.response.body', 'body': compressed, 'more_body': False})
+            return
+
+        if self.compressor is None:
+            # Streaming body: length is unknown, so compress as chunks arrive
+            self.compressor = _Compressor(self.encoding, self.settings.gzip_level, self.settings.brotli_quality)
+            await self._send(self._compressed_start(None))
+
+        chunk = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        await self._send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+    def _compressed_start(self, content_length: Optional[int]) -> dict:
+        headers = [
+            (name, value) for name, value in self.start_message.get('headers', [])
+            if name.lower() not in (b'content-length', b'vary')
+        ]
+        vary = [value for name, value in self.start_message.get('headers', []) if name.lower() == b'vary']
+        vary_value = b', '.join(vary + [b'Accept-Encoding']) if vary else b'Accept-Encoding'
+        headers.append((b'content-encoding', self.encoding.encode('latin-1')))
+        headers.append((b'vary', vary_value))
+        if content_length is not None:
+            headers.append((b'content-length', str(content_length).encode('latin-1')))
+        return {**self.start_message, 'headers': headers}
@@ -0,0 +1,36 @@
+import time
+
+from services.metrics import RequestStats, current_request, metrics
+
+class MetricsMiddleware:
+    """
+    Record latency, status and SQL work per route template (e.g. /wishlists/{wishlist_id}),
+    so ids in paths do not explode the label space. Unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            route_path = getattr(route, 'path', None) or '<unmatched>'
+            metrics.observe_request(scope['method'], route_path, status, time.perf_counter() - start, stats)
+            current_request.reset(token)
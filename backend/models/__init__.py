@@ -0,0 +1,3 @@
+# Importing any model imports them all, so relationships named by string (User.saved_wishlists
+# -> 'SavedWishlist', ...) resolve in every process, not only those that load the routes
+from . import base, item, saved_wishlist, scraped_page, stored_object, task, user, user_relationship, wishlist
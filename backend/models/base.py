@@ -1,14 +1,32 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from dotenv import load_dotenv
 import os
 
-# load environment variables
+# load environment variables; every module that reads configuration at import time
+# is imported after this one (serve.py's supervisor, which never imports the app, loads them itself)
 load_dotenv()
 
-engine = create_engine(os.getenv("DATABASE_URL"))
+def pool_options(url: str) -> dict:
+    """
+    Connection pool sized per process, with overflow disabled. serve.py splits
+    DB_MAX_CONNECTIONS (the share of the database's connection limit this API may use)
+    between its web and task workers and hands each its share as DB_POOL_SIZE; a process
+    started on its own may use the whole budget. A request that finds the pool empty
+    waits up to DB_POOL_TIMEOUT seconds.
+    """
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', os.getenv('DB_MAX_CONNECTIONS', '20'))),
+        'max_overflow': 0,
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    }
+
+engine = create_engine(os.getenv("DATABASE_URL"), **pool_options(os.getenv("DATABASE_URL")))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -6,7 +6,7 @@ from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
 from pydantic import BaseModel, ConfigDict, HttpUrl
-from typing import Optional, Union
+from typing import List, Literal, Optional, Union
 from datetime import datetime
 
 from .base import Base
@@ -34,6 +34,9 @@ class WishListItem(Base):
     claimed_by_name = Column(String, nullable=True)  # For non-registered users
     claimed_at = Column(DateTime(timezone=True), nullable=True)
     
+    # manual ordering within a wishlist (2026), gapped so single moves touch one row
+    position = Column(Float, nullable=True, index=True)
+    
     # timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -66,6 +69,7 @@ class WishListItemUpdate(WishListItemBase):
     is_purchased: Optional[bool] = None
     priority: Optional[int] = None
     wishlist_id: Optional[uuid.UUID] = None
+    position: Optional[float] = None
 
 class WishListItemResponse(WishListItemBase):
     id: uuid.UUID
@@ -77,6 +81,7 @@ class WishListItemResponse(WishListItemBase):
     claimed_by_user_id: Optional[uuid.UUID] = None
     claimed_by_name: Optional[str] = None
     claimed_at: Optional[datetime] = None
+    position: Optional[float] = None
     
     claimed_by_display_name: Optional[str] = None
     
@@ -87,4 +92,29 @@ class ScrapeRequest(BaseModel):
     
 class ClaimRequest(BaseModel):
     user_id: Optional[str] = None
-    guest_name: Optional[str] = None
\ No newline at end of file
+    guest_name: Optional[str] = None
+
+class ItemReorderRequest(BaseModel):
+    item_ids: List[uuid.UUID]
+
+class ItemMoveRequest(BaseModel):
+    # Neighbours after the move; omit one to move to the start or end
+    after_id: Optional[uuid.UUID] = None
+    before_id: Optional[uuid.UUID] = None
+
+class ItemBatchOperation(BaseModel):
+    op: Literal['create', 'update', 'delete', 'move']
+    item_id: Optional[uuid.UUID] = None         # update, delete, move
+    data: Optional[WishListItemUpdate] = None   # create, update
+    wishlist_id: Optional[uuid.UUID] = None     # move target
+    image_index: Optional[int] = None           # index into the uploaded images (create, update)
+
+class ItemBatchResult(BaseModel):
+    index: int
+    op: str
+    status: Literal['ok', 'error']
+    item_id: Optional[uuid.UUID] = None
+    detail: Optional[str] = None
+
+class ItemBatchResponse(BaseModel):
+    results: List[ItemBatchResult]
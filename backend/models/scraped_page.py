@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Float, String
+from sqlalchemy.sql import func
+
+from .base import Base
+
+# Last fetch of each product URL by the price refresh (2026). Shared by every item with
+# that URL; the validators make the next fetch conditional.
+class ScrapedPage(Base):
+    __tablename__ = 'scraped_pages'
+
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)   # echoed back verbatim as If-Modified-Since
+    content_hash = Column(String, nullable=True)    # sha256 of the last body, for servers without validators
+    price = Column(Float, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    checked_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    changed_at = Column(DateTime(timezone=True), nullable=True)     # last time the extracted price moved
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from .base import Base
+
+# Reference counts for content-addressed S3 objects (2026). Objects uploaded before
+# content addressing have no row; they are deleted only once no database row uses their URL.
+class StoredObject(Base):
+    __tablename__ = 'stored_objects'
+
+    key = Column(String, primary_key=True)      # "<folder>/<sha256 hex>"
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Set once the bytes are in S3; a row without it is mid-upload (or its upload failed)
+    stored_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
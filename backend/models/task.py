@@ -0,0 +1,39 @@
+import enum
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, JSON, String, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from .base import Base
+
+class TaskStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    DEAD = "dead"        # out of attempts; kept for inspection and manual retry
+
+# Background work queued by routes and run by services/tasks.py workers (2026)
+class Task(Base):
+    __tablename__ = 'tasks'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.PENDING)
+
+    # Enqueueing twice with the same key is a no-op
+    idempotency_key = Column(String, unique=True, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    # Pending: earliest start (backoff). Running: lease expiry, after which another worker may reclaim it
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Only claimable rows are indexed, so done/dead history does not slow the claim query
+        Index('ix_tasks_claimable', 'run_at', postgresql_where=text("status IN ('PENDING', 'RUNNING')")),
+    )
@@ -39,7 +39,8 @@ class Wishlist(Base):
     user = relationship('User', back_populates='wishlists')
     items = relationship('WishListItem', back_populates='wishlist', cascade='all, delete-orphan')
 
-from .user import User
+from .user import User, PublicUserResponse
+from .item import WishListItemResponse
 User.wishlists = relationship('Wishlist', back_populates='user', cascade='all, delete-orphan')
 
 class WishlistBase(BaseModel):
@@ -87,4 +88,10 @@ class WishlistResponse(BaseModel):
     updated_at: Optional[datetime] = None
     item_count: Optional[int] = 0
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class WishlistSnapshotResponse(BaseModel):
+    """Everything needed to render a wishlist page in one response"""
+    wishlist: WishlistResponse
+    owner: Optional[PublicUserResponse] = None
+    items: List[WishListItemResponse] = []
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, s
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Dict, Any, Optional
-from services.s3_service import delete_file_from_s3, upload_file_to_s3
+from services.s3_service import schedule_s3_delete, upload_file_to_s3
+import asyncio
 import bcrypt
 import jwt
 import os
@@ -77,7 +78,7 @@ async def signup(
             if file_content:
                 # Reset file cursor after reading
                 await profile_picture.seek(0)
-                pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures")
+                pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures", db=db)
             else:
                 print("Warning: Empty file content detected")
                 raise HTTPException(status_code=400, detail="Profile picture file is empty")
@@ -119,8 +120,8 @@ async def signup(
         }
     except Exception as e:
         # Clean up S3 if user creation fails
-        if pfp_url:
-            delete_file_from_s3(pfp_url)
+        db.rollback()
+        await asyncio.to_thread(schedule_s3_delete, pfp_url)
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
 @router.post('/login', response_model=Dict[str, Any])
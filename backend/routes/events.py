@@ -0,0 +1,98 @@
+import os
+from datetime import timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import uuid
+
+from models.base import get_db
+from models.wishlist import Wishlist
+from middleware.auth import STREAM_TOKEN_SCOPE, get_current_user, get_stream_user
+from routes.auth import create_access_token
+from services.events import Subscription, event_bus, user_topic, wishlist_topic
+
+router = APIRouter(prefix='/events', tags=['events'])
+
+HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_MAX_QUEUE = int(os.getenv('EVENTS_MAX_QUEUE', '100'))
+# Lifetime of a ?token= stream token; it is only checked when the stream opens
+STREAM_TOKEN_SECONDS = int(os.getenv('EVENTS_STREAM_TOKEN_SECONDS', '60'))
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # keep reverse proxies from buffering the stream
+}
+
+async def _stream(request: Request, subscription: Subscription):
+    """Yield events as they arrive, a comment line as heartbeat when idle, and resync after overflow"""
+    try:
+        yield b'retry: 5000\n\n'
+        while True:
+            event = await subscription.next_event(HEARTBEAT_SECONDS)
+            if subscription.closed or await request.is_disconnected():
+                # Closed on worker shutdown; EventSource reconnects to another worker
+                break
+            if event is None:
+                yield b': heartbeat\n\n'
+                continue
+            if subscription.overflowed:
+                # Events were dropped for this slow client; it should refetch its state
+                subscription.overflowed = False
+                yield b'event: resync\ndata: {}\n\n'
+            yield event.encode()
+    finally:
+        event_bus.unsubscribe(subscription)
+
+''' Issue a token for opening the event stream '''
+@router.post('/stream-token', response_model=dict)
+def create_stream_token(current_user: dict = Depends(get_current_user)):
+    """
+    A short-lived token that can only open /events/stream, for clients (EventSource) that
+    must pass it in the URL, where it ends up in access logs. Fetch a new one to reconnect.
+    """
+    token = create_access_token(
+        data={"sub": current_user["user_id"], "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=STREAM_TOKEN_SECONDS)
+    )
+    return {"token": token, "expires_in": STREAM_TOKEN_SECONDS}
+
+''' Stream events for the current user '''
+@router.get('/stream')
+async def stream_user_events(
+    request: Request,
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events for claims, friend requests and saves addressed to the user.
+    Authenticated by the Authorization header or, since EventSource cannot set headers,
+    by ?token= with a token from POST /events/stream-token; access tokens are refused there.
+    """
+    if authorization or not token:
+        current_user = await get_current_user(authorization)
+    else:
+        current_user = await get_stream_user(token)
+    subscription = event_bus.subscribe(user_topic(current_user["user_id"]), max_queue=EVENTS_MAX_QUEUE)
+    return StreamingResponse(_stream(request, subscription), media_type='text/event-stream', headers=SSE_HEADERS)
+
+''' Stream item changes of a public wishlist '''
+@router.get('/wishlists/{wishlist_id}')
+async def stream_wishlist_events(
+    request: Request,
+    wishlist_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """Server-Sent Events with item-level deltas (claims) for a public wishlist, no authentication"""
+    is_public = db.query(Wishlist.id).filter(
+        Wishlist.id == wishlist_id,
+        Wishlist.is_public == True
+    ).first()
+    # Release the connection now; the stream may stay open for hours
+    db.close()
+
+    if not is_public:
+        raise HTTPException(status_code=404, detail="Wishlist not found or not public")
+
+    subscription = event_bus.subscribe(wishlist_topic(wishlist_id), max_queue=EVENTS_MAX_QUEUE)
+    return StreamingResponse(_stream(request, subscription), media_type='text/event-stream', headers=SSE_HEADERS)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List
+
+from models.base import get_db
+from models.user import User, UserResponse
+from models.wishlist import WishlistResponse
+from middleware.auth import get_current_user
+from routes.items import list_claimed_items
+from routes.relationships import FriendRequestInfo, FriendWishlistResponse, list_friend_requests, list_saved_wishlists
+from routes.wishlists import list_user_wishlists
+
+router = APIRouter(prefix='/home', tags=['home'])
+
+class HomeResponse(BaseModel):
+    user: UserResponse
+    wishlists: List[WishlistResponse]
+    claimed_items: List[dict]
+    friend_requests: List[FriendRequestInfo]
+    friends_wishlists: List[FriendWishlistResponse]
+
+@router.get('/', response_model=HomeResponse)
+def get_home(
+    wishlists_limit: int = Query(20, ge=0, le=100),
+    claimed_limit: int = Query(20, ge=0, le=100),
+    requests_limit: int = Query(20, ge=0, le=100),
+    friends_wishlists_limit: int = Query(20, ge=0, le=100),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Everything the home screen needs in one round trip: profile, own wishlists, claimed items,
+    pending friend requests and saved wishlists. The token is verified once and each section
+    is capped by its limit. The sections run one after another on the request's session,
+    so a home request holds a single pooled connection.
+    """
+    user_id = current_user["user_id"]
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    wishlists = list_user_wishlists(db, user_id, 0, wishlists_limit)
+    claimed_items = list_claimed_items(db, user_id, claimed_limit)
+    friend_requests = list_friend_requests(db, user_id, requests_limit)
+    friends_wishlists = list_saved_wishlists(db, user_id, friends_wishlists_limit)
+
+    return {
+        'user': user,
+        'wishlists': wishlists,
+        'claimed_items': claimed_items,
+        'friend_requests': friend_requests,
+        'friends_wishlists': friends_wishlists,
+    }
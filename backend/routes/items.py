@@ -2,29 +2,46 @@ import os
 import uuid
 import io
 import base64
-from fastapi import APIRouter, Depends, HTTPException, Form, Response, UploadFile, File
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Form, Header, Response, UploadFile, File
+from sqlalchemy import delete, insert, update
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from sqlalchemy.orm import joinedload
 from typing import List, Optional
-from PIL import Image
+from pydantic import TypeAdapter, ValidationError
 
 
 from models.wishlist import Wishlist
 from models.base import get_db
-from models.item import ClaimRequest, WishListItem, WishListItemCreate, WishListItemUpdate, WishListItemResponse, ScrapeRequest
+from models.item import ClaimRequest, WishListItem, WishListItemCreate, WishListItemUpdate, WishListItemResponse, ScrapeRequest, ItemBatchOperation, ItemBatchResult, ItemBatchResponse, ItemMoveRequest, ItemReorderRequest
 from middleware.auth import get_current_user
-from services.s3_service import upload_file_to_s3, delete_file_from_s3, s3_client
+from services.s3_service import add_s3_references, get_s3_client, schedule_s3_delete, store_bytes_in_s3, upload_file_to_s3
 from services.scraper import scrape_url
+from services.item_query import ITEM_ORDER, item_projection, position_between, renumber_positions, write_positions
+from services.serialization import json_response, item_adapter, item_list_adapter
+from services.etag import PRIVATE_REVALIDATE, etag_matches, not_modified, weak_etag, wishlist_items_version
+from services.events import publish_to_user, publish_to_wishlist
+from services.response_cache import cache_lookup, cache_store, invalidate_wishlist, wishlist_tag
 
 BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
 
+batch_operations_adapter = TypeAdapter(List[ItemBatchOperation])
+
 router = APIRouter(prefix='/wishlist', tags=['wishlist'])
 
 ''' Scrap item details from a URL '''
 @router.post('/scrape-url', tags=['scraper'])
 async def scrape_item_from_url(scrape_request: ScrapeRequest, current_user: dict = Depends(get_current_user)):
-    scraped_data = scrape_url(str(scrape_request.url))
+    # The fetch blocks for up to 15s plus the pause after it, so it must not run on the event loop
+    scraped_data = await asyncio.to_thread(scrape_url, str(scrape_request.url))
+    if "retry_after" in scraped_data:
+        # The site's circuit is open: fail fast and tell the client when to try again
+        raise HTTPException(
+            status_code=503,
+            detail=scraped_data["error"],
+            headers={"Retry-After": str(scraped_data["retry_after"])}
+        )
     if "error" in scraped_data:
         raise HTTPException(status_code=400, detail=scraped_data["error"])
     return scraped_data
@@ -51,6 +68,7 @@ async def process_image_remove_background(image: UploadFile = File(...)):
 """ Helper function to remove white background """
 def _remove_white_background(image_data: bytes) -> bytes:
     """Processes image data with Pillow to remove white background."""
+    from PIL import Image  # imported on first use to keep Pillow off the startup path
     img = Image.open(io.BytesIO(image_data)).convert("RGBA")
     datas = img.getdata()
     newData = []
@@ -90,7 +108,7 @@ async def create_wishlist_item(
         # handle image upload if provided
         image_url = None
         if image:
-            image_url = await upload_file_to_s3(image, folder="wishlist_images")
+            image_url = await upload_file_to_s3(image, folder="wishlist_images", db=db)
 
         # create item
         item_data = {
@@ -111,13 +129,185 @@ async def create_wishlist_item(
         db.add(db_item)
         db.commit()
         db.refresh(db_item)
+        invalidate_wishlist(db_item.wishlist_id)
     
         return db_item
     except Exception as e:
-        if 'image_url' in locals() and image_url:
-            delete_file_from_s3(image_url)
+        db.rollback()
+        if 'image_url' in locals():
+            await asyncio.to_thread(schedule_s3_delete, image_url)
         raise HTTPException(status_code=500, detail=f"Error creating item: {str(e)}")
 
+''' Apply a batch of item operations '''
+@router.post('/batch', response_model=ItemBatchResponse)
+async def batch_wishlist_items(
+    operations: str = Form(...),
+    images: Optional[List[UploadFile]] = File(None),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create, update, delete and move many items in one transaction.
+    `operations` is a JSON list of ItemBatchOperation; `image_index` refers to the uploaded `images`.
+    Invalid operations are reported and skipped, the rest are applied together.
+    """
+    try:
+        ops = batch_operations_adapter.validate_json(operations)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    
+    user_id = uuid.UUID(str(current_user["user_id"]))
+    images = images or []
+    
+    # Ownership of every referenced item and target wishlist, one query each
+    item_ids = {op.item_id for op in ops if op.item_id is not None}
+    owned_items = {}
+    if item_ids:
+        owned_items = {row.id: row for row in db.query(
+            WishListItem.id, WishListItem.image, WishListItem.wishlist_id
+        ).filter(
+            WishListItem.id.in_(item_ids),
+            WishListItem.user_id == user_id
+        )}
+    
+    target_ids = {op.wishlist_id for op in ops if op.wishlist_id is not None}
+    target_ids |= {op.data.wishlist_id for op in ops if op.data is not None and op.data.wishlist_id is not None}
+    owned_wishlists = set()
+    if target_ids:
+        owned_wishlists = {row.id for row in db.query(Wishlist.id).filter(
+            Wishlist.id.in_(target_ids),
+            Wishlist.user_id == user_id
+        )}
+    
+    # Validate each operation
+    errors = {}
+    seen_items = set()
+    for index, op in enumerate(ops):
+        target = op.wishlist_id if op.op == 'move' else (op.data.wishlist_id if op.data else None)
+        if op.op != 'create':
+            if op.item_id is None:
+                errors[index] = "item_id is required"
+            elif op.item_id not in owned_items:
+                errors[index] = "Item not found"
+            elif op.item_id in seen_items:
+                errors[index] = "Item already used by another operation in this batch"
+        if index not in errors and op.op == 'create' and (op.data is None or not op.data.name):
+            errors[index] = "data.name is required"
+        elif index not in errors and op.op == 'move' and op.wishlist_id is None:
+            errors[index] = "wishlist_id is required"
+        if index not in errors and target is not None and target not in owned_wishlists:
+            errors[index] = "Wishlist not found"
+        if index not in errors and op.image_index is not None and not 0 <= op.image_index < len(images):
+            errors[index] = "image_index out of range"
+        if index not in errors and op.item_id is not None:
+            seen_items.add(op.item_id)
+    
+    valid = [(index, op) for index, op in enumerate(ops) if index not in errors]
+    
+    # Upload all images used by valid operations concurrently. Each upload takes its own
+    # pooled connection, so hand this request's back first rather than hold it while waiting
+    db.commit()
+    image_indexes = sorted({op.image_index for _, op in valid if op.image_index is not None and op.op in ('create', 'update')})
+    uploaded = await asyncio.gather(*(
+        upload_file_to_s3(images[i], folder="wishlist_images") for i in image_indexes
+    ), return_exceptions=True)
+    failures = [result for result in uploaded if isinstance(result, Exception)]
+    if failures:
+        # Give back the references taken by the uploads that did succeed
+        await asyncio.to_thread(schedule_s3_delete, *(url for url in uploaded if isinstance(url, str)))
+        raise HTTPException(status_code=500, detail=f"Error uploading images: {str(failures[0])}")
+    image_urls = dict(zip(image_indexes, uploaded))
+    
+    # Build bulk statements
+    new_rows = []
+    updated_rows = []
+    deleted_ids = []
+    stale_images = []
+    shared_images = []
+    used_uploads = set()
+    touched_wishlists = set()
+    item_results = {}
+    for index, op in valid:
+        fields = op.data.model_dump(exclude_unset=True, exclude_none=True) if op.data else {}
+        if op.op not in ('create', 'update'):
+            fields = {}
+        elif op.image_index is not None:
+            fields['image'] = image_urls[op.image_index]
+            if op.image_index in used_uploads:
+                shared_images.append(fields['image'])
+            used_uploads.add(op.image_index)
+        elif fields.get('image'):
+            # An existing URL placed on another row is one more reference to its object
+            shared_images.append(fields['image'])
+        
+        if op.op == 'create':
+            item_id = uuid.uuid4()
+            new_rows.append({
+                "id": item_id,
+                "user_id": user_id,
+                "name": fields["name"],
+                "description": fields.get("description"),
+                "price": fields.get("price"),
+                "url": fields.get("url"),
+                "image": fields.get("image"),
+                "is_purchased": fields.get("is_purchased", False),
+                "priority": fields.get("priority", 0),
+                "wishlist_id": fields.get("wishlist_id"),
+            })
+            touched_wishlists.add(fields.get("wishlist_id"))
+            item_results[index] = item_id
+            continue
+        
+        current = owned_items[op.item_id]
+        item_results[index] = op.item_id
+        touched_wishlists.add(current.wishlist_id)
+        if op.op == 'delete':
+            deleted_ids.append(op.item_id)
+            if current.image:
+                stale_images.append(current.image)
+            continue
+        
+        if op.op == 'move':
+            fields = {"wishlist_id": op.wishlist_id}
+        if fields.get("image") and current.image:
+            # Released even when unchanged: the new value holds a reference of its own
+            stale_images.append(current.image)
+        touched_wishlists.add(fields.get("wishlist_id"))
+        if fields:
+            updated_rows.append({"id": op.item_id, **fields})
+    
+    try:
+        if new_rows:
+            db.execute(insert(WishListItem), new_rows)
+        if updated_rows:
+            # ORM bulk UPDATE by primary key, grouped into executemany batches
+            db.execute(update(WishListItem), updated_rows)
+        if deleted_ids:
+            db.execute(
+                delete(WishListItem).where(
+                    WishListItem.id.in_(deleted_ids),
+                    WishListItem.user_id == user_id
+                ).execution_options(synchronize_session=False)
+            )
+        # Old images are only released if the transaction holding their replacements commits
+        add_s3_references(db, *shared_images)
+        schedule_s3_delete(*stale_images, db=db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        await asyncio.to_thread(schedule_s3_delete, *uploaded)
+        raise HTTPException(status_code=500, detail=f"Error applying batch: {str(e)}")
+    
+    invalidate_wishlist(*touched_wishlists)
+    
+    results = []
+    for index, op in enumerate(ops):
+        if index in errors:
+            results.append(ItemBatchResult(index=index, op=op.op, status='error', item_id=op.item_id, detail=errors[index]))
+        else:
+            results.append(ItemBatchResult(index=index, op=op.op, status='ok', item_id=item_results[index]))
+    return ItemBatchResponse(results=results)
+
 ''' Get all items '''
 @router.get('/', response_model=List[WishListItemResponse])
 def read_wishlist_items(
@@ -126,66 +316,117 @@ def read_wishlist_items(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    items = db.query(WishListItem).options(
-        joinedload(WishListItem.claimed_by_user)
-    ).filter(
+    items = item_projection(db).filter(
         WishListItem.user_id == current_user["user_id"]
     ).offset(skip).limit(limit).all()
     
-    # Convert to response format with claimed_by_display_name
-    response_items = []
-    for item in items:
-        item_dict = WishListItemResponse.model_validate(item).model_dump()
-        
-        if item.claimed_by_user_id and item.claimed_by_user:
-            item_dict['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
-        elif item.claimed_by_name:
-            item_dict['claimed_by_display_name'] = item.claimed_by_name
-        else:
-            item_dict['claimed_by_display_name'] = None
-            
-        response_items.append(WishListItemResponse(**item_dict))
-    
-    return response_items
+    return json_response(item_list_adapter, items)
 
 ''' Get items by wishlist '''
 @router.get('/items/{wishlist_id}', response_model=List[WishListItemResponse])
 def get_items_by_wishlist(
     wishlist_id: uuid.UUID,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all items in a specific wishlist owned by the current user"""
-    # Verify the wishlist belongs to the current user
-    db_wishlist = db.query(Wishlist).filter(
-        Wishlist.id == wishlist_id,
-        Wishlist.user_id == current_user["user_id"]
-    ).first()
+    # Verify the wishlist belongs to the current user and read its version in one query
+    version = wishlist_items_version(db, wishlist_id, current_user["user_id"])
     
-    if not db_wishlist:
+    if version is None:
         raise HTTPException(status_code=404, detail="Wishlist not found")
     
-    items = db.query(WishListItem).options(
-        joinedload(WishListItem.claimed_by_user)
-    ).filter(
+    etag = weak_etag(wishlist_id, *version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    items = item_projection(db).filter(
         WishListItem.wishlist_id == wishlist_id
-    ).all()
+    ).order_by(*ITEM_ORDER).all()
     
-    # Convert to response format with claimed_by_display_name
-    response_items = []
-    for item in items:
-        item_dict = WishListItemResponse.model_validate(item).model_dump()
-        
-        if item.claimed_by_user_id and item.claimed_by_user:
-            item_dict['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
-        elif item.claimed_by_name:
-            item_dict['claimed_by_display_name'] = item.claimed_by_name
-        else:
-            item_dict['claimed_by_display_name'] = None
-            
-        response_items.append(WishListItemResponse(**item_dict))
+    return json_response(item_list_adapter, items, headers={'ETag': etag, 'Cache-Control': PRIVATE_REVALIDATE})
+
+""" Reorder the items of a wishlist """
+@router.put('/items/{wishlist_id}/order', response_model=dict)
+def reorder_wishlist_items(
+    wishlist_id: uuid.UUID,
+    reorder: ItemReorderRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Write the given item order in a single statement; items not listed keep their position"""
+    user_id = uuid.UUID(str(current_user["user_id"]))
+    
+    if not db.query(Wishlist.id).filter(Wishlist.id == wishlist_id, Wishlist.user_id == user_id).first():
+        raise HTTPException(status_code=404, detail="Wishlist not found")
+    
+    if len(set(reorder.item_ids)) != len(reorder.item_ids):
+        raise HTTPException(status_code=400, detail="Duplicate item IDs in order")
     
-    return response_items
+    updated = write_positions(db, wishlist_id, user_id, reorder.item_ids)
+    if len(updated) != len(reorder.item_ids):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Some items are not in this wishlist")
+    
+    db.commit()
+    invalidate_wishlist(wishlist_id)
+    return {"message": "Items reordered successfully"}
+
+""" Move a single item between two neighbours """
+@router.put('/{item_id}/position', response_model=dict)
+def move_wishlist_item(
+    item_id: uuid.UUID,
+    move: ItemMoveRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Place an item between its new neighbours, updating only that item unless positions need re-spacing"""
+    user_id = uuid.UUID(str(current_user["user_id"]))
+    
+    db_item = db.query(WishListItem).filter(
+        WishListItem.id == item_id,
+        WishListItem.user_id == user_id
+    ).first()
+    
+    if not db_item:
+        raise HTTPException(status_code=404, detail='Item not found')
+    if db_item.wishlist_id is None:
+        raise HTTPException(status_code=400, detail='Item is not in a wishlist')
+    
+    neighbour_ids = [neighbour for neighbour in (move.after_id, move.before_id) if neighbour is not None]
+    if not neighbour_ids:
+        raise HTTPException(status_code=400, detail='Either after_id or before_id is required')
+    if item_id in neighbour_ids:
+        raise HTTPException(status_code=400, detail='An item cannot be its own neighbour')
+    
+    def neighbour_positions() -> dict:
+        return {row.id: row.position for row in db.query(WishListItem.id, WishListItem.position).filter(
+            WishListItem.id.in_(neighbour_ids),
+            WishListItem.wishlist_id == db_item.wishlist_id
+        )}
+    
+    positions = neighbour_positions()
+    if len(positions) != len(neighbour_ids):
+        raise HTTPException(status_code=400, detail='Neighbours must be items of the same wishlist')
+    
+    new_position = None
+    if None not in positions.values():
+        new_position = position_between(positions.get(move.after_id), positions.get(move.before_id))
+    
+    if new_position is None:
+        # Unordered items or no room left between neighbours: re-space the wishlist once
+        renumber_positions(db, db_item.wishlist_id, user_id)
+        positions = neighbour_positions()
+        new_position = position_between(positions.get(move.after_id), positions.get(move.before_id))
+        if new_position is None:
+            db.rollback()
+            raise HTTPException(status_code=400, detail='after_id must come before before_id')
+    
+    db_item.position = new_position
+    db.commit()
+    invalidate_wishlist(db_item.wishlist_id)
+    return {"message": "Item moved successfully", "position": new_position}
 
 """ Get a single item """
 @router.get('/{item_id}', response_model=WishListItemResponse)
@@ -194,9 +435,7 @@ def read_wishlist_item(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_item = db.query(WishListItem).options(
-        joinedload(WishListItem.claimed_by_user)
-    ).filter(
+    db_item = item_projection(db).filter(
         WishListItem.id == item_id, 
         WishListItem.user_id == current_user["user_id"]
     ).first()
@@ -204,17 +443,7 @@ def read_wishlist_item(
     if not db_item:
         raise HTTPException(status_code=404, detail='Item not found')
     
-    # Convert to response format with claimed_by_display_name
-    item_dict = WishListItemResponse.model_validate(db_item).model_dump()
-    
-    if db_item.claimed_by_user_id and db_item.claimed_by_user:
-        item_dict['claimed_by_display_name'] = db_item.claimed_by_user.name or db_item.claimed_by_user.username
-    elif db_item.claimed_by_name:
-        item_dict['claimed_by_display_name'] = db_item.claimed_by_name
-    else:
-        item_dict['claimed_by_display_name'] = None
-        
-    return WishListItemResponse(**item_dict)
+    return json_response(item_adapter, db_item)
 
 ''' Update an item '''
 @router.put('/{item_id}', response_model=WishListItemResponse)
@@ -249,12 +478,10 @@ async def update_wishlist_item(
     
     # Handle image update if provided
     if image:
-        # Delete old image if it exists
-        if db_item.image:
-            delete_file_from_s3(db_item.image)
-        
-        # Upload new image
-        new_image_url = await upload_file_to_s3(image)
+        # Upload new image, then release the old one once the update commits.
+        # In that order: the release locks the old object's row until commit
+        new_image_url = await upload_file_to_s3(image, folder="wishlist_images", db=db)
+        schedule_s3_delete(db_item.image, db=db)
         db_item.image = new_image_url
     
     # Update other fields if provided
@@ -270,11 +497,20 @@ async def update_wishlist_item(
         db_item.is_purchased = is_purchased
     if priority is not None:
         db_item.priority = priority
+    previous_wishlist_id = db_item.wishlist_id
     if wishlist_uuid is not None:
         db_item.wishlist_id = wishlist_uuid
     
-    db.commit()
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if image:
+            # The new image's reference was committed by the upload; give it back
+            await asyncio.to_thread(schedule_s3_delete, new_image_url)
+        raise HTTPException(status_code=500, detail=f"Error updating item: {str(e)}")
     db.refresh(db_item)
+    invalidate_wishlist(previous_wishlist_id, db_item.wishlist_id)
     return db_item
 
 ''' Delete an item '''
@@ -292,11 +528,12 @@ def delete_wishlist_item(
     if not db_item:
         raise HTTPException(status_code=404, detail='Item not found')
     
-    # Delete image from S3 if it exists
-    if db_item.image:
-        delete_file_from_s3(db_item.image)
+    # Delete image from S3 once the row is gone
+    schedule_s3_delete(db_item.image, db=db)
+    wishlist_id = db_item.wishlist_id
     db.delete(db_item)
     db.commit()
+    invalidate_wishlist(wishlist_id)
     return {'detail': 'Item deleted successfully'}
 
 """ Get another user's wishlist """
@@ -307,27 +544,11 @@ def read_user_wishlist(
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    items = db.query(WishListItem).options(
-        joinedload(WishListItem.claimed_by_user)
-    ).filter(
+    items = item_projection(db).filter(
         WishListItem.user_id == user_id
     ).offset(skip).limit(limit).all()
     
-    # Convert to response format with claimed_by_display_name
-    response_items = []
-    for item in items:
-        item_dict = WishListItemResponse.model_validate(item).model_dump()
-        
-        if item.claimed_by_user_id and item.claimed_by_user:
-            item_dict['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
-        elif item.claimed_by_name:
-            item_dict['claimed_by_display_name'] = item.claimed_by_name
-        else:
-            item_dict['claimed_by_display_name'] = None
-            
-        response_items.append(WishListItemResponse(**item_dict))
-    
-    return response_items
+    return json_response(item_list_adapter, items)
 
 """ Remove white background from an item's image """
 @router.post('/{item_id}/remove-background', response_model=dict)
@@ -343,17 +564,17 @@ async def remove_item_image_background(
     if not item or not item.image:
         raise HTTPException(status_code=404, detail="Item or item image not found")
     
-    wishlist = db.query(Wishlist).filter(Wishlist.id == item.wishlist_id).first()
-    if not wishlist or wishlist.owner_id != uuid.UUID(current_user['id']):
+    if str(item.user_id) != str(current_user["user_id"]):
         raise HTTPException(status_code=403, detail="Not authorized to modify this item")
 
     try:
         # 1. Download image from S3
         s3_key = item.image.split(f"https://{BUCKET_NAME}.s3.amazonaws.com/")[1]
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         image_data = response['Body'].read()
         
         # 2. Process with Pillow
+        from PIL import Image
         img = Image.open(io.BytesIO(image_data)).convert("RGBA")
         datas = img.getdata()
 
@@ -374,20 +595,15 @@ async def remove_item_image_background(
         img.save(buffer, "PNG")
         buffer.seek(0)
 
-        # 4. Upload the new transparent image back to S3, overwriting the old one
-        # The s3_key should point to the same object to overwrite it.
-        # Ensure the content type is 'image/png' for transparency.
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=buffer,
-            ContentType='image/png',
-            ACL='public-read' # Or your default ACL
-        )
-        
-        # The URL remains the same, so no DB update is needed.
+        # 4. Store the transparent image as new content; the old object may be shared
+        # with other items, so it is released rather than overwritten.
+        new_image_url = await store_bytes_in_s3(buffer.getvalue(), folder="wishlist_images", content_type='image/png', db=db)
+        schedule_s3_delete(item.image, db=db)
+        item.image = new_image_url
+        db.commit()
+        invalidate_wishlist(item.wishlist_id)
         
-        return {"message": "Background removed successfully."}
+        return {"message": "Background removed successfully.", "image": new_image_url}
 
     except Exception as e:
         print(f"Error removing background: {e}")
@@ -410,7 +626,7 @@ async def get_item_image(
         s3_key = item.image.split(f"https://{BUCKET_NAME}.s3.amazonaws.com/")[1]
         
         # Get the object from S3
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         image_data = response['Body'].read()
         
         # Return the image with proper content type
@@ -428,6 +644,11 @@ def read_public_wishlist_items(
     db: Session = Depends(get_db)
 ):
     """Get items from a public wishlist without authentication"""
+    cache_key = f"items:public:{wishlist_id}"
+    cached = cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+    
     # First verify this is a public wishlist
     db_wishlist = db.query(Wishlist).filter(
         Wishlist.id == wishlist_id,
@@ -437,29 +658,12 @@ def read_public_wishlist_items(
     if not db_wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found or not public")
     
-    # Get items for this wishlist with user information
-    items = db.query(WishListItem).options(
-        joinedload(WishListItem.claimed_by_user)
-    ).filter(
+    # Get items for this wishlist with the claimer's display name
+    items = item_projection(db).filter(
         WishListItem.wishlist_id == wishlist_id
-    ).all()
-    
-    # Convert to response format with claimed_by_display_name
-    response_items = []
-    for item in items:
-        item_dict = WishListItemResponse.model_validate(item).model_dump()
-        
-        # Add display name for claimed items
-        if item.claimed_by_user_id and item.claimed_by_user:
-            item_dict['claimed_by_display_name'] = item.claimed_by_user.name or item.claimed_by_user.username
-        elif item.claimed_by_name:
-            item_dict['claimed_by_display_name'] = item.claimed_by_name
-        else:
-            item_dict['claimed_by_display_name'] = None
-            
-        response_items.append(WishListItemResponse(**item_dict))
+    ).order_by(*ITEM_ORDER).all()
     
-    return response_items
+    return cache_store(cache_key, json_response(item_list_adapter, items), [wishlist_tag(wishlist_id)])
 
 """ Claim an item for purchase """
 @router.post('/{item_id}/claim')
@@ -468,31 +672,42 @@ def claim_item(
     claim_data: ClaimRequest,
     db: Session = Depends(get_db)
 ):
-    # Get the item
-    item = db.query(WishListItem).filter(WishListItem.id == item_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    # Check if already claimed
-    if item.claimed_by_user_id or item.claimed_by_name:
-        raise HTTPException(status_code=400, detail="Item is already claimed")
-    
     # Claim the item - ONLY set one field, not both
     if claim_data.user_id:
         # For registered users, only set the user_id
-        item.claimed_by_user_id = claim_data.user_id
-        item.claimed_by_name = None  # Explicitly set to None
+        try:
+            claim_values = {"claimed_by_user_id": uuid.UUID(claim_data.user_id), "claimed_by_name": None}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
     elif claim_data.guest_name:
         # For guests, only set the name
-        item.claimed_by_name = claim_data.guest_name
-        item.claimed_by_user_id = None  # Explicitly set to None
+        claim_values = {"claimed_by_user_id": None, "claimed_by_name": claim_data.guest_name}
     else:
         raise HTTPException(status_code=400, detail="Either user_id or guest_name is required")
     
-    item.claimed_at = func.now()
-    
+    # Single conditional UPDATE: only one of several concurrent claims can match the unclaimed row
+    claimed = db.execute(
+        update(WishListItem).where(
+            WishListItem.id == item_id,
+            WishListItem.claimed_by_user_id.is_(None),
+            WishListItem.claimed_by_name.is_(None)
+        ).values(
+            **claim_values,
+            claimed_at=func.now()
+        ).returning(WishListItem.wishlist_id, WishListItem.claimed_at).execution_options(synchronize_session=False)
+    ).first()
     db.commit()
-    db.refresh(item)
+    
+    if claimed is None:
+        # Nothing updated: either the item does not exist or someone else holds it
+        if db.query(WishListItem.id).filter(WishListItem.id == item_id).first() is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        raise HTTPException(status_code=409, detail="Item is already claimed")
+    
+    invalidate_wishlist(claimed.wishlist_id)
+    claim_event = {"item_id": item_id, "wishlist_id": claimed.wishlist_id, "claimed_at": claimed.claimed_at, **claim_values}
+    publish_to_wishlist(claimed.wishlist_id, 'item.claimed', claim_event)
+    publish_to_user(claim_values["claimed_by_user_id"], 'item.claimed', claim_event)
     
     return {"message": "Item claimed successfully"}
 
@@ -503,28 +718,40 @@ def unclaim_item(
     unclaim_data: ClaimRequest,
     db: Session = Depends(get_db)
 ):
-    # Get the item
-    item = db.query(WishListItem).filter(WishListItem.id == item_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
+    # Only the current claimer can unclaim
+    if unclaim_data.user_id:
+        try:
+            is_claimer = WishListItem.claimed_by_user_id == uuid.UUID(unclaim_data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=403, detail="You cannot unclaim this item")
+    elif unclaim_data.guest_name:
+        is_claimer = WishListItem.claimed_by_name == unclaim_data.guest_name
+    else:
+        raise HTTPException(status_code=403, detail="You cannot unclaim this item")
     
-    # Check if the requester can unclaim
-    can_unclaim = False
-    if unclaim_data.user_id and str(item.claimed_by_user_id) == unclaim_data.user_id:
-        can_unclaim = True
-    elif unclaim_data.guest_name and item.claimed_by_name == unclaim_data.guest_name:
-        can_unclaim = True
+    # Unclaim the item in one conditional UPDATE
+    unclaimed = db.execute(
+        update(WishListItem).where(
+            WishListItem.id == item_id,
+            is_claimer
+        ).values(
+            claimed_by_user_id=None,
+            claimed_by_name=None,
+            claimed_at=None
+        ).returning(WishListItem.wishlist_id).execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
     
-    if not can_unclaim:
+    if unclaimed is None:
+        if db.query(WishListItem.id).filter(WishListItem.id == item_id).first() is None:
+            raise HTTPException(status_code=404, detail="Item not found")
         raise HTTPException(status_code=403, detail="You cannot unclaim this item")
     
-    # Unclaim the item
-    item.claimed_by_user_id = None
-    item.claimed_by_name = None
-    item.claimed_at = None
-    
-    db.commit()
-    db.refresh(item)
+    invalidate_wishlist(unclaimed.wishlist_id)
+    unclaim_event = {"item_id": item_id, "wishlist_id": unclaimed.wishlist_id}
+    publish_to_wishlist(unclaimed.wishlist_id, 'item.unclaimed', unclaim_event)
+    if unclaim_data.user_id:
+        publish_to_user(uuid.UUID(unclaim_data.user_id), 'item.unclaimed', unclaim_event)
     
     return {"message": "Item unclaimed successfully"}
 
@@ -535,12 +762,19 @@ def get_my_claimed_items(
     db: Session = Depends(get_db)
 ):
     """Get all items claimed by the current authenticated user"""
-    items = db.query(WishListItem).options(
+    return list_claimed_items(db, current_user["user_id"])
+
+def list_claimed_items(db: Session, user_id, limit: Optional[int] = None) -> List[dict]:
+    """Items claimed by a user with owner and wishlist details, newest claims first when limited"""
+    query = db.query(WishListItem).options(
         joinedload(WishListItem.user),
         joinedload(WishListItem.wishlist)
     ).filter(
-        WishListItem.claimed_by_user_id == uuid.UUID(current_user["user_id"])
-    ).all()
+        WishListItem.claimed_by_user_id == uuid.UUID(str(user_id))
+    )
+    if limit is not None:
+        query = query.order_by(WishListItem.claimed_at.desc()).limit(limit)
+    items = query.all()
     
     response_items = []
     for item in items:
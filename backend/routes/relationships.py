@@ -7,9 +7,11 @@ from models.user import User
 from models.wishlist import Wishlist
 from models.saved_wishlist import SavedWishlist, SavedWishlistCreate
 from middleware.auth import get_current_user
+from services.events import publish_to_user
+from services.item_query import item_count_column
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import uuid
 
 router = APIRouter(prefix="/friends", tags=["friends"])
@@ -149,6 +151,15 @@ def send_friend_request(
     db.add(relationship)
     db.commit()
     
+    sender = db.query(User.username, User.name).filter(User.id == user_id).first()
+    publish_to_user(friend_id, 'friend_request.received', {
+        "id": relationship.id,
+        "user_id": user_id,
+        "username": sender.username if sender else None,
+        "name": sender.name if sender else None,
+        "created_at": relationship.created_at,
+    })
+    
     return {"message": "Friend request sent successfully"}
 
 @router.get("/requests")
@@ -157,15 +168,20 @@ def get_friend_requests(
     db: Session = Depends(get_db)
 ):
     """Get pending friend requests for current user"""
-    user_id = current_user["user_id"]
-    
+    return list_friend_requests(db, current_user["user_id"])
+
+def list_friend_requests(db: Session, user_id, limit: Optional[int] = None) -> List[FriendRequestInfo]:
+    """Pending requests received by a user, newest first when limited"""
     # Get pending requests where current user is the friend (receiver)
-    requests = db.query(UserRelationship, User).join(
+    query = db.query(UserRelationship, User).join(
         User, UserRelationship.user_id == User.id
     ).filter(
         UserRelationship.friend_id == user_id,
         UserRelationship.status == RelationshipStatus.PENDING
-    ).all()
+    )
+    if limit is not None:
+        query = query.order_by(UserRelationship.created_at.desc()).limit(limit)
+    requests = query.all()
     
     result = []
     for relationship, user in requests:
@@ -202,6 +218,8 @@ def accept_friend_request(
     relationship.status = RelationshipStatus.ACCEPTED
     db.commit()
     
+    publish_to_user(relationship.user_id, 'friend_request.accepted', {"id": relationship.id, "friend_id": user_id})
+    
     return {"message": "Friend request accepted"}
 
 @router.post("/requests/{request_id}/decline")
@@ -235,33 +253,27 @@ def get_friends_wishlists(
     db: Session = Depends(get_db)
 ):
     """Get saved wishlists only (not all friends' wishlists)"""
-    user_id = uuid.UUID(str(current_user["user_id"]))
-    
-    # Get saved wishlists
-    saved_wishlists = db.query(SavedWishlist).filter(
-        SavedWishlist.user_id == user_id
-    ).all()
-    
-    if not saved_wishlists:
-        return []
-    
-    wishlist_ids = [sw.wishlist_id for sw in saved_wishlists]
-    
-    # Get wishlist details
-    wishlists = db.query(Wishlist, User).join(
+    return list_saved_wishlists(db, current_user["user_id"])
+
+def list_saved_wishlists(db: Session, user_id, limit: Optional[int] = None) -> List[FriendWishlistResponse]:
+    """Public wishlists a user has saved, most recently saved first when limited"""
+    user_id = uuid.UUID(str(user_id))
+    
+    # Saved public wishlists with their owners and item counts in one query
+    query = db.query(Wishlist, User, item_count_column()).join(
+        SavedWishlist, SavedWishlist.wishlist_id == Wishlist.id
+    ).join(
         User, Wishlist.user_id == User.id
     ).filter(
-        Wishlist.id.in_(wishlist_ids),
+        SavedWishlist.user_id == user_id,
         Wishlist.is_public == True
-    ).all()
+    )
+    if limit is not None:
+        query = query.order_by(SavedWishlist.created_at.desc()).limit(limit)
+    wishlists = query.all()
     
     result = []
-    for wishlist, user in wishlists:
-        from models.item import WishListItem
-        item_count = db.query(WishListItem).filter(
-            WishListItem.wishlist_id == wishlist.id
-        ).count()
-        
+    for wishlist, user, item_count in wishlists:
         result.append(FriendWishlistResponse(
             id=str(wishlist.id),
             title=wishlist.title,
@@ -346,6 +358,8 @@ def save_wishlist(
     db.add(saved)
     db.commit()
     
+    publish_to_user(wishlist.user_id, 'wishlist.saved', {"wishlist_id": wishlist_id, "user_id": user_id})
+    
     return {"message": "Wishlist saved successfully"}
 
 @router.delete("/wishlists/save/{wishlist_id}")
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
 from sqlalchemy.orm import Session
@@ -9,7 +10,8 @@ from models.user import PublicUserResponse, User, UserCreate, UserResponse, User
 from middleware.auth import get_current_user
 from routes.auth import get_password_hash
 
-from services.s3_service import upload_file_to_s3, delete_file_from_s3, s3_client
+from services.s3_service import upload_file_to_s3, schedule_s3_delete, get_s3_client
+from services.response_cache import cache_lookup, cache_store, invalidate_user, user_tag
 
 router = APIRouter(prefix='/users', tags=['users'])
 BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
@@ -78,7 +80,7 @@ async def create_user(
     pfp_url = None
     if profile_picture:
         try:
-            pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures")
+            pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures", db=db)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading profile picture: {str(e)}")
 
@@ -107,8 +109,8 @@ async def create_user(
         
         return db_user
     except Exception as e:
-        if pfp_url:
-            delete_file_from_s3(pfp_url)  # Clean up if user creation fails
+        db.rollback()
+        await asyncio.to_thread(schedule_s3_delete, pfp_url)  # Clean up if user creation fails
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
 # Update an existing user
@@ -141,20 +143,17 @@ async def update_user(
     
     # Handle profile picture upload if provided
     if profile_picture:
-        # Delete old image if it exists
-        if db_user.pfp:
-            delete_file_from_s3(db_user.pfp)
-        
-        # Upload new image
+        # Upload new image, then release the old one once the update commits
         try:
-            pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures")
+            pfp_url = await upload_file_to_s3(profile_picture, folder="profile_pictures", db=db)
+            schedule_s3_delete(db_user.pfp, db=db)
             db_user.pfp = pfp_url
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading profile picture: {str(e)}")
         
     elif remove_profile_picture:
         if db_user.pfp:
-            delete_file_from_s3(db_user.pfp)
+            schedule_s3_delete(db_user.pfp, db=db)
             db_user.pfp = None
     
     # Update other fields if provided
@@ -203,6 +202,7 @@ async def update_user(
 
     db.commit()
     db.refresh(db_user)
+    invalidate_user(user_id)
     return db_user
 
 # Delete a user
@@ -221,11 +221,11 @@ def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Delete profile picture from S3 if it exists
-    if db_user.pfp:
-        delete_file_from_s3(db_user.pfp)
+    schedule_s3_delete(db_user.pfp, db=db)
     
     db.delete(db_user)
     db.commit()
+    invalidate_user(user_id)
     
     return {"message": "User deleted successfully"}
 
@@ -246,7 +246,7 @@ async def get_user_profile_image(
         s3_key = user.pfp.split(f"https://{BUCKET_NAME}.s3.amazonaws.com/")[1]
         
         # Get the object from S3
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         image_data = response['Body'].read()
         
         # Return the image with proper content type
@@ -264,11 +264,16 @@ def get_public_user_details(user_id: uuid.UUID, db: Session = Depends(get_db)):
     Get public details for a specific user.
     Does not require authentication.
     """
+    cache_key = f"users:public:{user_id}"
+    cached = cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+    
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return PublicUserResponse(
+    public_user = PublicUserResponse(
         id=uuid.UUID(str(user.id)),
         name=user.name,
         username=user.username,
@@ -281,4 +286,6 @@ def get_public_user_details(user_id: uuid.UUID, db: Session = Depends(get_db)):
         ring_size=user.ring_size,
         dress_size=user.dress_size,
         jacket_size=user.jacket_size
-    )
\ No newline at end of file
+    )
+    response = Response(content=public_user.model_dump_json(), media_type='application/json')
+    return cache_store(cache_key, response, [user_tag(user_id)])
\ No newline at end of file
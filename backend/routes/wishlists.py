@@ -1,20 +1,25 @@
-from html import escape
 import os
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, UploadFile
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy import and_, func, insert, literal, or_, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from typing import List, Optional, Tuple
 import uuid
 
-from services.s3_service import upload_file_to_s3, delete_file_from_s3
 from models.base import get_db
-from models.wishlist import Wishlist, WishlistCreate, WishlistUpdate, WishlistResponse
+from models.wishlist import Wishlist, WishlistCreate, WishlistUpdate, WishlistResponse, WishlistSnapshotResponse
 from models.item import WishListItem
+from models.saved_wishlist import SavedWishlist
 from middleware.auth import get_current_user
 from models.user import User
+from services.item_query import ITEM_ORDER, item_count_column, item_projection
+from services.serialization import json_response, snapshot_adapter, wishlist_adapter, wishlist_list_adapter
+from services.etag import PRIVATE_REVALIDATE, etag_matches, not_modified, weak_etag, wishlists_version
+from services.response_cache import PUBLIC_CACHE_CONTROL, cache_lookup, cache_store, invalidate_wishlist, user_tag, wishlist_tag
+from services.share_page import RENDER_TARGET, VERCEL_TARGET, share_page_response
 
-from services.s3_service import upload_file_to_s3, delete_file_from_s3, s3_client
+from services.s3_service import add_s3_references, upload_file_to_s3, schedule_s3_delete, get_s3_client
 BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
 
 
@@ -48,7 +53,7 @@ async def create_wishlist(
 
     if thumbnail_type == 'image' and thumbnail_image is not None:
         try:
-            thumbnail_image_url = await upload_file_to_s3(thumbnail_image, folder="wishlist_thumbnails")
+            thumbnail_image_url = await upload_file_to_s3(thumbnail_image, folder="wishlist_thumbnails", db=db)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading thumbnail: {str(e)}")
 
@@ -83,26 +88,30 @@ async def create_wishlist(
 
     return build_wishlist_response(db_wishlist, item_count)
 
+def list_user_wishlists(db: Session, user_id, skip: int = 0, limit: int = 100) -> List[dict]:
+    """All of a user's wishlists with item counts, newest first (shared by the listing and the home screen)"""
+    rows = db.query(Wishlist, item_count_column()).filter(
+        Wishlist.user_id == user_id
+    ).order_by(Wishlist.created_at.desc(), Wishlist.id).offset(skip).limit(limit).all()
+
+    return [build_wishlist_response(wishlist, item_count) for wishlist, item_count in rows]
+
 @router.get('/', response_model=List[WishlistResponse])
 def get_wishlists(
     skip: int = 0,
     limit: int = 100,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all wishlists for the current user"""
-    wishlists = db.query(Wishlist).filter(
-        Wishlist.user_id == current_user["user_id"]
-    ).offset(skip).limit(limit).all()
-
-    result = []
-    for wishlist in wishlists:
-        item_count = db.query(func.count(WishListItem.id)).filter(
-            WishListItem.wishlist_id == wishlist.id
-        ).scalar() or 0
-        result.append(build_wishlist_response(wishlist, item_count))
+    # Answer revalidations from a single aggregate query, before loading any rows
+    etag = weak_etag(*wishlists_version(db, current_user["user_id"]), skip, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    return result
+    result = list_user_wishlists(db, current_user["user_id"], skip, limit)
+    return json_response(wishlist_list_adapter, result, headers={'ETag': etag, 'Cache-Control': PRIVATE_REVALIDATE})
 
 @router.get('/{wishlist_id}', response_model=WishlistResponse)
 def get_wishlist(
@@ -123,7 +132,7 @@ def get_wishlist(
         WishListItem.wishlist_id == db_wishlist.id
     ).scalar() or 0
 
-    return build_wishlist_response(db_wishlist, item_count)
+    return json_response(wishlist_adapter, build_wishlist_response(db_wishlist, item_count))
 
 @router.put('/{wishlist_id}', response_model=WishlistResponse)
 async def update_wishlist(
@@ -156,15 +165,15 @@ async def update_wishlist(
 
     # Handle thumbnail image upload
     if thumbnail_image is not None:
-        if db_wishlist.thumbnail_image is not None:
-            delete_file_from_s3(db_wishlist.thumbnail_image)
         try:
-            db_wishlist.thumbnail_image = await upload_file_to_s3(thumbnail_image, folder="wishlist_thumbnails")
+            thumbnail_image_url = await upload_file_to_s3(thumbnail_image, folder="wishlist_thumbnails", db=db)
+            schedule_s3_delete(db_wishlist.thumbnail_image, db=db)
+            db_wishlist.thumbnail_image = thumbnail_image_url
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading thumbnail: {str(e)}")
     elif remove_thumbnail_image:
         if db_wishlist.thumbnail_image is not None:
-            delete_file_from_s3(db_wishlist.thumbnail_image)
+            schedule_s3_delete(db_wishlist.thumbnail_image, db=db)
             db_wishlist.thumbnail_image = None
 
     # Handle due date
@@ -198,6 +207,7 @@ async def update_wishlist(
 
     db.commit()
     db.refresh(db_wishlist)
+    invalidate_wishlist(wishlist_id)
 
     item_count = db.query(func.count(WishListItem.id)).filter(
         WishListItem.wishlist_id == db_wishlist.id
@@ -220,18 +230,78 @@ def delete_wishlist(
     if db_wishlist is None:
         raise HTTPException(status_code=404, detail="Wishlist not found")
 
-    for item in db_wishlist.items:
-        if item.image is not None:
-            delete_file_from_s3(str(item.image))
-
-    if db_wishlist.thumbnail_image is not None:
-        delete_file_from_s3(db_wishlist.thumbnail_image)
+    # Images go once the delete commits
+    schedule_s3_delete(*(item.image for item in db_wishlist.items), db_wishlist.thumbnail_image, db=db)
 
     db.delete(db_wishlist)
     db.commit()
+    invalidate_wishlist(wishlist_id)
 
     return {"message": "Wishlist deleted successfully"}
 
+@router.post('/{wishlist_id}/clone', response_model=WishlistResponse)
+def clone_wishlist(
+    wishlist_id: uuid.UUID,
+    title: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Copy a wishlist the user owns or has saved, including its items and images"""
+    user_id = uuid.UUID(str(current_user["user_id"]))
+
+    source = db.query(Wishlist).outerjoin(
+        SavedWishlist, and_(SavedWishlist.wishlist_id == Wishlist.id, SavedWishlist.user_id == user_id)
+    ).filter(
+        Wishlist.id == wishlist_id,
+        or_(Wishlist.user_id == user_id, and_(SavedWishlist.id.isnot(None), Wishlist.is_public == True))
+    ).first()
+
+    if source is None:
+        raise HTTPException(status_code=404, detail="Wishlist not found")
+
+    db_wishlist = Wishlist(
+        user_id=user_id,
+        title=title or f"{source.title} (copy)",
+        description=source.description,
+        color=source.color,
+        is_public=False,
+        image=source.image,
+        thumbnail_type=source.thumbnail_type,
+        thumbnail_icon=source.thumbnail_icon,
+        thumbnail_image=source.thumbnail_image,
+        use_item_colors=source.use_item_colors,
+        default_view=source.default_view,
+        due_date=source.due_date
+    )
+    db.add(db_wishlist)
+    db.flush()
+
+    # One INSERT ... SELECT for all items; claims and purchase state are not carried over
+    item_rows = select(
+        func.gen_random_uuid(),
+        literal(user_id, PG_UUID(as_uuid=True)),
+        literal(db_wishlist.id, PG_UUID(as_uuid=True)),
+        WishListItem.name,
+        WishListItem.description,
+        WishListItem.price,
+        WishListItem.url,
+        WishListItem.image,
+        literal(False),
+        WishListItem.priority,
+        WishListItem.position
+    ).where(WishListItem.wishlist_id == wishlist_id)
+    copied_images = db.scalars(insert(WishListItem).from_select([
+        'id', 'user_id', 'wishlist_id', 'name', 'description', 'price', 'url', 'image',
+        'is_purchased', 'priority', 'position'
+    ], item_rows).returning(WishListItem.image)).all()
+
+    # Images are shared, not copied: one reference per new row, in the same transaction as the rows
+    add_s3_references(db, *copied_images, db_wishlist.thumbnail_image)
+    db.commit()
+
+    db.refresh(db_wishlist)
+    return build_wishlist_response(db_wishlist, len(copied_images))
+
 @router.get('/user/{user_id}', response_model=List[WishlistResponse])
 def get_user_wishlists(
     user_id: uuid.UUID,
@@ -240,19 +310,13 @@ def get_user_wishlists(
     db: Session = Depends(get_db)
 ):
     """Get public wishlists for a specific user (for friends view)"""
-    wishlists = db.query(Wishlist).filter(
+    rows = db.query(Wishlist, item_count_column()).filter(
         Wishlist.user_id == user_id,
         Wishlist.is_public == True
     ).offset(skip).limit(limit).all()
 
-    result = []
-    for wishlist in wishlists:
-        item_count = db.query(func.count(WishListItem.id)).filter(
-            WishListItem.wishlist_id == wishlist.id
-        ).scalar() or 0
-        result.append(build_wishlist_response(wishlist, item_count))
-
-    return result
+    result = [build_wishlist_response(wishlist, item_count) for wishlist, item_count in rows]
+    return json_response(wishlist_list_adapter, result)
 
 @router.get('/public/{wishlist_id}', response_model=WishlistResponse)
 def get_public_wishlist(
@@ -260,6 +324,11 @@ def get_public_wishlist(
     db: Session = Depends(get_db)
 ):
     """Get a public wishlist without authentication"""
+    cache_key = f"wishlists:public:{wishlist_id}"
+    cached = cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+
     db_wishlist = db.query(Wishlist).filter(
         Wishlist.id == wishlist_id,
         Wishlist.is_public == True
@@ -272,7 +341,65 @@ def get_public_wishlist(
         WishListItem.wishlist_id == db_wishlist.id
     ).scalar() or 0
 
-    return build_wishlist_response(db_wishlist, item_count)
+    response = json_response(wishlist_adapter, build_wishlist_response(db_wishlist, item_count))
+    return cache_store(cache_key, response, [wishlist_tag(wishlist_id)])
+
+def _snapshot_response(db: Session, wishlist_id: uuid.UUID, *criteria) -> Tuple[Response, uuid.UUID]:
+    """
+    Wishlist, owner and projected items in two queries; item_count comes from the items.
+    The ETag hashes the body so unchanged snapshots revalidate with a 304.
+    Returns the response and the owner's id (for cache tagging).
+    """
+    row = db.query(Wishlist, User).outerjoin(
+        User, User.id == Wishlist.user_id
+    ).filter(Wishlist.id == wishlist_id, *criteria).first()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Wishlist not found")
+    db_wishlist, owner = row
+
+    items = item_projection(db).filter(
+        WishListItem.wishlist_id == wishlist_id
+    ).order_by(*ITEM_ORDER).all()
+
+    response = json_response(snapshot_adapter, {
+        'wishlist': build_wishlist_response(db_wishlist, len(items)),
+        'owner': owner,
+        'items': items,
+    })
+    response.headers['ETag'] = weak_etag(wishlist_id, response.body)
+    return response, db_wishlist.user_id
+
+@router.get('/public/{wishlist_id}/snapshot', response_model=WishlistSnapshotResponse)
+def get_public_wishlist_snapshot(
+    wishlist_id: uuid.UUID,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Get a public wishlist with its owner and items in one response, without authentication"""
+    cache_key = f"wishlists:snapshot:{wishlist_id}"
+    cached = cache_lookup(cache_key)
+    if cached is None:
+        response, owner_id = _snapshot_response(db, wishlist_id, Wishlist.is_public == True)
+        cached = cache_store(cache_key, response, [wishlist_tag(wishlist_id), user_tag(owner_id)])
+
+    if etag_matches(if_none_match, cached.headers.get('ETag', '')):
+        return not_modified(cached.headers['ETag'], PUBLIC_CACHE_CONTROL)
+    return cached
+
+@router.get('/{wishlist_id}/snapshot', response_model=WishlistSnapshotResponse)
+def get_wishlist_snapshot(
+    wishlist_id: uuid.UUID,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get one of the user's wishlists with its owner and items in one response"""
+    response, _ = _snapshot_response(db, wishlist_id, Wishlist.user_id == current_user["user_id"])
+    if etag_matches(if_none_match, response.headers['ETag']):
+        return not_modified(response.headers['ETag'])
+    response.headers['Cache-Control'] = PRIVATE_REVALIDATE
+    return response
 
 @router.get('/{wishlist_id}/thumbnail', response_class=Response)
 async def get_wishlist_thumbnail(
@@ -290,7 +417,7 @@ async def get_wishlist_thumbnail(
     try:
         s3_key = db_wishlist.thumbnail_image.split(f"https://{BUCKET_NAME}.s3.amazonaws.com/")[1]
 
-        s3_response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        s3_response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         image_data = s3_response['Body'].read()
 
         content_type = s3_response.get('ContentType', 'image/jpeg')
@@ -303,201 +430,37 @@ async def get_wishlist_thumbnail(
 
 
 
-@router.get('/shared/{wishlist_id}', response_class=HTMLResponse)
-def get_shared_wishlist_meta_page(
-    wishlist_id: uuid.UUID,
-    db: Session = Depends(get_db)
-):
-    """Serve HTML with Open Graph meta tags for shared wishlists"""
-    db_wishlist = db.query(Wishlist).filter(
+def _load_shared_wishlist(db: Session, wishlist_id: uuid.UUID):
+    """Load a public wishlist and its owner in one joined query"""
+    row = db.query(Wishlist, User).outerjoin(
+        User, User.id == Wishlist.user_id
+    ).filter(
         Wishlist.id == wishlist_id,
         Wishlist.is_public == True
     ).first()
 
-    if db_wishlist is None:
+    if row is None:
         raise HTTPException(status_code=404, detail="Wishlist not found")
+    return row
 
-    owner = db.query(User).filter(User.id == db_wishlist.user_id).first()
-    owner_name = (str(owner.name) if owner.name else str(owner.username)) if owner is not None else "User"
-
-    frontend_base = (os.getenv('PUBLIC_FRONTEND_URL', 'https://cardinal-wishlist.onrender.com') or '').rstrip('/')
-    api_base = (os.getenv('PUBLIC_API_URL', 'https://cardinal-wishlist-api.onrender.com') or '').rstrip('/')
-
-    def is_absolute(url: str) -> bool:
-        return url.startswith('http://') or url.startswith('https://')
-
-    frontend_url = f"{frontend_base}/shared/{wishlist_id}"
-
-    og_image = f"{frontend_base}/favicon.ico"
-    if db_wishlist.image is not None and is_absolute(db_wishlist.image):
-        og_image = db_wishlist.image
-    elif owner is not None and owner.pfp is not None:
-        og_image = f"{api_base}/users/{owner.id}/profile-image"
-
-    title_str = db_wishlist.title if db_wishlist.title is not None else "Shared Wishlist"
-    desc_str = db_wishlist.description if db_wishlist.description is not None else f"{owner_name}'s wishlist"
-
-    safe_title = escape(title_str)
-    safe_description = escape(desc_str)
-    safe_frontend_url = escape(frontend_url)
-    safe_og_image = escape(og_image)
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{safe_title}</title>
-        <meta name="description" content="{safe_description}">
-        <link rel="canonical" href="{safe_frontend_url}">
-        <meta name="robots" content="noindex, nofollow">
-
-        <!-- Open Graph / Facebook -->
-        <meta property="og:type" content="website">
-        <meta property="og:url" content="{safe_frontend_url}">
-        <meta property="og:title" content="{safe_title}">
-        <meta property="og:description" content="{safe_description}">
-        <meta property="og:image" content="{safe_og_image}">
-
-        <!-- Twitter -->
-        <meta name="twitter:card" content="summary_large_image">
-        <meta name="twitter:url" content="{safe_frontend_url}">
-        <meta name="twitter:title" content="{safe_title}">
-        <meta name="twitter:description" content="{safe_description}">
-        <meta name="twitter:image" content="{safe_og_image}">
-
-        <!-- Fallback redirect for no-JS environments (crawlers still see meta tags) -->
-        <meta http-equiv="refresh" content="0;url={safe_frontend_url}">
-
-        <!-- Minimal styling so the page is just a dark background -->
-        <style>
-          html, body {{
-            background: #141414;
-            margin: 0;
-            height: 100%;
-          }}
-        </style>
-
-        <!-- Instant JS redirect for real users to avoid flicker -->
-        <script>
-          (function() {{
-            try {{
-              window.location.replace("{safe_frontend_url}");
-            }} catch (e) {{
-              window.location.href = "{safe_frontend_url}";
-            }}
-          }})();
-        </script>
-    </head>
-    <body></body>
-    </html>
-    """
-    return HTMLResponse(
-            content=html_content,
-            headers={"Cache-Control": "public, max-age=600"}
-        )
+@router.get('/shared/{wishlist_id}', response_class=HTMLResponse)
+def get_shared_wishlist_meta_page(
+    wishlist_id: uuid.UUID,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Serve HTML with Open Graph meta tags for shared wishlists"""
+    db_wishlist, owner = _load_shared_wishlist(db, wishlist_id)
+    return share_page_response(RENDER_TARGET, db_wishlist, owner, accept_encoding, if_none_match)
 
 @router.get('/shared/vercel/{wishlist_id}', response_class=HTMLResponse)
 def get_shared_wishlist_meta_page_vercel(
     wishlist_id: uuid.UUID,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Serve HTML with Open Graph meta tags for shared wishlists (Vercel frontend)"""
-    db_wishlist = db.query(Wishlist).filter(
-        Wishlist.id == wishlist_id,
-        Wishlist.is_public == True
-    ).first()
-
-    if db_wishlist is None:
-        raise HTTPException(status_code=404, detail="Wishlist not found")
-
-    owner = db.query(User).filter(User.id == db_wishlist.user_id).first()
-    owner_name = (str(owner.name) if owner.name else str(owner.username)) if owner is not None else "User"
-
-    frontend_base = "https://cardinalwishlist.vercel.app"
-    api_base = (os.getenv('PUBLIC_API_URL', 'https://cardinal-wishlist-api.onrender.com') or '').rstrip('/')
-
-    def is_absolute(url: str) -> bool:
-        return url.startswith('http://') or url.startswith('https://')
-
-    # Redirect to the actual wishlist page on the Vercel frontend
-    frontend_url = f"{frontend_base}/wishlist/{wishlist_id}"
-
-    # Resolve OG image based on thumbnail type
-    og_image = f"{frontend_base}/favicon.png"
-
-    if db_wishlist.thumbnail_type == 'image' and db_wishlist.thumbnail_image:
-        image_path = str(db_wishlist.thumbnail_image)
-        if is_absolute(image_path):
-            og_image = image_path
-        else:
-            og_image = f"{api_base}/{image_path.lstrip('/')}"
-    elif db_wishlist.image is not None and is_absolute(str(db_wishlist.image)):
-        og_image = str(db_wishlist.image)
-    elif owner is not None and owner.pfp is not None:
-        # Icon type or no thumbnail — fall back to owner's profile picture
-        og_image = f"{api_base}/users/{owner.id}/profile-image"
-
-    title_str = db_wishlist.title if db_wishlist.title is not None else "Shared Wishlist"
-    desc_str = db_wishlist.description if db_wishlist.description is not None else f"{owner_name}'s wishlist"
-
-    safe_title = escape(title_str)
-    safe_description = escape(desc_str)
-    safe_frontend_url = escape(frontend_url)
-    safe_og_image = escape(og_image)
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{safe_title}</title>
-        <meta name="description" content="{safe_description}">
-        <link rel="canonical" href="{safe_frontend_url}">
-        <meta name="robots" content="noindex, nofollow">
-
-        <!-- Open Graph / Facebook -->
-        <meta property="og:type" content="website">
-        <meta property="og:url" content="{safe_frontend_url}">
-        <meta property="og:title" content="{safe_title}">
-        <meta property="og:description" content="{safe_description}">
-        <meta property="og:image" content="{safe_og_image}">
-
-        <!-- Twitter -->
-        <meta name="twitter:card" content="summary_large_image">
-        <meta name="twitter:url" content="{safe_frontend_url}">
-        <meta name="twitter:title" content="{safe_title}">
-        <meta name="twitter:description" content="{safe_description}">
-        <meta name="twitter:image" content="{safe_og_image}">
-
-        <!-- Fallback redirect for no-JS environments (crawlers still see meta tags above) -->
-        <meta http-equiv="refresh" content="0;url={safe_frontend_url}">
-
-        <style>
-          html, body {{
-            background: #141414;
-            margin: 0;
-            height: 100%;
-          }}
-        </style>
-
-        <!-- Instant JS redirect for real users -->
-        <script>
-          (function() {{
-            try {{
-              window.location.replace("{safe_frontend_url}");
-            }} catch (e) {{
-              window.location.href = "{safe_frontend_url}";
-            }}
-          }})();
-        </script>
-    </head>
-    <body></body>
-    </html>
-    """
-    return HTMLResponse(
-        content=html_content,
-        headers={"Cache-Control": "public, max-age=600"}
-    )
\ No newline at end of file
+    db_wishlist, owner = _load_shared_wishlist(db, wishlist_id)
+    return share_page_response(VERCEL_TARGET, db_wishlist, owner, accept_encoding, if_none_match)
@@ -0,0 +1,176 @@
+"""
+Production entry point: a supervised pool of uvicorn workers plus background task workers.
+
+    python serve.py [--workers N] [--port 8000] [--max-requests 2000] [--graceful-timeout 30]
+                    [--task-workers 1] [--task-threads 4]
+
+- Workers default to the CPUs available to the container (cgroup quota, then
+  CPU affinity), so one bcrypt hash or background removal no longer stalls
+  every other request.
+- Each worker exits after --max-requests (plus up to 10% jitter, so they do not
+  all restart at once) and the supervisor starts a replacement.
+- On SIGTERM, or when a worker is recycled, it stops accepting connections,
+  closes its event streams and waits up to --graceful-timeout seconds for
+  in-flight requests such as image uploads to finish.
+- --task-workers processes run queued tasks (services/tasks.py); on SIGTERM
+  they finish the task in hand and exit. They also run the scheduled price
+  refresh (services/price_refresh.py) unless PRICE_REFRESH_ENABLED=false;
+  only one process runs a pass at a time.
+- DB_MAX_CONNECTIONS (the share of the database's connection limit this API
+  may use) is split here: each task worker gets a connection per task thread
+  plus housekeeping and, with the price refresh, its reader and writer; web
+  workers share the rest evenly. Each process receives its share as
+  DB_POOL_SIZE. Workers defaulted from the CPU count are capped so each gets
+  at least one connection; an explicit --workers that does not fit is refused.
+
+Settings fall back to the WEB_CONCURRENCY, PORT, MAX_REQUESTS,
+GRACEFUL_TIMEOUT, TASK_WORKERS and TASK_WORKER_THREADS environment variables,
+read after .env is loaded.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import threading
+from socket import socket
+from typing import Callable, List, Optional, Tuple
+
+import uvicorn
+from dotenv import load_dotenv
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: the cgroup v2 quota if set, else the affinity mask"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as handle:
+            quota, period = handle.read().split()
+        if quota != 'max':
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that ends its event streams before waiting on in-flight requests"""
+
+    async def shutdown(self, sockets: Optional[List[socket]] = None) -> None:
+        # Imported here: the supervisor process never loads the app
+        from services.events import event_bus
+        closed = event_bus.close_all()
+        if closed:
+            print(f"Closing {closed} event stream(s) before draining requests")
+        await super().shutdown(sockets=sockets)
+
+def task_pool_size(threads: int, price_refresh: bool) -> int:
+    """Connections a task worker can hold at once: one per task thread, housekeeping, and the refresher's reader and writer"""
+    return threads + 1 + (2 if price_refresh else 0)
+
+def run_worker(config: uvicorn.Config, sockets: List[socket], pool_size: int) -> None:
+    # Own process group: Ctrl+C reaches only the supervisor, which forwards one SIGTERM.
+    # Handlers inherited from the supervisor are reset; uvicorn re-raises the signal on exit
+    os.setpgrp()
+    # Read by models/base.py when the app is imported, which happens in this process
+    os.environ.setdefault('DB_POOL_SIZE', str(pool_size))
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    DrainingServer(config=config).run(sockets=sockets)
+
+def run_task_worker(threads: int, pool_size: int) -> None:
+    os.setpgrp()
+    os.environ.setdefault('DB_POOL_SIZE', str(pool_size))
+    from services.price_refresh import PRICE_REFRESH_ENABLED, PriceRefresher
+    from services.tasks import TaskWorker
+    workers = [TaskWorker(threads=threads)]
+    if PRICE_REFRESH_ENABLED:
+        workers.append(PriceRefresher())
+
+    def stop(signum, frame):
+        for worker in workers:
+            worker.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+def supervise(slots: List[Tuple[Callable, tuple]]) -> None:
+    """Keep one process per (target, args) slot running until SIGTERM/SIGINT, then let each drain"""
+    # Forked from a parent that has not imported the app; each worker loads it itself
+    context = multiprocessing.get_context('fork')
+    stopping = threading.Event()
+
+    def spawn(slot):
+        target, args = slot
+        process = context.Process(target=target, args=args)
+        process.start()
+        return process
+
+    def stop(signum, frame):
+        stopping.set()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    processes = [spawn(slot) for slot in slots]
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping.wait(0.5):
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping.is_set():
+                process.join()
+                print(f"Worker {process.pid} exited with code {process.exitcode}, starting a replacement")
+                processes[index] = spawn(slots[index])
+    for process in processes:
+        process.join()
+
+def main():
+    # Before any setting is read; the workers inherit the environment
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '0')) or None)
+    parser.add_argument('--max-requests', type=int, default=int(os.getenv('MAX_REQUESTS', '2000')))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('GRACEFUL_TIMEOUT', '30')))
+    parser.add_argument('--task-workers', type=int, default=int(os.getenv('TASK_WORKERS', '1')))
+    parser.add_argument('--task-threads', type=int, default=int(os.getenv('TASK_WORKER_THREADS', '4')))
+    args = parser.parse_args()
+
+    budget = int(os.getenv('DB_MAX_CONNECTIONS', '20'))
+    price_refresh = os.getenv('PRICE_REFRESH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    task_pool = task_pool_size(args.task_threads, price_refresh)
+    web_budget = budget - args.task_workers * task_pool
+    if args.workers is None:
+        args.workers = max(1, min(available_cpus(), web_budget))
+    if web_budget < args.workers:
+        parser.error(
+            f"DB_MAX_CONNECTIONS={budget} is too small: {args.task_workers} task worker(s) need {task_pool} "
+            f"connection(s) each, leaving {web_budget} for {args.workers} web worker(s)"
+        )
+    web_pool = web_budget // args.workers
+
+    config = uvicorn.Config(
+        'main:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_max_requests=args.max_requests or None,
+        limit_max_requests_jitter=args.max_requests // 10,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    sock = config.bind_socket()
+    print(f"Starting {args.workers} worker(s) on {args.host}:{args.port}, recycling after ~{args.max_requests} requests, "
+          f"and {args.task_workers} task worker(s); DB connections per web/task worker: {web_pool}/{task_pool}")
+    # Supervised even with one worker, so a recycled worker is always replaced
+    supervise(
+        [(run_worker, (config, [sock], web_pool))] * args.workers +
+        [(run_task_worker, (args.task_threads, task_pool))] * args.task_workers
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Circuit breakers for outbound calls, one per key (the scraper keys them by domain).
+
+closed     calls go through; SCRAPER_BREAKER_FAILURES consecutive failures open it
+open       calls fail at once, without touching the network, for the open period
+half_open  after the open period up to SCRAPER_BREAKER_PROBES calls go through as
+           probes; that many successes close it, any failure reopens it with the
+           open period doubled (up to SCRAPER_BREAKER_MAX_OPEN_SECONDS)
+
+State is per process: each web and task worker learns about a blocked domain
+from its own calls. A breaker unused for SCRAPER_BREAKER_IDLE_SECONDS (longer
+than any open period) is dropped, so the registry holds only recently used
+domains; its transition and rejection counts are kept in the registry's totals.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+SCRAPER_BREAKER_FAILURES = int(os.getenv('SCRAPER_BREAKER_FAILURES', '3'))
+SCRAPER_BREAKER_OPEN_SECONDS = float(os.getenv('SCRAPER_BREAKER_OPEN_SECONDS', '60'))
+SCRAPER_BREAKER_MAX_OPEN_SECONDS = float(os.getenv('SCRAPER_BREAKER_MAX_OPEN_SECONDS', '900'))
+SCRAPER_BREAKER_PROBES = int(os.getenv('SCRAPER_BREAKER_PROBES', '1'))
+SCRAPER_BREAKER_IDLE_SECONDS = max(
+    float(os.getenv('SCRAPER_BREAKER_IDLE_SECONDS', '3600')), SCRAPER_BREAKER_MAX_OPEN_SECONDS
+)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"{key} is failing; not retrying for {retry_after:.0f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+class Call:
+    """Handed to the body of CircuitBreaker.guard(); failure() marks a call that returned normally as failed"""
+    __slots__ = ('failed', 'reason')
+
+    def __init__(self):
+        self.failed = False
+        self.reason = None
+
+    def failure(self, reason: str) -> None:
+        self.failed, self.reason = True, reason
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        key: str,
+        failure_threshold: int = SCRAPER_BREAKER_FAILURES,
+        open_seconds: float = SCRAPER_BREAKER_OPEN_SECONDS,
+        max_open_seconds: float = SCRAPER_BREAKER_MAX_OPEN_SECONDS,
+        probes: int = SCRAPER_BREAKER_PROBES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probes = probes
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0               # consecutive, while closed
+        self.open_seconds = open_seconds
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.transitions = Counter()    # state entered -> count
+        self.rejected = 0
+        self.last_used = clock()
+        self._lock = threading.Lock()
+
+    def _enter(self, state: str, reason: str = '') -> None:
+        print(f"Circuit {self.key}: {self.state} -> {state}" + (f" ({reason})" if reason else ''))
+        self.state = state
+        self.transitions[state] += 1
+        if state == OPEN:
+            self.opened_at = self.clock()
+        elif state == HALF_OPEN:
+            self.probes_in_flight = self.probe_successes = 0
+        else:
+            self.failures = 0
+            self.open_seconds = self.base_open_seconds
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            self.last_used = self.clock()
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - self.clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.key, remaining)
+                self._enter(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.key, self.open_seconds)
+                self.probes_in_flight += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight -= 1
+                self.probe_successes += 1
+                if self.probe_successes >= self.probes:
+                    self._enter(CLOSED, 'probes succeeded')
+            else:
+                self.failures = 0
+
+    def record_failure(self, reason: str) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight -= 1
+                self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+                self._enter(OPEN, f'probe failed: {reason}')
+            elif self.state == CLOSED:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._enter(OPEN, f'{self.failures} consecutive failures, last: {reason}')
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool] = lambda e: True):
+        """
+        Run the block as one call. Exceptions for which is_failure() is true count
+        against the circuit; others, and a normal exit, count as a success unless
+        the block called failure() on the yielded Call.
+        """
+        self.before_call()
+        call = Call()
+        try:
+            yield call
+        except BaseException as e:
+            if is_failure(e):
+                self.record_failure(type(e).__name__)
+            else:
+                self.record_success()
+            raise
+        if call.failed:
+            self.record_failure(call.reason)
+        else:
+            self.record_success()
+
+class BreakerRegistry:
+    """
+    Breakers created on first use per key, with their states and counters for metrics.
+    Creating a breaker first drops those idle for idle_seconds, at most once a minute.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], CircuitBreaker] = CircuitBreaker,
+        idle_seconds: float = SCRAPER_BREAKER_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.factory = factory
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._swept_at = clock()
+        # Counts of dropped breakers, so the totals below never go down
+        self._dropped_transitions = Counter()
+        self._dropped_rejected = 0
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                if self.clock() - self._swept_at >= 60:
+                    self._sweep()
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = self._breakers[key] = self.factory(key)
+        return breaker
+
+    def _sweep(self) -> None:
+        now = self._swept_at = self.clock()
+        for key, breaker in list(self._breakers.items()):
+            # Idle for longer than any open period, so the breaker is not failing anything fast
+            if now - breaker.last_used >= self.idle_seconds and breaker.probes_in_flight == 0:
+                del self._breakers[key]
+                self._dropped_transitions.update(breaker.transitions)
+                self._dropped_rejected += breaker.rejected
+
+    def states(self) -> Dict[str, str]:
+        return {key: breaker.state for key, breaker in list(self._breakers.items())}
+
+    def tripped(self, limit: int = 50) -> Dict[str, str]:
+        """Keys whose breaker is not closed, most recently opened first, at most `limit`"""
+        breakers = sorted(
+            (breaker for breaker in list(self._breakers.values()) if breaker.state != CLOSED),
+            key=lambda breaker: breaker.opened_at, reverse=True
+        )
+        return {breaker.key: breaker.state for breaker in breakers[:limit]}
+
+    def transitions(self) -> Dict[str, int]:
+        """State entered -> count, over every breaker this registry has held"""
+        totals = Counter(self._dropped_transitions)
+        for breaker in list(self._breakers.values()):
+            totals.update(breaker.transitions)
+        return dict(totals)
+
+    def rejected(self) -> int:
+        return self._dropped_rejected + sum(breaker.rejected for breaker in list(self._breakers.values()))
@@ -0,0 +1,61 @@
+import hashlib
+import uuid
+from typing import Optional, Tuple
+from fastapi import Response
+from sqlalchemy import true
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models.item import WishListItem
+from models.wishlist import Wishlist
+
+# Listings are private to the user and must be revalidated on every fetch
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+def weak_etag(*parts) -> str:
+    """Build a weak ETag from version parts (counts, timestamps, query params)"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in if_none_match.split(','))
+
+def not_modified(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """304 response carrying the current validator"""
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+def _last_modified(model):
+    """Newest write time of a table, falling back to creation for never-updated rows"""
+    return func.max(func.coalesce(model.updated_at, model.created_at))
+
+def wishlists_version(db: Session, user_id) -> Tuple:
+    """
+    Cheap version of a user's wishlist listing: wishlist and item counts plus their
+    newest timestamps. Items are included because each wishlist reports its item_count.
+    """
+    wishlist_stats = db.query(func.count(Wishlist.id), _last_modified(Wishlist)).filter(
+        Wishlist.user_id == user_id
+    ).subquery()
+    item_stats = db.query(func.count(WishListItem.id), _last_modified(WishListItem)).filter(
+        WishListItem.user_id == user_id
+    ).subquery()
+    # Each side is a single aggregate row, so joining them on true yields exactly one row
+    return tuple(db.query(wishlist_stats, item_stats).select_from(wishlist_stats).join(item_stats, true()).one())
+
+def wishlist_items_version(db: Session, wishlist_id: uuid.UUID, user_id) -> Optional[Tuple]:
+    """
+    Version of one wishlist's items, or None if the wishlist is not owned by the user.
+    Doubles as the ownership check so a 304 costs a single aggregate query.
+    """
+    return db.query(func.count(WishListItem.id), _last_modified(WishListItem)).select_from(Wishlist).outerjoin(
+        WishListItem, WishListItem.wishlist_id == Wishlist.id
+    ).filter(
+        Wishlist.id == wishlist_id,
+        Wishlist.user_id == user_id
+    ).group_by(Wishlist.id).first()
@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import threading
+import time
+from typing import Dict, Optional, Set
+
+import orjson
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def encode(self) -> bytes:
+        """Server-Sent Events wire format"""
+        return b'id: %d\nevent: %s\ndata: %s\n\n' % (self.id, self.type.encode(), orjson.dumps(self.data))
+
+class Subscription:
+    """
+    One listener's bounded queue. When a slow client lets it fill up, the oldest
+    events are dropped and the stream is told to resync instead of growing memory.
+    """
+
+    def __init__(self, topics: Set[str], max_queue: int):
+        self.topics = topics
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max_queue)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+        self.overflowed = False
+        self.closed = False
+
+    def _deliver(self, event: Event) -> None:
+        # Always runs on the subscriber's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.overflowed = True
+        self.queue.put_nowait(event)
+
+    def close(self) -> None:
+        """End the stream; runs on the subscriber's loop and wakes a waiting next_event()"""
+        self.closed = True
+        if self.queue.empty():
+            self.queue.put_nowait(None)
+
+    async def next_event(self, timeout: float) -> Optional[Event]:
+        """Next event, or None if nothing arrived within the timeout (time for a heartbeat)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventBus:
+    """
+    In-process pub/sub keyed by topic ("user:<id>", "wishlist:<id>").
+
+    publish() is thread-safe so sync route handlers running in the threadpool can
+    call it; delivery hops onto each subscriber's loop. Events only reach clients
+    connected to the same worker process.
+    """
+
+    def __init__(self):
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(int(time.time() * 1000))
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, *topics: str, max_queue: int = 100) -> Subscription:
+        subscription = Subscription(set(topics), max_queue)
+        with self._lock:
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+            self.dropped += subscription.dropped
+
+    def publish(self, topic: str, event_type: str, data: dict) -> int:
+        """Send an event to every subscriber of a topic; returns how many were reached"""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+            event = Event(next(self._ids), event_type, data)
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # Subscriber's loop already closed; it is cleaned up on disconnect
+                pass
+        return len(subscribers)
+
+    def close_all(self) -> int:
+        """Ask every open stream to finish, so a shutting-down worker only waits on real requests"""
+        with self._lock:
+            subscriptions = {subscription for subscribers in self._topics.values() for subscription in subscribers}
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.close)
+            except RuntimeError:
+                pass
+        return len(subscriptions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'topics': len(self._topics),
+                'subscriptions': sum(len(subscribers) for subscribers in self._topics.values()),
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+event_bus = EventBus()
+
+def user_topic(user_id) -> str:
+    return f'user:{user_id}'
+
+def wishlist_topic(wishlist_id) -> str:
+    return f'wishlist:{wishlist_id}'
+
+def publish_to_user(user_id, event_type: str, data: dict) -> None:
+    if user_id is not None:
+        event_bus.publish(user_topic(user_id), event_type, data)
+
+def publish_to_wishlist(wishlist_id, event_type: str, data: dict) -> None:
+    if wishlist_id is not None:
+        event_bus.publish(wishlist_topic(wishlist_id), event_type, data)
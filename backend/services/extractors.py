@@ -0,0 +1,332 @@
+"""
+Site extractors for the scraper, keyed by domain.
+
+An extractor turns a fetched product page into {name, price, image_url,
+description, url}, or {"error": ...}; for a CAPTCHA or bot-check page the error
+also carries "blocked": True, which the scraper's circuit breaker counts.
+Site-specific extractors register the domains they handle with @site_extractor;
+extractor_for() matches a URL's host against the registry, dropping leading
+labels until a registered domain is found (so smile.amazon.co.uk finds
+amazon.co.uk), and falls back to GENERIC. site_domain() gives the same
+registered domain, or the host's last two labels (three under a country's
+co./com. suffix), which the scraper keys its circuit breakers and metrics by.
+
+The generic extractor reads only the document <head>: JSON-LD Product data,
+then OpenGraph and twitter meta tags, then <title>. It stops at </head> or
+<body>, so it never tokenizes the page body, which is most of the bytes and
+nearly all the cost of a full parse.
+"""
+import ipaddress
+import json
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+class SiteExtractor(NamedTuple):
+    name: str
+    parse: Callable[[bytes, str], dict]      # (page content, url) -> product dict or {"error": ...}
+    clean_url: Callable[[str], str]          # applied before fetching
+
+EXTRACTORS: Dict[str, SiteExtractor] = {}
+
+NO_PRODUCT_ERROR = "Could not extract product details. The page may be blocked or have a different layout."
+BLOCKED_ERROR = "The site answered with a bot check instead of the product page. Try again later."
+
+# Titles of common bot-check and CAPTCHA interstitials (Cloudflare, Akamai, PerimeterX, Amazon)
+BLOCKED_TITLES = ('robot check', 'attention required', 'just a moment', 'access denied', 'pardon our interruption', 'are you a robot')
+
+def site_extractor(name: str, domains: List[str], clean_url: Callable[[str], str] = lambda url: url):
+    """Register the decorated parse function for these domains (and their subdomains)"""
+    def register(parse):
+        extractor = SiteExtractor(name, parse, clean_url)
+        for domain in domains:
+            EXTRACTORS[domain] = extractor
+        return parse
+    return register
+
+# Second-level labels under which country TLDs register names (shop.co.uk, shop.com.au)
+_COUNTRY_SECOND_LEVELS = {'co', 'com', 'net', 'org', 'gov', 'edu', 'ac', 'ne', 'or', 'go'}
+
+def _registered_domain(url: str) -> Optional[str]:
+    labels = (urlparse(url).hostname or '').lower().rstrip('.').split('.')
+    for start in range(len(labels) - 1):
+        domain = '.'.join(labels[start:])
+        if domain in EXTRACTORS:
+            return domain
+    return None
+
+def extractor_for(url: str) -> SiteExtractor:
+    domain = _registered_domain(url)
+    return EXTRACTORS[domain] if domain is not None else GENERIC
+
+def site_domain(url: str) -> str:
+    """The registered domain of a URL's host, so every subdomain of a shop shares one key; IP addresses are kept whole"""
+    domain = _registered_domain(url)
+    if domain is not None:
+        return domain
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    keep = 3 if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in _COUNTRY_SECOND_LEVELS else 2
+    return '.'.join(labels[-keep:]) or 'unknown'
+
+def _parse_price(value) -> Optional[float]:
+    """
+    A price from a number or text. With both separators the later one is the decimal
+    point ("1,299.99", "1.299,99"); a lone separator before exactly three digits groups
+    thousands ("1,299", "1.299"), otherwise it is the decimal point ("12,99", "0.125").
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'\d[\d.,]*', str(value))
+    if not match:
+        return None
+    number = match.group().rstrip('.,')
+    decimal = max(number.rfind(','), number.rfind('.'))
+    if decimal != -1 and not (',' in number and '.' in number):
+        if number.count(number[decimal]) > 1 or (len(number) - decimal == 4 and not number.startswith('0')):
+            decimal = -1
+    whole = number[:decimal] if decimal != -1 else number
+    fraction = number[decimal + 1:] if decimal != -1 else ''
+    try:
+        return float(re.sub(r'[.,]', '', whole) + '.' + (fraction or '0'))
+    except ValueError:
+        return None
+
+# --- Amazon ---
+
+AMAZON_DOMAINS = [
+    'amazon.com', 'amazon.ca', 'amazon.com.mx', 'amazon.com.br', 'amazon.co.uk', 'amazon.de',
+    'amazon.fr', 'amazon.it', 'amazon.es', 'amazon.nl', 'amazon.se', 'amazon.pl', 'amazon.com.be',
+    'amazon.com.tr', 'amazon.ae', 'amazon.sa', 'amazon.eg', 'amazon.in', 'amazon.co.jp',
+    'amazon.sg', 'amazon.com.au',
+]
+
+def clean_amazon_url(url: str) -> str:
+    """Remove tracking/query parameters to prevent 400 Bad Request errors, keeping the store's host"""
+    parsed = urlparse(url)
+    base = f"https://{parsed.netloc.lower()}{parsed.path}"
+    return base.split("/ref=")[0]
+
+@site_extractor('amazon', AMAZON_DOMAINS, clean_url=clean_amazon_url)
+def parse_amazon_page(content: bytes, url: str) -> dict:
+    # bs4 is imported on first scrape rather than at app startup
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, "html.parser")
+
+    # --- Detect Captcha / Blocked Page ---
+    text = soup.text.lower()
+    if "captcha" in text or "enter the characters" in text:
+        return {"error": "Blocked by Amazon CAPTCHA. Try again later or use a different IP.", "blocked": True}
+
+    # --- Product Title ---
+    title = None
+    for sel in ["#productTitle", "span.a-size-large.product-title-word-break"]:
+        el = soup.select_one(sel)
+        if el:
+            title = el.get_text(strip=True)
+            break
+
+    # --- Price ---
+    price = None
+    for sel in [
+        "#corePrice_feature_div .a-offscreen",
+        ".a-price .a-offscreen",
+        "#price_inside_buybox",
+        "span.a-color-price",
+    ]:
+        el = soup.select_one(sel)
+        if el:
+            price_text = el.get_text(strip=True).replace("$", "").replace(",", "")
+            try:
+                price = float(price_text)
+                break
+            except ValueError:
+                continue
+
+    # --- Image ---
+    image_url = None
+    img = soup.select_one("#imgTagWrapperId img")
+    if img and "data-a-dynamic-image" in img.attrs:
+        try:
+            image_data = json.loads(img["data-a-dynamic-image"])
+            image_url = list(image_data.keys())[0]
+        except Exception:
+            pass
+
+    if not image_url:
+        fallback_img = soup.select_one("#landingImage") or soup.select_one("#imgBlkFront")
+        if fallback_img and "src" in fallback_img.attrs:
+            image_url = fallback_img["src"]
+
+    # --- Description ---
+    description = None
+    for sel in ["#feature-bullets ul", "#productDescription"]:
+        el = soup.select_one(sel)
+        if el:
+            description = el.get_text(separator=" ", strip=True)
+            break
+
+    if not title:
+        return {"error": NO_PRODUCT_ERROR}
+
+    return {
+        "name": title,
+        "price": price,
+        "image_url": image_url,
+        "description": description,
+        "url": url,
+    }
+
+# --- Generic <head> metadata ---
+
+_HEAD_END = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+_CHARSET = re.compile(rb'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+class _EndOfHead(Exception):
+    pass
+
+class _HeadParser(HTMLParser):
+    """Collects <meta>, <title> and JSON-LD from the head, raising _EndOfHead where the body starts"""
+
+    def __init__(self):
+        super().__init__()
+        self.meta: Dict[str, str] = {}
+        self.json_ld: List[str] = []
+        self.title = ''
+        self._capture: Optional[str] = None
+        self._buffer: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            raise _EndOfHead
+        attrs = dict(attrs)
+        if tag == 'meta':
+            key = (attrs.get('property') or attrs.get('name') or attrs.get('itemprop') or '').lower()
+            if key and attrs.get('content') and key not in self.meta:
+                self.meta[key] = attrs['content'].strip()
+        elif tag == 'title' or (tag == 'script' and (attrs.get('type') or '').lower() == 'application/ld+json'):
+            self._capture, self._buffer = tag, []
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            raise _EndOfHead
+        if tag == self._capture:
+            text = ''.join(self._buffer)
+            if tag == 'title':
+                self.title = self.title or text.strip()
+            else:
+                self.json_ld.append(text)
+            self._capture = None
+
+    def handle_data(self, data):
+        if self._capture:
+            self._buffer.append(data)
+
+def _json_ld_product(blocks: List[str]) -> Optional[dict]:
+    """The first schema.org Product in the JSON-LD blocks, looking inside lists and @graph"""
+    pending = []
+    for block in blocks:
+        try:
+            pending.append(json.loads(block))
+        except ValueError:
+            continue
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict):
+            types = node.get('@type')
+            if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+                return node
+            if isinstance(node.get('@graph'), list):
+                pending.extend(node['@graph'])
+    return None
+
+def _first_url(image) -> Optional[str]:
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get('url') or image.get('contentUrl')
+    return image if isinstance(image, str) else None
+
+def _offer_price(offers) -> Optional[float]:
+    if isinstance(offers, list):
+        for offer in offers:
+            price = _offer_price(offer)
+            if price is not None:
+                return price
+        return None
+    if not isinstance(offers, dict):
+        return None
+    for key in ('price', 'lowPrice'):
+        price = _parse_price(offers.get(key))
+        if price is not None:
+            return price
+    spec = offers.get('priceSpecification')
+    return _parse_price(spec.get('price')) if isinstance(spec, dict) else None
+
+def _decode_head(head: bytes) -> str:
+    match = _CHARSET.search(head)
+    if match:
+        try:
+            return head.decode(match.group(1).decode('ascii'), errors='replace')
+        except LookupError:
+            pass
+    return head.decode('utf-8', errors='replace')
+
+def parse_head_metadata(content: bytes, url: str) -> dict:
+    end = _HEAD_END.search(content)
+    head = content[:end.end()] if end else content
+
+    parser = _HeadParser()
+    try:
+        parser.feed(_decode_head(head))
+        parser.close()
+    except _EndOfHead:
+        pass
+    meta = parser.meta
+    title = parser.title.lower()
+    if any(blocked in title for blocked in BLOCKED_TITLES):
+        return {"error": BLOCKED_ERROR, "blocked": True}
+    product = _json_ld_product(parser.json_ld) or {}
+
+    def first(*values):
+        return next((value for value in values if value), None)
+
+    name = first(
+        product.get('name') if isinstance(product.get('name'), str) else None,
+        meta.get('og:title'), meta.get('twitter:title'), parser.title
+    )
+    if not name:
+        return {"error": NO_PRODUCT_ERROR}
+
+    price = _offer_price(product.get('offers'))
+    if price is None:
+        price = _parse_price(first(
+            meta.get('product:price:amount'), meta.get('og:price:amount'), meta.get('price')
+        ))
+
+    description = product.get('description') if isinstance(product.get('description'), str) else None
+    return {
+        "name": name.strip(),
+        "price": price,
+        "image_url": first(
+            _first_url(product.get('image')), meta.get('og:image'), meta.get('og:image:url'),
+            meta.get('twitter:image'), meta.get('twitter:image:src')
+        ),
+        "description": first(
+            description and description.strip(), meta.get('og:description'),
+            meta.get('twitter:description'), meta.get('description')
+        ),
+        "url": url,
+    }
+
+GENERIC = SiteExtractor('generic', parse_head_metadata, lambda url: url)
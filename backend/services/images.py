@@ -0,0 +1,102 @@
+"""
+Ingest-time image normalization, run in a process pool.
+
+Uploaded photos are rotated upright from their EXIF orientation, stripped of
+metadata (EXIF, GPS, XMP), downscaled to IMAGE_MAX_DIMENSION on the longest
+side and re-encoded as IMAGE_FORMAT at IMAGE_QUALITY. Decoding and encoding are
+CPU-bound and hold the GIL, so they run in worker processes instead of the
+event loop's threadpool. Input Pillow cannot decode, and animations, are
+stored unchanged.
+
+This module imports nothing from the app, so pool processes start quickly.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '2048'))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP').upper()     # WEBP or JPEG
+IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', '2'))
+
+CONTENT_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'normalized': 0, 'unchanged': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+def normalize_image(
+    data: bytes,
+    max_dimension: int = IMAGE_MAX_DIMENSION,
+    quality: int = IMAGE_QUALITY,
+    image_format: str = IMAGE_FORMAT
+) -> Optional[Tuple[bytes, str]]:
+    """Normalized (bytes, content type), or None when the input should be stored as is"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        img = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        return None
+    if getattr(img, 'n_frames', 1) > 1:
+        return None
+
+    # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than decoding full size and shrinking
+    img.draft('RGB', (max_dimension, max_dimension))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    if image_format == 'JPEG' or not has_alpha:
+        img = img.convert('RGB')
+    else:
+        img = img.convert('RGBA')
+
+    # Only the ICC profile is carried over (it affects colours); EXIF, GPS and XMP are dropped
+    options = {'quality': quality, 'icc_profile': img.info.get('icc_profile')}
+    if image_format == 'WEBP':
+        options['method'] = 4
+    else:
+        options.update(optimize=True, progressive=True)
+    buffer = io.BytesIO()
+    img.save(buffer, image_format, **options)
+    return buffer.getvalue(), CONTENT_TYPES[image_format]
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the web worker has threads running when the pool starts
+                _pool = ProcessPoolExecutor(
+                    max_workers=IMAGE_PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pool
+
+async def normalize_upload(data: bytes, name: str = 'upload') -> Optional[Tuple[bytes, str]]:
+    """normalize_image in the process pool, logging the bytes saved"""
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(_get_pool(), normalize_image, data)
+    except Exception as e:
+        print(f"Image normalization failed for {name}, storing original: {e}")
+        result = None
+
+    with _stats_lock:
+        _stats['bytes_in'] += len(data)
+        _stats['bytes_out'] += len(result[0]) if result else len(data)
+        _stats['normalized' if result else 'unchanged'] += 1
+    if result:
+        print(f"Image {name}: {len(data)} -> {len(result[0])} bytes ({len(data) - len(result[0])} saved)")
+    return result
+
+def ingest_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, 'bytes_saved': _stats['bytes_in'] - _stats['bytes_out']}
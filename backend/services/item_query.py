@@ -0,0 +1,84 @@
+import uuid
+from typing import List, Optional
+from sqlalchemy import Float, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session, Query, aliased
+from sqlalchemy.sql import func
+
+from models.item import WishListItem, WishListItemResponse
+from models.user import User
+from models.wishlist import Wishlist
+
+# Only the columns WishListItemResponse serializes, kept in sync with the model
+ITEM_RESPONSE_COLUMNS = [
+    getattr(WishListItem, field)
+    for field in WishListItemResponse.model_fields
+    if field != 'claimed_by_display_name'
+]
+
+def item_count_column():
+    """Correlated item count per wishlist row, so listings need no query per wishlist"""
+    return select(func.count(WishListItem.id)).where(
+        WishListItem.wishlist_id == Wishlist.id
+    ).correlate(Wishlist).scalar_subquery().label('item_count')
+
+def item_projection(db: Session) -> Query:
+    """Query item response rows with the claimer's display name computed by the database"""
+    # Claimer is joined under an alias so only its name columns are read,
+    # never the full row (which includes the password hash)
+    claimer = aliased(User)
+
+    # Registered claimer's name, then username, then guest name
+    claimed_by_display_name = func.coalesce(
+        func.nullif(claimer.name, ''),
+        claimer.username,
+        WishListItem.claimed_by_name
+    ).label('claimed_by_display_name')
+
+    return db.query(*ITEM_RESPONSE_COLUMNS, claimed_by_display_name).outerjoin(
+        claimer, WishListItem.claimed_by_user_id == claimer.id
+    )
+
+# Manual order first; never-ordered items keep their creation order at the end
+ITEM_ORDER = (WishListItem.position.asc().nullslast(), WishListItem.created_at.asc())
+
+# Spacing between positions written by a full reorder, leaving room for midpoint moves
+POSITION_GAP = 1024.0
+
+def write_positions(db: Session, wishlist_id: uuid.UUID, user_id: uuid.UUID, ordered_ids: List[uuid.UUID]) -> List[uuid.UUID]:
+    """
+    Write gapped positions for the given item order in one UPDATE ... FROM (VALUES ...).
+    Returns the ids actually updated (items outside the wishlist or not owned are skipped).
+    """
+    if not ordered_ids:
+        return []
+    new_order = values(
+        column('id', UUID(as_uuid=True)),
+        column('position', Float),
+        name='new_order'
+    ).data([(item_id, (index + 1) * POSITION_GAP) for index, item_id in enumerate(ordered_ids)])
+
+    return list(db.execute(
+        update(WishListItem).where(
+            WishListItem.id == new_order.c.id,
+            WishListItem.wishlist_id == wishlist_id,
+            WishListItem.user_id == user_id
+        ).values(position=new_order.c.position).returning(WishListItem.id).execution_options(synchronize_session=False)
+    ).scalars())
+
+def renumber_positions(db: Session, wishlist_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    """Re-space every item of a wishlist in its current display order"""
+    ordered_ids = [row.id for row in db.query(WishListItem.id).filter(
+        WishListItem.wishlist_id == wishlist_id
+    ).order_by(*ITEM_ORDER)]
+    write_positions(db, wishlist_id, user_id, ordered_ids)
+
+def position_between(lower: Optional[float], upper: Optional[float]) -> Optional[float]:
+    """Position strictly between two neighbours (None for an open end), or None if there is no room left"""
+    if lower is None and upper is None:
+        return POSITION_GAP
+    if upper is None:
+        return lower + POSITION_GAP
+    candidate = upper / 2 if lower is None else (lower + upper) / 2
+    low = 0.0 if lower is None else lower
+    return candidate if low < candidate < upper else None
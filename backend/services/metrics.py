@@ -0,0 +1,188 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Request latency buckets in seconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense; callers hold the registry lock"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestStats:
+    """Work done on behalf of one request, filled in by engine and client hooks"""
+    __slots__ = ('sql_count', 'sql_seconds')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+# Set by the middleware; the object is shared with threadpool workers through the copied context
+current_request: ContextVar[Optional[RequestStats]] = ContextVar('current_request', default=None)
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text format.
+    Each worker process keeps its own registry. serve.py's workers share one listening
+    socket, so a scrape is answered by whichever worker accepts it and shows that
+    worker's counts only; with several workers, read the numbers as a sample.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.sql: Dict[str, List[float]] = {}                   # route -> [statements, seconds]
+        self.calls: Dict[Tuple[str, str], List[float]] = {}     # (service, operation) -> [count, seconds, errors]
+        self.gauges: Dict[str, Tuple[str, Callable[[], dict]]] = {}  # name -> (help, collect)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = Histogram()
+            histogram.observe(seconds)
+            key = (method, route, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+            sql = self.sql.setdefault(route, [0, 0.0])
+            sql[0] += stats.sql_count
+            sql[1] += stats.sql_seconds
+
+    def observe_sql_outside_request(self, seconds: float) -> None:
+        with self._lock:
+            sql = self.sql.setdefault('<background>', [0, 0.0])
+            sql[0] += 1
+            sql[1] += seconds
+
+    def observe_call(self, service: str, operation: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            call = self.calls.setdefault((service, operation), [0, 0.0, 0])
+            call[0] += 1
+            call[1] += seconds
+            call[2] += int(error)
+
+    def register_gauges(self, name: str, help_text: str, collect: Callable[[], dict]) -> None:
+        """Expose values computed at scrape time; collect() returns {label selector or '': number}"""
+        self.gauges[name] = (help_text, collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines += _header('http_request_duration_seconds', 'Request latency by route', 'histogram')
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+            lines += _header('http_responses_total', 'Responses by route and status', 'counter')
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+            lines += _header('db_statements_total', 'SQL statements executed, by route', 'counter')
+            for route, (count, _) in sorted(self.sql.items()):
+                lines.append(f'db_statements_total{{route="{_escape(route)}"}} {count}')
+            lines += _header('db_statement_seconds_total', 'Time spent executing SQL, by route', 'counter')
+            for route, (_, seconds) in sorted(self.sql.items()):
+                lines.append(f'db_statement_seconds_total{{route="{_escape(route)}"}} {seconds}')
+
+            for name, index, help_text in (
+                ('external_calls_total', 0, 'Calls to S3 and scraped sites'),
+                ('external_call_seconds_total', 1, 'Time spent in calls to S3 and scraped sites'),
+                ('external_call_errors_total', 2, 'Failed calls to S3 and scraped sites'),
+            ):
+                lines += _header(name, help_text, 'counter')
+                for (service, operation), values in sorted(self.calls.items()):
+                    lines.append(f'{name}{{service="{service}",operation="{_escape(operation)}"}} {values[index]}')
+            gauges = list(self.gauges.items())
+
+        for name, (help_text, collect) in gauges:
+            lines += _header(name, help_text, 'gauge')
+            for label, value in collect().items():
+                selector = f'{{{label}}}' if label else ''
+                lines.append(f'{name}{selector} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _header(name: str, help_text: str, metric_type: str) -> List[str]:
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+metrics = MetricsRegistry()
+
+@contextmanager
+def observe_call(service: str, operation: str):
+    """Time an outbound call; exceptions are counted as errors and re-raised"""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        metrics.observe_call(service, operation, time.perf_counter() - start, error)
+
+def instrument_engine(engine) -> None:
+    """Count statements and their execution time against the current request"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        stats = current_request.get()
+        if stats is None:
+            metrics.observe_sql_outside_request(elapsed)
+        else:
+            stats.sql_count += 1
+            stats.sql_seconds += elapsed
+
+def instrument_boto_client(client, service: str = 's3') -> None:
+    """Time every API call a boto3 client makes (PutObject, GetObject, CopyObject, ...)"""
+
+    def _before(model, context, **kwargs):
+        context['metrics_call'] = (model.name, time.perf_counter())
+
+    def _finish(context, error: bool):
+        call = context.pop('metrics_call', None)
+        if call is not None:
+            operation, start = call
+            metrics.observe_call(service, operation, time.perf_counter() - start, error)
+
+    events = client.meta.events
+    events.register(f'before-call.{service}', _before)
+    events.register(f'after-call.{service}', lambda context, **kwargs: _finish(context, error=False))
+    events.register(f'after-call-error.{service}', lambda context, **kwargs: _finish(context, error=True))
+
+def labelled(values: Iterable[Tuple[object, float]], *labels: str) -> dict:
+    """Turn (label value, number) pairs into the mapping register_gauges expects; with several labels, keys are tuples"""
+    if len(labels) == 1:
+        values = (((key,), value) for key, value in values)
+    return {
+        ','.join(f'{label}="{_escape(str(part))}"' for label, part in zip(labels, key)): value
+        for key, value in values
+    }
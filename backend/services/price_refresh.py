@@ -0,0 +1,288 @@
+"""
+Scheduled refresh of item prices from their product URLs.
+
+A pass streams the items whose page has not been checked for
+PRICE_REFRESH_INTERVAL_HOURS through a server-side cursor, PRICE_REFRESH_BATCH_SIZE
+rows at a time; items sharing a page are adjacent and it is fetched once. Each
+batch is grouped by domain and fetched on a shared thread pool with at most
+PRICE_REFRESH_DOMAIN_CONCURRENCY requests in flight per domain.
+
+Fetches are conditional: the ETag and Last-Modified of the previous fetch are
+sent back, so an unchanged page costs a 304. For servers without validators the
+body's sha256 is compared before parsing. Pages on a domain whose circuit breaker
+is open (services/circuit_breaker.py) are skipped until the next poll. URLs on
+hosts that are not public are refused by services/url_guard.py, redirects included.
+
+Per-page state lives in scraped_pages. The first price read from a page only
+seeds it, leaving the prices owners typed in alone; when a known price moves,
+the page's items are updated with one executemany UPDATE per batch, skipping
+items whose price was edited since the batch was read.
+
+Task worker processes run a PriceRefresher thread; a Postgres advisory lock
+keeps passes from running in two processes at once.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models.base import SessionLocal
+from models.item import WishListItem
+from models.scraped_page import ScrapedPage
+from services.extractors import extractor_for, site_domain
+from services.circuit_breaker import CircuitOpenError
+from services.scraper import fetch_page, get_headers, is_domain_failure, parse_product_page, scraper_breakers
+from services.url_guard import BlockedURLError, check_public_url, public_session
+
+PRICE_REFRESH_ENABLED = os.getenv('PRICE_REFRESH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PRICE_REFRESH_INTERVAL_HOURS = float(os.getenv('PRICE_REFRESH_INTERVAL_HOURS', '24'))
+PRICE_REFRESH_POLL_SECONDS = float(os.getenv('PRICE_REFRESH_POLL_SECONDS', '900'))
+PRICE_REFRESH_BATCH_SIZE = int(os.getenv('PRICE_REFRESH_BATCH_SIZE', '500'))
+PRICE_REFRESH_CONCURRENCY = int(os.getenv('PRICE_REFRESH_CONCURRENCY', '16'))
+PRICE_REFRESH_DOMAIN_CONCURRENCY = int(os.getenv('PRICE_REFRESH_DOMAIN_CONCURRENCY', '2'))
+PRICE_REFRESH_DOMAIN_DELAY = float(os.getenv('PRICE_REFRESH_DOMAIN_DELAY', '1'))   # seconds between one slot's requests
+PRICE_REFRESH_TIMEOUT = float(os.getenv('PRICE_REFRESH_TIMEOUT', '15'))
+
+ADVISORY_LOCK_KEY = 0x70726963     # any constant unique among the app's advisory locks
+
+_stats_lock = threading.Lock()
+_stats = {
+    'passes': 0, 'pages': 0, 'not_modified': 0, 'unchanged': 0, 'fetched': 0, 'errors': 0, 'skipped': 0, 'items_updated': 0
+}
+
+_local = threading.local()
+
+def _session():
+    """One requests.Session per pool thread, so connections to a domain are reused"""
+    if not hasattr(_local, 'session'):
+        _local.session = public_session()
+    return _local.session
+
+def fetch_price(url: str, page: dict) -> dict:
+    """Conditionally fetch one page; returns the page's new scraped_pages state plus an 'outcome'"""
+    import requests
+
+    state = {**page, 'url': url, 'last_error': None}
+    headers = get_headers()
+    if page['etag']:
+        headers['If-None-Match'] = page['etag']
+    if page['last_modified']:
+        headers['If-Modified-Since'] = page['last_modified']
+
+    fetch_url = extractor_for(url).clean_url(url)
+    try:
+        # Before the breaker, so a refused host never gets one
+        check_public_url(fetch_url)
+        with scraper_breakers.get(site_domain(fetch_url)).guard(is_domain_failure) as call:
+            response = fetch_page(_session(), fetch_url, headers, timeout=PRICE_REFRESH_TIMEOUT)
+            if response.status_code == 304:
+                return {**state, 'outcome': 'not_modified', 'etag': response.headers.get('ETag') or page['etag']}
+
+            state.update(
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                content_hash=hashlib.sha256(response.content).hexdigest(),
+            )
+            if state['content_hash'] == page['content_hash']:
+                return {**state, 'outcome': 'unchanged'}
+
+            result = parse_product_page(response.content, response.url or url)
+            if result.get('blocked'):
+                call.failure('captcha')
+    except BlockedURLError as e:
+        return {**state, 'outcome': 'errors', 'last_error': f'Refused: {e}'}
+    except CircuitOpenError as e:
+        # Not recorded as checked, so the page is retried on the next poll rather than the next interval
+        return {**state, 'outcome': 'skipped', 'last_error': str(e)}
+    except requests.exceptions.RequestException as e:
+        return {**state, 'outcome': 'errors', 'last_error': str(e)[:500]}
+
+    if 'error' in result or result['price'] is None:
+        # Keep the last good price; a changed layout should not wipe it
+        return {**state, 'outcome': 'errors', 'last_error': result.get('error', 'No price on page')}
+    return {**state, 'outcome': 'fetched', 'price': result['price']}
+
+def _fetch_domain(urls: deque, pages: Dict[str, dict], results: Dict[str, dict], stopping: threading.Event) -> None:
+    """One of a domain's concurrency slots: fetch from the domain's queue until it is empty"""
+    while not stopping.is_set():
+        try:
+            url = urls.popleft()
+        except IndexError:
+            return
+        try:
+            results[url] = fetch_price(url, pages[url])
+        except Exception as e:
+            results[url] = {**pages[url], 'url': url, 'outcome': 'errors', 'last_error': f'Unexpected error: {e}'}
+        # An open circuit refuses the rest of the domain's queue without a request, so there is nothing to pace
+        if urls and PRICE_REFRESH_DOMAIN_DELAY and results[url]['outcome'] != 'skipped':
+            stopping.wait(PRICE_REFRESH_DOMAIN_DELAY)
+
+def refresh_batch(
+    db: Session,
+    pool: ThreadPoolExecutor,
+    rows: List,
+    domain_concurrency: int = PRICE_REFRESH_DOMAIN_CONCURRENCY,
+    stopping: Optional[threading.Event] = None
+) -> dict:
+    """Fetch the pages behind one batch of item rows and write back what changed"""
+    stopping = stopping or threading.Event()
+    pages: Dict[str, dict] = {}
+    items: Dict[str, list] = defaultdict(list)
+    for row in rows:
+        items[row.url].append(row)
+        pages.setdefault(row.url, {
+            'etag': row.etag, 'last_modified': row.last_modified,
+            'content_hash': row.content_hash, 'price': row.page_price, 'changed_at': row.changed_at,
+        })
+
+    by_domain: Dict[str, deque] = defaultdict(deque)
+    for url in pages:
+        by_domain[site_domain(url)].append(url)
+
+    results: Dict[str, dict] = {}
+    futures = [
+        pool.submit(_fetch_domain, urls, pages, results, stopping)
+        for urls in by_domain.values()
+        for _ in range(min(domain_concurrency, len(urls)))
+    ]
+    wait(futures)
+
+    counts = defaultdict(int)
+    item_updates = []
+    for url, state in list(results.items()):
+        outcome = state.pop('outcome')
+        counts[outcome] += 1
+        if outcome == 'skipped':
+            del results[url]
+            continue
+        # Items follow the shop only when a known price moves, so a price the owner typed in
+        # stays until then; the first price read from a page only seeds scraped_pages
+        if state['price'] is None or pages[url]['price'] is None or state['price'] == pages[url]['price']:
+            continue
+        state['changed_at'] = func.now()
+        item_updates += [
+            {'item_id': row.id, 'old_price': row.price, 'new_price': state['price']}
+            for row in items[url] if row.price != state['price']
+        ]
+
+    if results:
+        statement = insert(ScrapedPage).values([{**state, 'checked_at': func.now()} for state in results.values()])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[ScrapedPage.url],
+            set_={column: statement.excluded[column] for column in (
+                'etag', 'last_modified', 'content_hash', 'price', 'last_error', 'checked_at', 'changed_at'
+            )}
+        ))
+    if item_updates:
+        items_table = WishListItem.__table__
+        result = db.execute(
+            update(items_table)
+            # A price the owner edited after this batch was read is left alone
+            .where(
+                items_table.c.id == bindparam('item_id'),
+                items_table.c.price.is_not_distinct_from(bindparam('old_price'))
+            )
+            .values(price=bindparam('new_price'), updated_at=func.now()),
+            item_updates
+        )
+        counts['items_updated'] = result.rowcount
+    db.commit()
+
+    counts['pages'] = len(results)
+    return counts
+
+def run_refresh_pass(
+    max_age_hours: float = PRICE_REFRESH_INTERVAL_HOURS,
+    batch_size: int = PRICE_REFRESH_BATCH_SIZE,
+    concurrency: int = PRICE_REFRESH_CONCURRENCY,
+    domain_concurrency: int = PRICE_REFRESH_DOMAIN_CONCURRENCY,
+    stopping: Optional[threading.Event] = None,
+    exclusive: bool = False
+) -> Optional[dict]:
+    """
+    Refresh every item whose page is older than max_age_hours; returns outcome counts.
+    With exclusive, returns None at once if another process holds the advisory lock.
+    """
+    stopping = stopping or threading.Event()
+    query = (
+        select(
+            WishListItem.id, WishListItem.url, WishListItem.price,
+            ScrapedPage.etag, ScrapedPage.last_modified, ScrapedPage.content_hash,
+            ScrapedPage.price.label('page_price'), ScrapedPage.changed_at
+        )
+        .outerjoin(ScrapedPage, ScrapedPage.url == WishListItem.url)
+        .where(
+            or_(WishListItem.url.startswith('http://'), WishListItem.url.startswith('https://')),
+            WishListItem.is_purchased.isnot(True),
+            or_(ScrapedPage.checked_at.is_(None), ScrapedPage.checked_at < func.now() - timedelta(hours=max_age_hours))
+        )
+        # Hashed so each batch mixes domains (URL order would hand a batch to one shop's
+        # concurrency limit) while items sharing a URL stay adjacent
+        .order_by(func.md5(WishListItem.url))
+    )
+
+    # The cursor holds its transaction open for the pass, so writes go through a second session
+    reader, writer = SessionLocal(), SessionLocal()
+    totals = defaultdict(int)
+    start = time.perf_counter()
+    try:
+        # Held by the reader's transaction, which lasts the whole pass: released when the reader
+        # closes, whether the pass finished or raised, or by Postgres if the process dies
+        if exclusive and not reader.scalar(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))):
+            return None
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='price-refresh') as pool:
+            for rows in reader.execute(query.execution_options(yield_per=batch_size)).partitions():
+                for key, count in refresh_batch(writer, pool, rows, domain_concurrency, stopping).items():
+                    totals[key] += count
+                if stopping.is_set():
+                    break
+    finally:
+        reader.close()
+        writer.close()
+
+    with _stats_lock:
+        _stats['passes'] += 1
+        for key, count in totals.items():
+            _stats[key] += count
+    print(f"Price refresh: {dict(totals)} in {time.perf_counter() - start:.1f}s")
+    return dict(totals)
+
+def refresh_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+class PriceRefresher:
+    """Thread running a refresh pass every PRICE_REFRESH_POLL_SECONDS while it holds the advisory lock"""
+
+    def __init__(self, poll_seconds: float = PRICE_REFRESH_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                run_refresh_pass(stopping=self._stopping, exclusive=True)
+            except Exception as e:
+                print(f"Price refresh failed: {e}")
+            self._stopping.wait(self.poll_seconds)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name='price-refresher')
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def join(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
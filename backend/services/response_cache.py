@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import Response
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    media_type: str
+    expires_at: float
+    tags: Set[str] = field(default_factory=set)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized response bodies with a TTL and a byte budget.
+
+    Entries carry tags (e.g. "wishlist:<id>", "user:<id>") so write paths can
+    invalidate everything derived from a row without knowing the cache keys.
+    Each worker process holds its own cache, and a write invalidates only the cache of
+    the worker that handled it; other workers may serve the old body until it expires,
+    so the TTL is the bound on cross-worker staleness and is kept short.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        media_type: str = 'application/json',
+        tags: Iterable[str] = (),
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        if len(body) > self.max_bytes:
+            return
+        entry = CacheEntry(body, media_type, time.monotonic() + self.ttl_seconds, set(tags), headers or {})
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            # Evict least recently used entries until back under budget
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+# Shared cache for public, unauthenticated endpoints
+public_cache = ResponseCache(
+    ttl_seconds=float(os.getenv('PUBLIC_CACHE_TTL_SECONDS', '5')),
+    max_bytes=int(os.getenv('PUBLIC_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+)
+
+# Browsers and proxies may store public responses but must revalidate each use with the ETag,
+# so a claim or a wishlist made private shows at once; freshness is kept server-side
+PUBLIC_CACHE_CONTROL = 'public, no-cache'
+
+def cache_lookup(key: str, cache: ResponseCache = public_cache) -> Optional[Response]:
+    """Rebuild a cached response, or None on a miss"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    return Response(
+        content=entry.body,
+        media_type=entry.media_type,
+        headers={**entry.headers, 'X-Cache': 'HIT', 'Cache-Control': PUBLIC_CACHE_CONTROL}
+    )
+
+def cache_store(key: str, response: Response, tags: Iterable[str], cache: ResponseCache = public_cache) -> Response:
+    """Store a freshly built 200 response body (and its ETag, if any) and mark it as a miss"""
+    if response.status_code == 200:
+        etag = response.headers.get('ETag')
+        cache.set(key, response.body, response.media_type or 'application/json', tags, {'ETag': etag} if etag else None)
+    response.headers['X-Cache'] = 'MISS'
+    response.headers['Cache-Control'] = PUBLIC_CACHE_CONTROL
+    return response
+
+def wishlist_tag(wishlist_id) -> str:
+    return f'wishlist:{wishlist_id}'
+
+def user_tag(user_id) -> str:
+    return f'user:{user_id}'
+
+def invalidate_wishlist(*wishlist_ids) -> None:
+    """Invalidate cached public responses derived from these wishlists or their items"""
+    public_cache.invalidate(*(wishlist_tag(wishlist_id) for wishlist_id in wishlist_ids if wishlist_id is not None))
+
+def invalidate_user(user_id) -> None:
+    """Invalidate cached public responses derived from this user's profile"""
+    public_cache.invalidate(user_tag(user_id))
@@ -1,22 +1,133 @@
-import boto3
+import asyncio
+import hashlib
 import os
-import uuid
+import threading
+from collections import Counter
+from typing import BinaryIO, List, Optional, Union
 from fastapi import UploadFile
-from botocore.exceptions import ClientError
+from sqlalchemy import Integer, String, column, select, union_all, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
+from models.base import SessionLocal
+from models.item import WishListItem
+from models.stored_object import StoredObject
+from models.user import User
+from models.wishlist import Wishlist
+from services.images import normalize_upload
+from services.metrics import instrument_boto_client
+from services.tasks import enqueue, task_handler
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """
+    The shared boto3 S3 client, created on first use. boto3 and botocore are
+    imported here rather than at startup, which keeps them off the cold-start path.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                client = boto3.client(
+                    's3',
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                    region_name=os.getenv('AWS_REGION')
+                )
+                instrument_boto_client(client)
+                _s3_client = client
+    return _s3_client
 
 BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
 
-async def upload_file_to_s3(file: UploadFile, folder: str = '') -> str:
+# Uploads are hashed in chunks this size, so a large file is never held in memory twice
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _url_for(key: str) -> str:
+    return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+def _key_from_url(url: Optional[str]) -> Optional[str]:
+    prefix = f"https://{BUCKET_NAME}.s3.amazonaws.com/"
+    return url[len(prefix):] if url and url.startswith(prefix) else None
+
+def _acquire(key: str, size: int, content_type: str, db: Optional[Session] = None) -> bool:
+    """Take a reference to `key`, creating its row if needed; True if the bytes are already stored"""
+    session = db or SessionLocal()
+    try:
+        stored_at = session.execute(
+            insert(StoredObject)
+            .values(key=key, size=size, content_type=content_type, ref_count=1)
+            .on_conflict_do_update(
+                index_elements=[StoredObject.key],
+                set_={'ref_count': StoredObject.ref_count + 1, 'updated_at': func.now()}
+            )
+            .returning(StoredObject.stored_at)
+        ).scalar_one()
+        session.commit()
+        return stored_at is not None
+    finally:
+        if db is None:
+            session.close()
+
+def _mark_stored(key: str, db: Optional[Session] = None) -> None:
+    session = db or SessionLocal()
+    try:
+        session.execute(update(StoredObject).where(StoredObject.key == key).values(stored_at=func.now()))
+        session.commit()
+    finally:
+        if db is None:
+            session.close()
+
+def _release_connection(db: Optional[Session]) -> None:
+    # Ends the route's read-only transaction, returning its connection to the pool: a connection
+    # held across the awaits below would leave other requests on this event loop blocked in the pool
+    if db is not None:
+        db.commit()
+
+def _release_failed_upload(key: str, db: Optional[Session] = None) -> None:
+    schedule_s3_delete(_url_for(key), db=db)
+    if db is not None:
+        db.commit()
+
+async def _store(key: str, body: Union[bytes, BinaryIO], size: int, content_type: str, db: Optional[Session] = None) -> str:
     """
-    Upload a file to S3 and return the URL
+    Store content under its content-addressed key and return the URL, which the caller
+    now holds one reference to. Content that is already stored skips the S3 write.
+    The reference is committed before the S3 write, in `db` when given (see upload_file_to_s3).
     """
+    from botocore.exceptions import ClientError
+    if await asyncio.to_thread(_acquire, key, size, content_type, db):
+        return _url_for(key)
+    try:
+        # Upload to S3 off the event loop so concurrent uploads overlap
+        await asyncio.to_thread(
+            get_s3_client().put_object,
+            Bucket=BUCKET_NAME,
+            Key=key,
+            Body=body,
+            ContentType=content_type
+        )
+    except ClientError as e:
+        await asyncio.to_thread(_release_failed_upload, key, db)
+        raise Exception(f"AWS S3 error: {str(e)}")
+    await asyncio.to_thread(_mark_stored, key, db)
+    return _url_for(key)
+
+async def upload_file_to_s3(file: UploadFile, folder: str = '', db: Optional[Session] = None) -> str:
+    """
+    Upload a file to S3 under "<folder>/<sha256 of its content>" and return the URL.
+    Images are normalized first (services/images.py); other files are hashed while
+    the upload is read. Identical content shares one object.
+    
+    Routes pass their session as `db`, so the upload's bookkeeping uses the connection
+    the request already has instead of a second one from the pool. That session is
+    committed, so call this before the route changes anything.
+    """
+    _release_connection(db)
     try:
         # Basic validation
         if not file:
@@ -25,66 +136,125 @@ async def upload_file_to_s3(file: UploadFile, folder: str = '') -> str:
         if not file.filename:
             raise ValueError("Filename is missing")
         
-        # Read file content (only once!)
-        file_content = await file.read()
-        if not file_content:
-            raise ValueError("File content is empty")
-            
-        # Check if the filename contains base64 data
-        if 'base64' in file.filename:
-            # Extract the content type from the filename if possible
-            content_type = file.content_type
-            if not content_type and 'data:' in file.filename and ';base64' in file.filename:
-                content_type = file.filename.split('data:')[1].split(';')[0]
-            
-            # Generate a proper filename instead of using the base64 string
-            unique_filename = f"{uuid.uuid4().hex}.jpg"  # Default to jpg for images
-            if content_type:
-                ext = content_type.split('/')[-1]
-                unique_filename = f"{uuid.uuid4().hex}.{ext}"
-        else:
-            # Normal file handling
-            file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
-            unique_filename = f"{uuid.uuid4().hex}.{file_extension}" if file_extension else f"{uuid.uuid4().hex}"
-        
-        # Create S3 path with optional folder
-        s3_path = f"{folder}/{unique_filename}" if folder else unique_filename
+        # Set content type with fallback; base64 uploads may carry it in the filename
+        content_type = file.content_type
+        if not content_type and 'data:' in file.filename and ';base64' in file.filename:
+            content_type = file.filename.split('data:')[1].split(';')[0]
+        content_type = content_type or 'application/octet-stream'
         
-        # Set content type with fallback
-        content_type = file.content_type or 'application/octet-stream'
+        if content_type.startswith('image/'):
+            data = await file.read()
+            if not data:
+                raise ValueError("File content is empty")
+            normalized = await normalize_upload(data, file.filename[:80])
+            if normalized is not None:
+                data, content_type = normalized
+            return await store_bytes_in_s3(data, folder, content_type, db=db)
         
-        # Upload to S3
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_path,
-            Body=file_content,
-            ContentType=content_type
-        )
+        # Hash the content while reading it in chunks
+        digest = hashlib.sha256()
+        size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        if not size:
+            raise ValueError("File content is empty")
+        await file.seek(0)
         
-        # Generate URL
-        url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{s3_path}"
-        return url
+        key = f"{folder}/{digest.hexdigest()}" if folder else digest.hexdigest()
+        return await _store(key, file.file, size, content_type, db)
         
     except ValueError as e:
         raise Exception(f"Validation error during S3 upload: {str(e)}")
-    except ClientError as e:
-        raise Exception(f"AWS S3 error: {str(e)}")
     except Exception as e:
         raise Exception(f"S3 upload error: {str(e)}")
 
-def delete_file_from_s3(url: str) -> bool:
+async def store_bytes_in_s3(data: bytes, folder: str, content_type: str, db: Optional[Session] = None) -> str:
+    """Content-addressed store of bytes produced by the server (e.g. a processed image); `db` as for upload_file_to_s3"""
+    _release_connection(db)
+    digest = hashlib.sha256(data).hexdigest()
+    return await _store(f"{folder}/{digest}" if folder else digest, data, len(data), content_type, db)
+
+def _still_referenced(db: Session, url: str) -> bool:
+    """Whether any item, wishlist thumbnail or profile picture still uses `url`"""
+    uses = union_all(
+        select(WishListItem.id).where(WishListItem.image == url).limit(1),
+        select(Wishlist.id).where(Wishlist.thumbnail_image == url).limit(1),
+        select(User.id).where(User.pfp == url).limit(1),
+    ).subquery()
+    return db.scalar(select(select(uses).exists()))
+
+@task_handler('s3.delete')
+def _delete_object_task(payload: dict) -> None:
     """
-    Delete a file from S3 using its URL
+    Queued delete; raises on failure so the task is retried. The object is kept if it
+    was referenced again since the task was queued. Its row stays locked until the S3
+    delete is done, so a concurrent upload of the same content waits and rewrites it.
+    Objects from before content addressing have no row and are kept while any row uses their URL.
     """
+    key = _key_from_url(payload['url'])
+    if key is None:
+        return
+    db = SessionLocal()
     try:
-        # Extract the key from the URL
-        key = url.split(f"https://{BUCKET_NAME}.s3.amazonaws.com/")[1]
-        
-        # Delete the object
-        s3_client.delete_object(
-            Bucket=BUCKET_NAME,
-            Key=key
-        )
-        return True
-    except Exception:
-        return False
\ No newline at end of file
+        stored = db.execute(
+            select(StoredObject).where(StoredObject.key == key).with_for_update()
+        ).scalar_one_or_none()
+        if stored is not None and stored.ref_count > 0:
+            return
+        if stored is None and _still_referenced(db, payload['url']):
+            return
+        get_s3_client().delete_object(Bucket=BUCKET_NAME, Key=key)
+        if stored is not None:
+            db.delete(stored)
+        db.commit()
+    finally:
+        db.close()
+
+def _change_references(db: Session, keys: List[str], delta: int) -> dict:
+    """Add `delta` references per occurrence of each key in one UPDATE; returns key -> new count"""
+    counts = Counter(keys)
+    changes = values(
+        column('key', String),
+        column('delta', Integer),
+        name='changes'
+    ).data([(key, delta * count) for key, count in counts.items()])
+    return dict(db.execute(
+        update(StoredObject)
+        .where(StoredObject.key == changes.c.key)
+        .values(ref_count=StoredObject.ref_count + changes.c.delta, updated_at=func.now())
+        .returning(StoredObject.key, StoredObject.ref_count)
+        .execution_options(synchronize_session=False)
+    ).all())
+
+def add_s3_references(db: Session, *urls: Optional[str]) -> None:
+    """
+    Count extra references to objects in the caller's transaction, one per row a URL is
+    copied onto. Objects from before content addressing are not counted; the delete
+    task checks that no row uses them instead.
+    """
+    keys = [key for key in map(_key_from_url, urls) if key]
+    if keys:
+        _change_references(db, keys, 1)
+
+def schedule_s3_delete(*urls: Optional[str], db: Optional[Session] = None) -> None:
+    """
+    Drop one reference to each object; objects left without references are deleted by
+    the task queue. With `db`, this joins that session's transaction and only happens
+    if it commits; without, it is committed right away (cleanup after a rollback).
+    """
+    keys = [key for key in map(_key_from_url, urls) if key]
+    if not keys:
+        return
+    session = db or SessionLocal()
+    try:
+        remaining = _change_references(session, keys, -1)
+        for key in dict.fromkeys(keys):
+            # Objects from before content addressing have no row; the task checks they are unused
+            if remaining.get(key, 0) <= 0:
+                enqueue(session, 's3.delete', {'url': _url_for(key)})
+        if db is None:
+            session.commit()
+    finally:
+        if db is None:
+            session.close()
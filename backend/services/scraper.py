@@ -1,9 +1,10 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import math
 import time
 import random
-from urllib.parse import urlparse
+
+from services.circuit_breaker import BreakerRegistry, CircuitOpenError
+from services.extractors import extractor_for, site_domain
+from services.metrics import observe_call
 
 # --- User Agent Pool (realistic desktop browsers) ---
 USER_AGENTS = [
@@ -41,88 +42,73 @@ def get_headers():
     }
 
 
-def clean_amazon_url(url: str) -> str:
-    """Remove tracking/query parameters to prevent 400 Bad Request errors."""
-    parsed = urlparse(url)
-    base = "https://www.amazon.com" + parsed.path
-    return base.split("/ref=")[0]
+# Pause after each fetch so one user cannot hammer a site through the scrape endpoint
+PAUSE_SECONDS = (2, 4)
+
+# One circuit per registered domain (site_domain), so a shop's subdomains share it: repeated
+# CAPTCHAs, 5xx/429 responses or timeouts stop requests to that domain for a while
+# instead of burning a timeout per user
+scraper_breakers = BreakerRegistry()
+
+
+def is_domain_failure(exc: BaseException) -> bool:
+    """Errors that say the site is blocking or down, as opposed to a bad URL (404 and friends)."""
+    import requests
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status = exc.response.status_code if exc.response is not None else 0
+        return status >= 500 or status == 429
+    return isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+def fetch_page(session, url: str, headers: dict, timeout: float = 15):
+    """
+    GET a page, timed under the scraper metrics; 4xx/5xx raise HTTPError (304 does not).
+    Hosts that are not public, including redirect targets, raise BlockedURLError.
+    """
+    from services.url_guard import get_public
+    # Labelled by extractor, not host: a fixed set of series that does not list the shops users browse
+    with observe_call('scraper', extractor_for(url).name):
+        response = get_public(session, url, headers, timeout)
+        response.raise_for_status()
+    return response
+
+
+def parse_product_page(content: bytes, url: str):
+    """Extract product details from a fetched product page with the extractor for its domain."""
+    return extractor_for(url).parse(content, url)
 
 
 def scrape_url(url: str):
-    url = clean_amazon_url(url)
-    session = requests.Session()
+    import requests
+    from services.url_guard import BlockedURLError, check_public_url, public_session
+    url = extractor_for(url).clean_url(url)
+    domain = site_domain(url)
+    session = public_session()
     headers = get_headers()
+    fetched = False
 
     try:
-        response = session.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # --- Detect Captcha / Blocked Page ---
-        if "captcha" in soup.text.lower() or "enter the characters" in soup.text.lower():
-            return {"error": "Blocked by Amazon CAPTCHA. Try again later or use a different IP."}
-
-        # --- Product Title ---
-        title = None
-        for sel in ["#productTitle", "span.a-size-large.product-title-word-break"]:
-            el = soup.select_one(sel)
-            if el:
-                title = el.get_text(strip=True)
-                break
-
-        # --- Price ---
-        price = None
-        for sel in [
-            "#corePrice_feature_div .a-offscreen",
-            ".a-price .a-offscreen",
-            "#price_inside_buybox",
-            "span.a-color-price",
-        ]:
-            el = soup.select_one(sel)
-            if el:
-                price_text = el.get_text(strip=True).replace("$", "").replace(",", "")
-                try:
-                    price = float(price_text)
-                    break
-                except ValueError:
-                    continue
-
-        # --- Image ---
-        image_url = None
-        img = soup.select_one("#imgTagWrapperId img")
-        if img and "data-a-dynamic-image" in img.attrs:
-            try:
-                image_data = json.loads(img["data-a-dynamic-image"])
-                image_url = list(image_data.keys())[0]
-            except Exception:
-                pass
-
-        if not image_url:
-            fallback_img = soup.select_one("#landingImage") or soup.select_one("#imgBlkFront")
-            if fallback_img and "src" in fallback_img.attrs:
-                image_url = fallback_img["src"]
-
-        # --- Description ---
-        description = None
-        for sel in ["#feature-bullets ul", "#productDescription"]:
-            el = soup.select_one(sel)
-            if el:
-                description = el.get_text(separator=" ", strip=True)
-                break
-
-        if not title:
-            return {
-                "error": "Could not extract product details. The page may be blocked or have a different layout."
-            }
-
+        # Checked before a breaker exists for the host; fetch_page checks again, and every redirect
+        check_public_url(url)
+        with scraper_breakers.get(domain).guard(is_domain_failure) as call:
+            fetched = True
+            response = fetch_page(session, url, headers)
+            # Short links and regional redirects land on another domain; parse with that site's extractor
+            if response.url and response.url != url:
+                url = extractor_for(response.url).clean_url(response.url)
+            result = parse_product_page(response.content, url)
+            if result.get("blocked"):
+                call.failure("captcha")
+        return result
+
+    except BlockedURLError as e:
+        return {"error": f"Cannot fetch this URL: {e}"}
+    except CircuitOpenError as e:
+        retry_after = math.ceil(e.retry_after)
         return {
-            "name": title,
-            "price": price,
-            "image_url": image_url,
-            "description": description,
-            "url": url,
+            "error": f"{domain} is blocking or failing requests right now. Try again in {retry_after} seconds.",
+            "retry_after": retry_after,
         }
-
     except requests.exceptions.HTTPError as e:
         return {"error": f"HTTP error: {e.response.status_code}"}
     except requests.exceptions.RequestException as e:
@@ -130,4 +116,6 @@ def scrape_url(url: str):
     except Exception as e:
         return {"error": f"Unexpected error: {e}"}
     finally:
-        time.sleep(random.uniform(2, 4))
+        # Requests refused by an open circuit never reached the site, so there is nothing to pace
+        if fetched:
+            time.sleep(random.uniform(*PAUSE_SECONDS))
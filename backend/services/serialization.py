@@ -0,0 +1,44 @@
+from typing import Any, List, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+import orjson
+
+from models.item import WishListItemResponse
+from models.wishlist import WishlistResponse, WishlistSnapshotResponse
+
+# Adapters are compiled once at import instead of on every request
+item_adapter = TypeAdapter(WishListItemResponse)
+item_list_adapter = TypeAdapter(List[WishListItemResponse])
+wishlist_adapter = TypeAdapter(WishlistResponse)
+wishlist_list_adapter = TypeAdapter(List[WishlistResponse])
+snapshot_adapter = TypeAdapter(WishlistSnapshotResponse)
+
+def _orjson_default(value: Any) -> Any:
+    """Fallback for types orjson does not handle natively (UUID, datetime and date are native)"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, used as the app-wide default response class"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode('utf-8')
+        return orjson.dumps(content, default=_orjson_default)
+
+def json_response(
+    adapter: TypeAdapter,
+    data: Any,
+    status_code: int = 200,
+    headers: Optional[dict] = None
+) -> Response:
+    """
+    Validate rows once and serialize them straight to JSON bytes.
+    Returning a Response skips FastAPI's own response_model pass.
+    """
+    content = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(content=content, status_code=status_code, headers=headers, media_type='application/json')
@@ -0,0 +1,156 @@
+import gzip
+import os
+from html import escape
+from string import Template
+from typing import NamedTuple, Optional
+from fastapi import Response
+from fastapi.responses import HTMLResponse
+
+from models.user import User
+from models.wishlist import Wishlist
+from services.etag import etag_matches, not_modified, weak_etag
+from services.response_cache import public_cache, user_tag, wishlist_tag
+
+API_BASE = (os.getenv('PUBLIC_API_URL', 'https://cardinal-wishlist-api.onrender.com') or '').rstrip('/')
+
+SHARE_CACHE_CONTROL = 'public, max-age=600'
+
+class ShareTarget(NamedTuple):
+    """Frontend a share page redirects to, and how it picks its preview image"""
+    name: str
+    frontend_base: str
+    path: str                   # formatted with the wishlist id
+    fallback_image: str         # relative to frontend_base
+    prefer_thumbnail: bool      # use an uploaded thumbnail before the wishlist image
+
+RENDER_TARGET = ShareTarget(
+    name='render',
+    frontend_base=(os.getenv('PUBLIC_FRONTEND_URL', 'https://cardinal-wishlist.onrender.com') or '').rstrip('/'),
+    path='/shared/{wishlist_id}',
+    fallback_image='/favicon.ico',
+    prefer_thumbnail=False,
+)
+
+VERCEL_TARGET = ShareTarget(
+    name='vercel',
+    frontend_base='https://cardinalwishlist.vercel.app',
+    path='/wishlist/{wishlist_id}',
+    fallback_image='/favicon.png',
+    prefer_thumbnail=True,
+)
+
+# Parsed once at import; only the escaped values change per wishlist
+SHARE_PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+    <meta name="description" content="$description">
+    <link rel="canonical" href="$url">
+    <meta name="robots" content="noindex, nofollow">
+
+    <!-- Open Graph / Facebook -->
+    <meta property="og:type" content="website">
+    <meta property="og:url" content="$url">
+    <meta property="og:title" content="$title">
+    <meta property="og:description" content="$description">
+    <meta property="og:image" content="$image">
+
+    <!-- Twitter -->
+    <meta name="twitter:card" content="summary_large_image">
+    <meta name="twitter:url" content="$url">
+    <meta name="twitter:title" content="$title">
+    <meta name="twitter:description" content="$description">
+    <meta name="twitter:image" content="$image">
+
+    <!-- Fallback redirect for no-JS environments (crawlers still see meta tags above) -->
+    <meta http-equiv="refresh" content="0;url=$url">
+
+    <!-- Minimal styling so the page is just a dark background -->
+    <style>
+      html, body {
+        background: #141414;
+        margin: 0;
+        height: 100%;
+      }
+    </style>
+
+    <!-- Instant JS redirect for real users to avoid flicker -->
+    <script>
+      (function() {
+        try {
+          window.location.replace("$url");
+        } catch (e) {
+          window.location.href = "$url";
+        }
+      })();
+    </script>
+</head>
+<body></body>
+</html>
+""")
+
+def _is_absolute(url: str) -> bool:
+    return url.startswith('http://') or url.startswith('https://')
+
+def resolve_og_image(target: ShareTarget, wishlist: Wishlist, owner: Optional[User]) -> str:
+    """Pick the preview image: thumbnail (if the target prefers it), wishlist image, owner picture, favicon"""
+    if target.prefer_thumbnail and wishlist.thumbnail_type == 'image' and wishlist.thumbnail_image:
+        image_path = str(wishlist.thumbnail_image)
+        if _is_absolute(image_path):
+            return image_path
+        return f"{API_BASE}/{image_path.lstrip('/')}"
+    if wishlist.image is not None and _is_absolute(str(wishlist.image)):
+        return str(wishlist.image)
+    if owner is not None and owner.pfp is not None:
+        return f"{API_BASE}/users/{owner.id}/profile-image"
+    return f"{target.frontend_base}{target.fallback_image}"
+
+def render_share_page(target: ShareTarget, wishlist: Wishlist, owner: Optional[User]) -> str:
+    """Render the Open Graph page for a wishlist"""
+    owner_name = (str(owner.name) if owner.name else str(owner.username)) if owner is not None else "User"
+    frontend_url = target.frontend_base + target.path.format(wishlist_id=wishlist.id)
+
+    title = wishlist.title if wishlist.title is not None else "Shared Wishlist"
+    description = wishlist.description if wishlist.description is not None else f"{owner_name}'s wishlist"
+
+    return SHARE_PAGE_TEMPLATE.substitute(
+        title=escape(title),
+        description=escape(description),
+        url=escape(frontend_url),
+        image=escape(resolve_og_image(target, wishlist, owner)),
+    )
+
+def share_page_response(
+    target: ShareTarget,
+    wishlist: Wishlist,
+    owner: Optional[User],
+    accept_encoding: Optional[str],
+    if_none_match: Optional[str]
+) -> Response:
+    """
+    Serve a share page from the cache, rendering and gzipping it once per wishlist version.
+    Answers matching If-None-Match with 304 and sends the gzip body when the client accepts it.
+    """
+    # Owner edits are picked up through the user tag invalidating these entries
+    key = f"share:{target.name}:{wishlist.id}:{wishlist.updated_at or wishlist.created_at}"
+    entry = public_cache.get(key)
+    compressed = public_cache.get(f"{key}:gzip")
+    if entry is not None and compressed is not None:
+        html, html_gzip, etag = entry.body, compressed.body, entry.headers['ETag']
+    else:
+        html = render_share_page(target, wishlist, owner).encode('utf-8')
+        html_gzip = gzip.compress(html, compresslevel=9)
+        etag = weak_etag(key, html)
+        tags = [wishlist_tag(wishlist.id), user_tag(wishlist.user_id)]
+        public_cache.set(key, html, 'text/html', tags, headers={'ETag': etag})
+        public_cache.set(f"{key}:gzip", html_gzip, 'text/html', tags, headers={'ETag': etag})
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, SHARE_CACHE_CONTROL)
+
+    headers = {'ETag': etag, 'Cache-Control': SHARE_CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+    if accept_encoding and 'gzip' in accept_encoding.lower():
+        return HTMLResponse(content=html_gzip, headers={**headers, 'Content-Encoding': 'gzip'})
+    return HTMLResponse(content=html, headers=headers)
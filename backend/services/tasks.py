@@ -0,0 +1,195 @@
+"""
+Durable background tasks stored in Postgres.
+
+Routes enqueue work in the same transaction as the change that needs it, so a
+task exists exactly when its data change committed. Workers claim due tasks with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can poll the table
+without handing out the same task twice. A claimed task holds a lease; if its
+worker dies, the task becomes claimable again when the lease runs out.
+
+Failures are retried with exponential backoff and jitter. After max_attempts the
+task is marked DEAD and left in the table for inspection. Handlers must be
+idempotent: a task whose worker dies mid-run is run again.
+"""
+import importlib
+import os
+import random
+import threading
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models.base import SessionLocal
+from models.task import Task, TaskStatus
+
+TASK_LEASE_SECONDS = float(os.getenv('TASK_LEASE_SECONDS', '300'))
+TASK_BACKOFF_BASE = float(os.getenv('TASK_BACKOFF_BASE', '2'))
+TASK_BACKOFF_MAX = float(os.getenv('TASK_BACKOFF_MAX', '600'))
+TASK_RETENTION_DAYS = float(os.getenv('TASK_RETENTION_DAYS', '7'))
+
+# Modules whose import registers handlers; a worker process imports them on start
+HANDLER_MODULES = ('services.s3_service',)
+
+HANDLERS: Dict[str, Callable[[dict], None]] = {}
+
+def task_handler(kind: str):
+    """Register the function that runs tasks of this kind; it receives the payload"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    idempotency_key: Optional[str] = None,
+    delay_seconds: float = 0,
+    max_attempts: int = 5
+) -> None:
+    """Add a task to the caller's transaction; it becomes visible to workers on commit"""
+    statement = insert(Task).values(
+        kind=kind,
+        payload=payload,
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_at=func.now() + timedelta(seconds=delay_seconds),
+    )
+    if idempotency_key is not None:
+        statement = statement.on_conflict_do_nothing(index_elements=[Task.idempotency_key])
+    db.execute(statement)
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential delay before retry number `attempts`, capped, with full jitter"""
+    return random.uniform(0, min(TASK_BACKOFF_MAX, TASK_BACKOFF_BASE ** attempts))
+
+def claim(db: Session, limit: int) -> List[dict]:
+    """Lease up to `limit` due tasks to this worker and commit the lease"""
+    due = (
+        select(Task.id)
+        .where(
+            Task.status.in_((TaskStatus.PENDING, TaskStatus.RUNNING)),
+            Task.run_at <= func.now()
+        )
+        .order_by(Task.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(Task)
+        .where(Task.id.in_(due.scalar_subquery()))
+        .values(
+            status=TaskStatus.RUNNING,
+            attempts=Task.attempts + 1,
+            run_at=func.now() + timedelta(seconds=TASK_LEASE_SECONDS),
+            updated_at=func.now(),
+        )
+        .returning(Task.id, Task.kind, Task.payload, Task.attempts, Task.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+    db.commit()
+    return [dict(row) for row in rows]
+
+def finish(db: Session, task: dict, error: Optional[str] = None) -> TaskStatus:
+    """Record a run's outcome: done, back to pending after a backoff, or dead"""
+    if error is None:
+        status, values = TaskStatus.DONE, {'last_error': None}
+    elif task['attempts'] >= task['max_attempts']:
+        status, values = TaskStatus.DEAD, {'last_error': error}
+    else:
+        delay = timedelta(seconds=backoff_seconds(task['attempts']))
+        status, values = TaskStatus.PENDING, {'last_error': error, 'run_at': func.now() + delay}
+    db.execute(
+        update(Task)
+        # Only the latest claim may record an outcome; an expired lease may have been reclaimed
+        .where(Task.id == task['id'], Task.status == TaskStatus.RUNNING, Task.attempts == task['attempts'])
+        .values(status=status, updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return status
+
+def run_task(task: dict) -> Optional[str]:
+    """Run one claimed task; returns the error text, or None on success"""
+    handler = HANDLERS.get(task['kind'])
+    if handler is None:
+        return f"No handler registered for task kind {task['kind']!r}"
+    try:
+        handler(task['payload'])
+        return None
+    except Exception:
+        return traceback.format_exc(limit=5)
+
+def work_once(batch_size: int = 1) -> int:
+    """Claim and run one batch; returns how many tasks were claimed"""
+    db = SessionLocal()
+    try:
+        tasks = claim(db, batch_size)
+        for task in tasks:
+            error = run_task(task)
+            if finish(db, task, error) is TaskStatus.DEAD:
+                print(f"Task {task['id']} ({task['kind']}) is dead after {task['attempts']} attempts: {error}")
+        return len(tasks)
+    finally:
+        db.close()
+
+def purge_finished(db: Session, older_than_days: float = TASK_RETENTION_DAYS) -> int:
+    """Drop DONE tasks past the retention window (their idempotency keys go with them)"""
+    result = db.execute(
+        delete(Task).where(
+            Task.status == TaskStatus.DONE,
+            Task.updated_at < func.now() - timedelta(days=older_than_days)
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+class TaskWorker:
+    """Threads polling the queue until stop() is called; the current task always finishes"""
+
+    def __init__(self, threads: int = 4, batch_size: int = 1, poll_seconds: float = 1.0):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._stopping = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = work_once(self.batch_size)
+            except Exception as e:
+                print(f"Task worker error: {e}")
+                claimed = 0
+            if not claimed:
+                self._stopping.wait(self.poll_seconds)
+
+    def _housekeeping(self) -> None:
+        while not self._stopping.wait(3600):
+            db = SessionLocal()
+            try:
+                purge_finished(db)
+            except Exception as e:
+                print(f"Task purge failed: {e}")
+            finally:
+                db.close()
+
+    def start(self) -> None:
+        for module in HANDLER_MODULES:
+            importlib.import_module(module)
+        self._workers = [threading.Thread(target=self._loop, name=f'task-worker-{n}') for n in range(self.threads)]
+        self._workers.append(threading.Thread(target=self._housekeeping, name='task-housekeeping'))
+        for thread in self._workers:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def join(self) -> None:
+        for thread in self._workers:
+            thread.join()
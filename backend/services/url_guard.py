@@ -0,0 +1,120 @@
+"""
+Outbound fetches of user-supplied URLs (product pages), restricted to the public internet.
+
+A URL is fetched only if it is http(s) on the scheme's default port, carries no
+credentials, and every address its host resolves to is public: loopback,
+private (RFC 1918, fc00::/7), link-local (including 169.254.169.254),
+carrier-grade NAT, multicast and reserved ranges are refused. Redirects are
+followed by hand so each hop is checked the same way.
+
+The address check runs again on the socket after it connects, so a host that
+resolves to a public address for the check and a private one for the connection
+(DNS rebinding) is still refused.
+
+Benchmarks that serve stand-in shops on 127.0.0.x add that network to
+TRUSTED_NETWORKS; addresses there pass on any port.
+"""
+import ipaddress
+import socket
+from typing import List, Union
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+MAX_REDIRECTS = 5
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+TRUSTED_NETWORKS: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = []
+
+class BlockedURLError(ValueError):
+    """The URL is not allowed to be fetched; raised before any request reaches its host"""
+
+def _address(value: str) -> Union[ipaddress.IPv4Address, ipaddress.IPv6Address]:
+    address = ipaddress.ip_address(value.split('%', 1)[0])
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        return address.ipv4_mapped
+    return address
+
+def _trusted(address) -> bool:
+    return any(address in network for network in TRUSTED_NETWORKS)
+
+def is_public_address(value: str) -> bool:
+    address = _address(value)
+    return _trusted(address) or (address.is_global and not address.is_multicast)
+
+def check_public_url(url: str) -> None:
+    """Raise BlockedURLError unless `url` may be fetched"""
+    parsed = urlparse(url)
+    if parsed.scheme not in DEFAULT_PORTS:
+        raise BlockedURLError("Only http and https URLs can be fetched")
+    if parsed.username or parsed.password:
+        raise BlockedURLError("URLs with credentials cannot be fetched")
+    try:
+        port = parsed.port
+    except ValueError:
+        raise BlockedURLError("Invalid port")
+    if not parsed.hostname:
+        raise BlockedURLError("URL has no host")
+
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, port or DEFAULT_PORTS[parsed.scheme], proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise BlockedURLError(f"Could not resolve {parsed.hostname}")
+    addresses = {_address(info[4][0]) for info in infos}
+    if all(_trusted(address) for address in addresses):
+        return
+    if port not in (None, DEFAULT_PORTS[parsed.scheme]):
+        raise BlockedURLError("Only the default http and https ports can be fetched")
+    if not all(address.is_global and not address.is_multicast for address in addresses):
+        raise BlockedURLError(f"{parsed.hostname} is not a public address")
+
+def _check_peer(sock: socket.socket, host: str) -> socket.socket:
+    if not is_public_address(sock.getpeername()[0]):
+        sock.close()
+        # Not an OSError, so urllib3 and requests pass it through instead of retrying it as a network error
+        raise BlockedURLError(f"{host} is not a public address")
+    return sock
+
+class _PublicHTTPConnection(HTTPConnection):
+    def _new_conn(self) -> socket.socket:
+        return _check_peer(super()._new_conn(), self.host)
+
+class _PublicHTTPSConnection(HTTPSConnection):
+    def _new_conn(self) -> socket.socket:
+        return _check_peer(super()._new_conn(), self.host)
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+class PublicOnlyAdapter(HTTPAdapter):
+    """Transport adapter whose connections refuse non-public peers"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _PublicHTTPConnectionPool,
+            'https': _PublicHTTPSConnectionPool,
+        }
+
+def public_session() -> requests.Session:
+    session = requests.Session()
+    session.mount('http://', PublicOnlyAdapter())
+    session.mount('https://', PublicOnlyAdapter())
+    return session
+
+def get_public(session: requests.Session, url: str, headers: dict, timeout: float) -> requests.Response:
+    """GET `url`, following up to MAX_REDIRECTS redirects and checking every hop before it is requested"""
+    for _ in range(MAX_REDIRECTS + 1):
+        check_public_url(url)
+        response = session.get(url, headers=headers, timeout=timeout, allow_redirects=False)
+        if not response.is_redirect:
+            return response
+        url = urljoin(response.url, response.headers['Location'])
+        response.close()
+    raise requests.exceptions.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects", response=response)